@@ -2,15 +2,44 @@ from flask import Flask
 from flask_cors import CORS
 from flask_mail import Mail
 from dotenv import load_dotenv
+from app.config import Config
 import os
+import threading
 
 load_dotenv()
 
 mail = Mail()
 
+_background_lock = threading.Lock()
+_background_started = False
+
+def start_background_workers(app):
+    """Start the exchange-rate refresher and email outbox workers, once per process."""
+    global _background_started
+    if _background_started:
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    
+    if Config.EXCHANGE_RATE_REFRESHER:
+        from app.services.exchange_rate import start_exchange_rate_refresher
+        start_exchange_rate_refresher()
+    
+    if Config.EMAIL_OUTBOX_WORKERS > 0:
+        from app.services.email_outbox import start_email_workers
+        start_email_workers(app)
+
 def create_app():
     app = Flask(__name__)
     
+    if Config.TRUSTED_PROXY_COUNT:
+        # request.remote_addr becomes the client address the proxies saw,
+        # which the per-IP login limit and the logs rely on
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_COUNT, x_proto=Config.TRUSTED_PROXY_COUNT)
+    
     app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER')
     app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
@@ -22,7 +51,7 @@ def create_app():
     CORS(app, resources={r"/api/*": {"origins": os.getenv('FRONTEND_URL')}})
     mail.init_app(app)
     
-    from app.routes import auth, cards, transactions, subscriptions, analytics, statements, exchange_rates
+    from app.routes import auth, cards, transactions, subscriptions, analytics, statements, exchange_rates, alerts, events, profiles
     
     app.register_blueprint(auth.bp, url_prefix='/api/auth')
     app.register_blueprint(cards.bp, url_prefix='/api/cards')
@@ -31,9 +60,62 @@ def create_app():
     app.register_blueprint(analytics.bp, url_prefix='/api/analytics')
     app.register_blueprint(statements.bp, url_prefix='/api/statements')
     app.register_blueprint(exchange_rates.bp, url_prefix ='/api/exchange-rate')
+    app.register_blueprint(alerts.bp, url_prefix='/api/alerts')
+    app.register_blueprint(events.bp, url_prefix='/api/events')
+    app.register_blueprint(profiles.bp, url_prefix='/api/profiles')
+    
+    from app.utils.database import init_db, get_pool_stats
+    
+    from app.utils.metrics import init_metrics, metrics_token_required
+    init_metrics(app)
+    
+    from app.utils.query_log import init_query_log
+    init_query_log(app)
     
+    from app.utils.profiler import init_profiler
+    init_profiler(app)
+    
+    # Last, so its after_request commit runs before the hooks above
+    init_db(app)
+    
+    from app.commands import register_commands
+    register_commands(app)
+    
+    if Config.BACKGROUND_WORKERS:
+        # Started by the first request, so only serving processes run them;
+        # CLI commands and the debug reloader's parent never do
+        @app.before_request
+        def start_background_workers_once():
+            start_background_workers(app)
+    
+    # The plain check stays open for load balancers; the detailed ones
+    # expose internals and share /api/metrics' token
     @app.route('/api/health')
     def health_check():
         return {'status': 'healthy', 'message': 'PayWatch API is running'}, 200
     
+    @app.route('/api/health/db')
+    @metrics_token_required
+    def db_pool_stats():
+        return {'pool': get_pool_stats()}, 200
+    
+    @app.route('/api/health/cache')
+    @metrics_token_required
+    def cache_stats():
+        from app.utils.cache import get_cache
+        return {'cache': get_cache().stats()}, 200
+    
+    @app.route('/api/health/events')
+    @metrics_token_required
+    def event_stats():
+        from app.services.events import get_event_broker
+        return {'events': get_event_broker().stats()}, 200
+    
+    @app.route('/api/health/auth')
+    @metrics_token_required
+    def auth_stats():
+        from app.utils.passwords import get_password_hasher
+        from app.utils.rate_limit import get_rate_limiter
+        return {'password_hasher': get_password_hasher().stats(), 'rate_limiter': get_rate_limiter().stats()}, 200
+    
     return app
\ No newline at end of file
@@ -0,0 +1,126 @@
+import sys
+import click
+from datetime import datetime
+
+def register_commands(app):
+
+    @app.cli.command('background-workers')
+    def background_workers():
+        """Run the exchange-rate refresher and email outbox workers in the foreground."""
+        import time
+        from app import start_background_workers
+        
+        start_background_workers(app)
+        click.echo("Background workers running, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            from app.services.email_outbox import stop_email_workers
+            stop_email_workers()
+
+    @app.cli.command('ledger-snapshot')
+    @click.option('--date', 'as_of', default=None, help='Snapshot date (YYYY-MM-DD), defaults to yesterday')
+    def ledger_snapshot(as_of):
+        """Snapshot every card balance from the ledger."""
+        from app.models.ledger import CardLedger
+        
+        try:
+            as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else None
+            count = CardLedger.take_snapshots(as_of)
+        except ValueError as e:
+            click.echo(f"Invalid --date: {e}")
+            sys.exit(1)
+        if count is None:
+            click.echo("Snapshot failed")
+            sys.exit(1)
+        click.echo(f"Snapshotted {count} card balance(s)")
+
+    @app.cli.command('rebuild-spending-rollup')
+    @click.option('--user-id', type=int, default=None, help='Only rebuild this user, defaults to everyone')
+    def rebuild_spending_rollup(user_id):
+        """Recompute daily_spending from the transactions table."""
+        from app.models.spending_rollup import SpendingRollup
+        
+        count = SpendingRollup.rebuild(user_id)
+        if count is None:
+            click.echo("Rebuild failed")
+            sys.exit(1)
+        click.echo(f"Rebuilt {count} daily spending row(s)")
+    
+    @app.cli.command('alert-sweep')
+    @click.option('--dry-run', is_flag=True, help='Count the alerts that would be raised without writing them')
+    @click.option('--batch-size', type=int, default=None, help='Candidates per transaction')
+    def alert_sweep(dry_run, batch_size):
+        """Raise credit-limit, trial-ending and renewal alerts for every user."""
+        from app.services.alert_sweep import run_alert_sweep
+        
+        report = run_alert_sweep(dry_run=dry_run, batch_size=batch_size)
+        if 'error' in report:
+            click.echo(report['error'])
+            sys.exit(1)
+        
+        for alert_type, counts in report.items():
+            if alert_type != 'elapsed_ms':
+                click.echo(f"{alert_type}: {counts['alerts']} alert(s) in {counts['batches']} batch(es)")
+        click.echo(f"{'Dry run' if dry_run else 'Sweep'} finished in {report['elapsed_ms']}ms")
+    
+    @app.cli.command('db-migrate')
+    @click.option('--list', 'list_only', is_flag=True, help='Show pending migrations without applying them')
+    @click.option('--fake', 'fake_target', metavar='VERSION',
+                  help='Record pending migrations up to and including VERSION (e.g. 0004) as applied without running them')
+    def db_migrate(list_only, fake_target):
+        """Apply pending SQL migrations from backend/migrations."""
+        from app.utils.migrations import get_pending_migrations, apply_migration, migrations_through
+        
+        pending = get_pending_migrations()
+        if pending is None:
+            click.echo("Could not read schema_migrations")
+            sys.exit(1)
+        if not pending:
+            click.echo("Database is up to date")
+            return
+        
+        fake = fake_target is not None
+        if fake:
+            pending = migrations_through(pending, fake_target)
+            if pending is None:
+                click.echo(f"No pending migration matches {fake_target}")
+                sys.exit(1)
+        
+        for version, path in pending:
+            if list_only:
+                click.echo(f"pending  {version}")
+                continue
+            if not apply_migration(version, path, fake=fake):
+                click.echo(f"failed   {version}")
+                sys.exit(1)
+            click.echo(f"{'faked' if fake else 'applied'}  {version}")
+    
+    @app.cli.command('explain-queries')
+    @click.option('--user-id', type=int, required=True, help='User whose data the queries run against')
+    @click.option('--strict', is_flag=True, help='Exit non-zero when any plan is flagged')
+    def explain_queries(user_id, strict):
+        """EXPLAIN the model read queries and flag full scans."""
+        from app.utils.query_advisor import explain_model_queries
+        
+        reports = explain_model_queries(user_id)
+        if reports is None:
+            click.echo("Database connection failed")
+            sys.exit(1)
+        
+        flagged = 0
+        for report in reports:
+            status = 'WARN' if report['issues'] else 'ok'
+            flagged += bool(report['issues'])
+            click.echo(f"[{status}] {', '.join(report['sources'])}")
+            click.echo(f"       {report['query'][:160]}")
+            for plan in report['plan']:
+                click.echo(f"       {plan.get('table')}: type={plan.get('type')} key={plan.get('key')} "
+                           f"rows={plan.get('rows')} extra={plan.get('Extra') or ''}")
+            for issue in report['issues']:
+                click.echo(f"       ! {issue}")
+        
+        click.echo(f"{len(reports)} queries explained, {flagged} flagged")
+        if strict and flagged:
+            sys.exit(1)
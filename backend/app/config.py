@@ -8,13 +8,91 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'root')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
     DB_NAME = os.getenv('DB_NAME', 'paywatch_db')
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 10))
+    
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', 3600))  # seconds
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_HEALTH_CHECK_INTERVAL = int(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+    
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # 'memory' (single process only) or 'redis'; production needs redis
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', 300))  # seconds
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+    
+    QUERY_WORKERS = int(os.getenv('QUERY_WORKERS', 4))  # threads for queries requests run in parallel; keep well below DB_POOL_MAX_SIZE
+    QUERY_MAX_PER_REQUEST = int(os.getenv('QUERY_MAX_PER_REQUEST', 2))  # pool threads one request may use at once
     
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     JWT_ALGORITHM = 'HS256'
     JWT_EXPIRATION_HOURS = 24
+    JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 10000))  # verified tokens kept per process
+    JWT_REVOCATION_SYNC_SECONDS = int(os.getenv('JWT_REVOCATION_SYNC_SECONDS', 30))
+    
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))  # existing hashes are upgraded on the next login
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # cores a login burst may take
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 4))  # running + waiting hashes before 503; keep below the request thread count
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))  # seconds
+    
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # 'memory' or 'redis'
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    LOGIN_RATE_WINDOW = int(os.getenv('LOGIN_RATE_WINDOW', 300))  # seconds
+    LOGIN_RATE_PER_EMAIL = int(os.getenv('LOGIN_RATE_PER_EMAIL', 10))
+    LOGIN_RATE_PER_IP = int(os.getenv('LOGIN_RATE_PER_IP', 50))
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))  # reverse proxies whose X-Forwarded-For is trusted
     
     EXCHANGE_RATE_API_KEY = os.getenv('EXCHANGE_RATE_API_KEY')
     EXCHANGE_RATE_API_URL = os.getenv('EXCHANGE_RATE_API_URL')
+    EXCHANGE_RATE_CACHE_TTL = int(os.getenv('EXCHANGE_RATE_CACHE_TTL', 3600))  # seconds
+    EXCHANGE_RATE_RETRY_SECONDS = int(os.getenv('EXCHANGE_RATE_RETRY_SECONDS', 300))
+    EXCHANGE_RATE_REFRESH_DELAY_SECONDS = int(os.getenv('EXCHANGE_RATE_REFRESH_DELAY_SECONDS', 60))  # after midnight
+    EXCHANGE_RATE_REFRESHER = os.getenv('EXCHANGE_RATE_REFRESHER', 'True') == 'True'
+    
+    EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', 2))
+    BACKGROUND_WORKERS = os.getenv('BACKGROUND_WORKERS', 'True') == 'True'  # False when `flask background-workers` runs them
+    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 20))
+    EMAIL_SEND_RATE = float(os.getenv('EMAIL_SEND_RATE', 5))  # messages per second across all workers
+    EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))
+    EMAIL_RETRY_BASE_SECONDS = int(os.getenv('EMAIL_RETRY_BASE_SECONDS', 30))
+    EMAIL_RETRY_MAX_SECONDS = int(os.getenv('EMAIL_RETRY_MAX_SECONDS', 3600))
+    EMAIL_POLL_INTERVAL = float(os.getenv('EMAIL_POLL_INTERVAL', 2))
+    EMAIL_CLAIM_TIMEOUT_SECONDS = int(os.getenv('EMAIL_CLAIM_TIMEOUT_SECONDS', 600))
+    
+    STATEMENT_WORKERS = int(os.getenv('STATEMENT_WORKERS', 0))  # 0 = one process per core
+    STATEMENT_STORAGE_DIR = os.getenv('STATEMENT_STORAGE_DIR')  # unset = keep PDFs in the statement_jobs table
+    STATEMENT_JOB_TTL = int(os.getenv('STATEMENT_JOB_TTL', 3600))  # seconds a finished job is kept
+    STATEMENT_JOB_TIMEOUT = int(os.getenv('STATEMENT_JOB_TIMEOUT', 600))  # seconds before a job still pending is failed
+    
+    IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', 100000))
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))
+    
+    ALERT_UTILIZATION_THRESHOLD = float(os.getenv('ALERT_UTILIZATION_THRESHOLD', 80))  # percent of credit limit
+    ALERT_TRIAL_DAYS = int(os.getenv('ALERT_TRIAL_DAYS', 3))  # warn this many days before a trial ends
+    ALERT_RENEWAL_DAYS = int(os.getenv('ALERT_RENEWAL_DAYS', 3))  # and before a renewal
+    ALERT_CREDIT_LIMIT_COOLDOWN_DAYS = int(os.getenv('ALERT_CREDIT_LIMIT_COOLDOWN_DAYS', 7))
+    ALERT_SWEEP_BATCH_SIZE = int(os.getenv('ALERT_SWEEP_BATCH_SIZE', 1000))
+    
+    EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'memory')  # 'memory' or 'redis'
+    EVENTS_REDIS_URL = os.getenv('EVENTS_REDIS_URL', os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    EVENTS_HEARTBEAT_SECONDS = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+    EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))  # per connection
+    EVENTS_MAX_CONNECTIONS = int(os.getenv('EVENTS_MAX_CONNECTIONS', 4))  # per process; each holds a worker thread, keep it a small fraction of them
+    EVENTS_TICKET_SECONDS = int(os.getenv('EVENTS_TICKET_SECONDS', 30))  # lifetime of a stream ticket
+    
+    SQL_DEBUG = os.getenv('SQL_DEBUG', 'False') == 'True'  # log every statement per request
+    SQL_DEBUG_REPEAT_THRESHOLD = int(os.getenv('SQL_DEBUG_REPEAT_THRESHOLD', 3))  # same query shape this often = N+1
+    SQL_DEBUG_STATEMENTS = os.getenv('SQL_DEBUG_STATEMENTS', 'False') == 'True'  # print each statement, not just the summary
+    
+    PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', 'False') == 'True'  # sample every request, keep the slow ones
+    PROFILE_SLOW_MS = int(os.getenv('PROFILE_SLOW_MS', 1000))
+    PROFILE_INTERVAL_MS = int(os.getenv('PROFILE_INTERVAL_MS', 10))  # time between stack samples
+    PROFILE_ALLOWED_USERS = os.getenv('PROFILE_ALLOWED_USERS', '')  # user ids that may send X-Profile: 1
+    PROFILE_DIR = os.getenv('PROFILE_DIR')  # unset = keep profiles in memory
+    PROFILE_MAX_PROFILES = int(os.getenv('PROFILE_MAX_PROFILES', 50))
+    PROFILE_MAX_STACKS = int(os.getenv('PROFILE_MAX_STACKS', 2000))  # distinct stacks kept per profile
+    
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # when set, /api/metrics and /api/health/* require it as a bearer token; set it in production
     
     APP_NAME = os.getenv('APP_NAME', 'PayWatch')
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
\ No newline at end of file
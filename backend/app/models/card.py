@@ -1,4 +1,7 @@
 from app.utils.database import get_db_connection, close_db_connection
+from app.utils.cache import invalidate_dashboard
+from app.models.ledger import CardLedger
+from app.services.events import publish_event
 from datetime import datetime
 from decimal import Decimal
 
@@ -34,7 +37,10 @@ class Card:
             )
             
             card_id = cursor.lastrowid
+            if initial_balance:
+                CardLedger.record(cursor, card_id, user_id, 'opening', initial_balance)
             conn.commit()
+            invalidate_dashboard(user_id, 'cards')
             
             return Card.get_card_by_id(card_id, user_id)
             
@@ -121,6 +127,15 @@ class Card:
         cursor = conn.cursor()
         
         try:
+            # Record the difference before overwriting the balance
+            cursor.execute(
+                """
+                INSERT INTO card_ledger (card_id, user_id, entry_type, amount, effective_date)
+                SELECT id, user_id, 'adjustment', %s - current_balance, %s
+                FROM cards WHERE id = %s AND user_id = %s AND current_balance <> %s
+                """,
+                (new_balance, datetime.now().date(), card_id, user_id, new_balance)
+            )
             cursor.execute(
                 """
                 UPDATE cards 
@@ -130,8 +145,12 @@ class Card:
                 (new_balance, card_id, user_id)
             )
             
+            updated = cursor.rowcount > 0
             conn.commit()
-            return cursor.rowcount > 0
+            invalidate_dashboard(user_id, 'cards')
+            if updated:
+                publish_event(user_id, 'balance', {'card_id': card_id, 'current_balance': new_balance})
+            return updated
             
         except Exception as e:
             print(f"Error updating balance: {e}")
@@ -171,6 +190,7 @@ class Card:
             )
             
             conn.commit()
+            invalidate_dashboard(user_id)
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -188,56 +208,67 @@ class Card:
             return {'error': 'Database connection failed'}
         
         cursor = conn.cursor()
-        amount = Decimal(amount)
-        print(type(amount))
+        amount = Decimal(str(amount))
         try:
             current_year = datetime.now().year
+            
+            # The limit checks live in the WHERE clause and the yearly reset is
+            # folded into the SET, so concurrent loads can never both pass a
+            # check that only one of them fits in. MySQL applies the SET
+            # assignments left to right, so total_loaded_this_year is computed
+            # from the old year_started before it is rolled over.
+            cursor.execute(
+                """UPDATE cards
+                SET total_loaded_this_year = IF(year_started < %s, 0, total_loaded_this_year) + %s,
+                    year_started = GREATEST(year_started, %s),
+                    current_balance = current_balance + %s
+                WHERE id = %s AND user_id = %s
+                  AND IF(year_started < %s, 0, total_loaded_this_year) + %s <= credit_limit
+                  AND current_balance + %s <= credit_limit""",
+                (current_year, amount, current_year, amount, card_id, user_id, current_year, amount, amount)
+            )
+            loaded = cursor.rowcount > 0
+            
             cursor.execute(
                 """SELECT credit_limit, total_loaded_this_year, year_started, current_balance
                 FROM cards WHERE id = %s AND user_id = %s""",
                 (card_id, user_id)
             )
             card = cursor.fetchone()
-
+            
             if not card:
                 return {'error': 'Card not found'}
             
-            total_loaded = card['total_loaded_this_year']
-            print(f"total_loaded:{total_loaded}")
-            if card['year_started'] < current_year:
-                total_loaded = 0
-                cursor.execute(
-                    "UPDATE cards SET year_started = %s, total_loaded_this_year = 0 WHERE id = %s",
-                    (current_year, card_id)
-                )
+            if loaded:
+                CardLedger.record(cursor, card_id, user_id, 'load', amount)
+                conn.commit()
+                invalidate_dashboard(user_id, 'cards')
+                publish_event(user_id, 'balance', {
+                    'card_id': card_id,
+                    'current_balance': card['current_balance'],
+                    'remaining_yearly_limit': card['credit_limit'] - card['total_loaded_this_year']
+                })
+                return {
+                    'success': True, 
+                    'new_balance': card['current_balance'],
+                    'remaining_yearly_limit': card['credit_limit'] - card['total_loaded_this_year']
+                }
             
+            total_loaded = card['total_loaded_this_year'] if card['year_started'] >= current_year else 0
             if total_loaded + amount > card['credit_limit']:
                 remaining = card['credit_limit'] - total_loaded
                 return {
                     'error': f'Yearly limit exceeded. You can only load ${remaining:.2f} more this year (Yearly limit: ${card["credit_limit"]:.2f})'
                 }
             
-            new_balance = card['current_balance'] + amount
-            if new_balance > card['credit_limit']:
+            if card['current_balance'] + amount > card['credit_limit']:
                 max_loadable = card['credit_limit'] - card['current_balance']
                 return {
                     'error': f'Cannot exceed card limit. You can load maximum ${max_loadable:.2f} more (Current: ${card["current_balance"]:.2f}, Limit: ${card["credit_limit"]:.2f})'
                 }
             
-            cursor.execute(
-                """UPDATE cards 
-                SET current_balance = current_balance + %s,
-                    total_loaded_this_year = total_loaded_this_year + %s
-                WHERE id = %s""",
-                (amount, amount, card_id)
-            )
-            
-            conn.commit()
-            return {
-                'success': True, 
-                'new_balance': new_balance,
-                'remaining_yearly_limit': card['credit_limit'] - (total_loaded + amount)
-            }
+            # A concurrent load or spend changed the card between the two statements
+            return {'error': 'Card balance changed while loading, please try again'}
             
         except Exception as e:
             conn.rollback()
@@ -303,6 +334,7 @@ class Card:
             )
             
             conn.commit()
+            invalidate_dashboard(user_id)
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -0,0 +1,179 @@
+from app.utils.database import get_db_connection, close_db_connection
+from datetime import date, timedelta
+
+class CardLedger:
+    """Append-only card balance movements and periodic balance snapshots.
+
+    Write paths call record() with their own cursor so the ledger entry
+    commits together with the cards.current_balance change it describes.
+    """
+
+    @staticmethod
+    def record(cursor, card_id, user_id, entry_type, amount, effective_date=None, reference_id=None):
+        CardLedger.record_many(cursor, [(card_id, user_id, entry_type, amount, effective_date, reference_id)])
+
+    @staticmethod
+    def record_many(cursor, entries):
+        """entries: (card_id, user_id, entry_type, signed_amount, effective_date, reference_id)"""
+        today = date.today()
+        rows = [
+            (card_id, user_id, entry_type, amount, effective_date or today, reference_id)
+            for card_id, user_id, entry_type, amount, effective_date, reference_id in entries
+        ]
+        if not rows:
+            return
+        
+        cursor.executemany(
+            """
+            INSERT INTO card_ledger (card_id, user_id, entry_type, amount, effective_date, reference_id)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """,
+            rows
+        )
+        
+        # A backdated entry makes every snapshot from its date onwards wrong;
+        # drop them and let the next snapshot run rebuild them.
+        backdated = {}
+        for card_id, _, _, _, effective_date, _ in rows:
+            effective_date = CardLedger._as_date(effective_date)
+            if effective_date < today and (card_id not in backdated or effective_date < backdated[card_id]):
+                backdated[card_id] = effective_date
+        if backdated:
+            cursor.executemany(
+                "DELETE FROM card_balance_snapshots WHERE card_id = %s AND snapshot_date >= %s",
+                list(backdated.items())
+            )
+
+    @staticmethod
+    def _as_date(value):
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+
+    @staticmethod
+    def _balance_at(cursor, card_id, as_of):
+        cursor.execute(
+            """
+            SELECT snapshot_date, balance FROM card_balance_snapshots
+            WHERE card_id = %s AND snapshot_date <= %s
+            ORDER BY snapshot_date DESC LIMIT 1
+            """,
+            (card_id, as_of)
+        )
+        snapshot = cursor.fetchone()
+        
+        if snapshot:
+            cursor.execute(
+                """
+                SELECT COALESCE(SUM(amount), 0) AS movement FROM card_ledger
+                WHERE card_id = %s AND effective_date > %s AND effective_date <= %s
+                """,
+                (card_id, snapshot['snapshot_date'], as_of)
+            )
+            return snapshot['balance'] + cursor.fetchone()['movement']
+        
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(amount), 0) AS movement FROM card_ledger
+            WHERE card_id = %s AND effective_date <= %s
+            """,
+            (card_id, as_of)
+        )
+        return cursor.fetchone()['movement']
+
+    @staticmethod
+    def get_balance_at(card_id, user_id, as_of):
+        """Card balance at the end of `as_of`, or None if the card is not the user's."""
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT id FROM cards WHERE id = %s AND user_id = %s", (card_id, user_id))
+            if not cursor.fetchone():
+                return None
+            
+            return CardLedger._balance_at(cursor, card_id, CardLedger._as_date(as_of))
+            
+        except Exception as e:
+            print(f"Error getting balance at date: {e}")
+            return None
+            
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def get_statement_balances(card_id, start_date, end_date):
+        """(opening, closing) balance for a statement period."""
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        
+        try:
+            start_date = CardLedger._as_date(start_date)
+            opening = CardLedger._balance_at(cursor, card_id, start_date - timedelta(days=1))
+            closing = CardLedger._balance_at(cursor, card_id, CardLedger._as_date(end_date))
+            return opening, closing
+            
+        except Exception as e:
+            print(f"Error getting statement balances: {e}")
+            return None
+            
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def take_snapshots(as_of=None):
+        """Snapshot every card's balance at the end of `as_of` (yesterday by default).
+
+        Each snapshot is the previous snapshot plus the ledger entries since,
+        so a run only reads the entries added since the last one. Returns
+        the number of rows written, or None on failure.
+        """
+        as_of = CardLedger._as_date(as_of or date.today() - timedelta(days=1))
+        if as_of >= date.today():
+            # Today's entries are still arriving and are never invalidated
+            raise ValueError('Snapshots can only be taken for past dates')
+        
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                """
+                INSERT INTO card_balance_snapshots (card_id, snapshot_date, balance)
+                SELECT c.id, %(as_of)s,
+                       COALESCE(prev.balance, 0) + COALESCE((
+                           SELECT SUM(l.amount) FROM card_ledger l
+                           WHERE l.card_id = c.id
+                             AND l.effective_date > COALESCE(prev.snapshot_date, '1000-01-01')
+                             AND l.effective_date <= %(as_of)s
+                       ), 0)
+                FROM cards c
+                LEFT JOIN card_balance_snapshots prev
+                  ON prev.card_id = c.id
+                 AND prev.snapshot_date = (
+                     SELECT MAX(s.snapshot_date) FROM card_balance_snapshots s
+                     WHERE s.card_id = c.id AND s.snapshot_date < %(as_of)s
+                 )
+                ON DUPLICATE KEY UPDATE balance = VALUES(balance)
+                """,
+                {'as_of': as_of}
+            )
+            conn.commit()
+            return cursor.rowcount
+            
+        except Exception as e:
+            print(f"Error taking balance snapshots: {e}")
+            conn.rollback()
+            return None
+            
+        finally:
+            close_db_connection(conn, cursor)
@@ -0,0 +1,78 @@
+from app.utils.database import get_db_connection, close_db_connection
+
+class SpendingRollup:
+    """Daily spending totals per user, category and card (daily_spending).
+
+    Write paths call apply() with their own cursor so the rollup changes in
+    the same transaction as the transactions rows it summarises.
+    """
+
+    @staticmethod
+    def apply(cursor, user_id, deltas):
+        """deltas: (spend_date, category, card_id, amount_usd, amount_npr, count), signed."""
+        merged = {}
+        for spend_date, category, card_id, amount_usd, amount_npr, count in deltas:
+            key = (spend_date, category or '', card_id)
+            usd, npr, total = merged.get(key, (0, 0, 0))
+            merged[key] = (usd + amount_usd, npr + amount_npr, total + count)
+        if not merged:
+            return
+        
+        cursor.executemany(
+            """
+            INSERT INTO daily_spending
+            (user_id, spend_date, category, card_id, amount_usd, amount_npr, transaction_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                amount_usd = amount_usd + VALUES(amount_usd),
+                amount_npr = amount_npr + VALUES(amount_npr),
+                transaction_count = transaction_count + VALUES(transaction_count)
+            """,
+            [
+                (user_id, spend_date, category, card_id, usd, npr, count)
+                for (spend_date, category, card_id), (usd, npr, count) in merged.items()
+            ]
+        )
+        
+        if any(count < 0 for _, _, count in merged.values()):
+            cursor.execute(
+                "DELETE FROM daily_spending WHERE user_id = %s AND transaction_count <= 0",
+                (user_id,)
+            )
+
+    @staticmethod
+    def rebuild(user_id=None):
+        """Recompute the rollup from transactions for one user, or everyone."""
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        
+        try:
+            where = " WHERE user_id = %s" if user_id else ""
+            params = (user_id,) if user_id else ()
+            
+            cursor.execute(f"DELETE FROM daily_spending{where}", params)
+            cursor.execute(
+                f"""
+                INSERT INTO daily_spending
+                (user_id, spend_date, category, card_id, amount_usd, amount_npr, transaction_count)
+                SELECT user_id, transaction_date, COALESCE(category, ''), card_id,
+                       SUM(amount_usd), SUM(amount_npr), COUNT(*)
+                FROM transactions{where}
+                GROUP BY user_id, transaction_date, COALESCE(category, ''), card_id
+                """,
+                params
+            )
+            count = cursor.rowcount
+            conn.commit()
+            return count
+            
+        except Exception as e:
+            print(f"Error rebuilding spending rollup: {e}")
+            conn.rollback()
+            return None
+            
+        finally:
+            close_db_connection(conn, cursor)
@@ -1,4 +1,5 @@
 from app.utils.database import get_db_connection, close_db_connection
+from app.utils.cache import invalidate_dashboard
 from datetime import datetime, timedelta
 
 class Subscription:
@@ -36,6 +37,7 @@ class Subscription:
             
             subscription_id = cursor.lastrowid
             conn.commit()
+            invalidate_dashboard(user_id, 'active_subscriptions', 'subscription_summary')
             
             return Subscription.get_subscription_by_id(subscription_id, user_id)
             
@@ -48,7 +50,7 @@ class Subscription:
             close_db_connection(conn, cursor)
 
     @staticmethod
-    def get_user_subscriptions(user_id, status=None):
+    def get_user_subscriptions(user_id, status=None, limit=None):
         conn = get_db_connection()
         if not conn:
             return []
@@ -70,6 +72,10 @@ class Subscription:
             
             query += " ORDER BY s.next_billing_date ASC"
             
+            if limit:
+                query += " LIMIT %s"
+                params.append(limit)
+            
             cursor.execute(query, tuple(params))
             subscriptions = cursor.fetchall()
             
@@ -148,6 +154,7 @@ class Subscription:
             )
             
             conn.commit()
+            invalidate_dashboard(user_id, 'active_subscriptions', 'subscription_summary')
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -177,6 +184,7 @@ class Subscription:
             )
             
             conn.commit()
+            invalidate_dashboard(user_id, 'active_subscriptions', 'subscription_summary')
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -206,6 +214,7 @@ class Subscription:
             )
             
             conn.commit()
+            invalidate_dashboard(user_id, 'active_subscriptions')
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -227,44 +236,43 @@ class Subscription:
         try:
             cursor.execute(
                 """
-                SELECT * FROM subscriptions 
+                SELECT COUNT(*) AS total_subscriptions,
+                       SUM(CASE billing_cycle
+                           WHEN 'monthly' THEN amount_usd
+                           WHEN 'yearly' THEN amount_usd / 12
+                           WHEN 'weekly' THEN amount_usd * 4.33
+                           WHEN 'quarterly' THEN amount_usd / 3
+                           ELSE 0 END) AS monthly_cost,
+                       SUM(CASE billing_cycle
+                           WHEN 'monthly' THEN amount_usd * 12
+                           WHEN 'yearly' THEN amount_usd
+                           WHEN 'weekly' THEN amount_usd * 52
+                           WHEN 'quarterly' THEN amount_usd * 4
+                           ELSE 0 END) AS yearly_cost
+                FROM subscriptions 
                 WHERE user_id = %s AND status IN ('active', 'trial')
                 """,
                 (user_id,)
             )
             
-            subscriptions = cursor.fetchall()
-            
-            monthly_cost = 0
-            yearly_cost = 0
-            
-            for sub in subscriptions:
-                amount = sub['amount_usd']
-                cycle = sub['billing_cycle']
-                
-                if cycle == 'monthly':
-                    monthly_cost += amount
-                    yearly_cost += amount * 12
-                elif cycle == 'yearly':
-                    yearly_cost += amount
-                    monthly_cost += amount / 12
-                elif cycle == 'weekly':
-                    monthly_cost += amount * 4.33
-                    yearly_cost += amount * 52
-                elif cycle == 'quarterly':
-                    monthly_cost += amount / 3
-                    yearly_cost += amount * 4
+            totals = cursor.fetchone()
             
             today = datetime.now().date()
-            trials_ending_soon = [
-                sub for sub in subscriptions 
-                if sub['trial_end_date'] and (sub['trial_end_date'] - today).days <= 7
-            ]
+            cursor.execute(
+                """
+                SELECT * FROM subscriptions 
+                WHERE user_id = %s AND status IN ('active', 'trial')
+                  AND trial_end_date IS NOT NULL AND trial_end_date <= %s
+                """,
+                (user_id, today + timedelta(days=7))
+            )
+            
+            trials_ending_soon = cursor.fetchall()
             
             return {
-                'total_subscriptions': len(subscriptions),
-                'monthly_cost_usd': round(monthly_cost, 2),
-                'yearly_cost_usd': round(yearly_cost, 2),
+                'total_subscriptions': totals['total_subscriptions'],
+                'monthly_cost_usd': round(totals['monthly_cost'] or 0, 2),
+                'yearly_cost_usd': round(totals['yearly_cost'] or 0, 2),
                 'trials_ending_soon': len(trials_ending_soon),
                 'trial_details': trials_ending_soon
             }
@@ -1,6 +1,120 @@
-from app.utils.database import get_db_connection, close_db_connection
-from app.services.exchange_rate import get_latest_exchange_rate
-from datetime import datetime
+import pymysql
+from app.utils.database import get_db_connection, close_db_connection, get_pool
+from app.utils.cache import invalidate_dashboard
+from app.models.ledger import CardLedger
+from app.models.spending_rollup import SpendingRollup
+from app.services.exchange_rate import get_exchange_rate_for_date
+from app.services.events import publish_event
+from app.utils.pagination import encode_cursor, decode_cursor
+from datetime import datetime, date, timedelta
+
+# Columns the list endpoint may project with ?fields=
+TRANSACTION_FIELDS = {
+    'id': 't.id',
+    'card_id': 't.card_id',
+    'transaction_type': 't.transaction_type',
+    'merchant_name': 't.merchant_name',
+    'amount_usd': 't.amount_usd',
+    'amount_npr': 't.amount_npr',
+    'exchange_rate': 't.exchange_rate',
+    'category': 't.category',
+    'description': 't.description',
+    'transaction_date': 't.transaction_date',
+    'is_recurring': 't.is_recurring',
+    'card_name': 'c.card_name',
+    'last_four_digits': 'c.last_four_digits'
+}
+
+# Columns written by the export, in file order
+EXPORT_FIELDS = [
+    'id', 'transaction_date', 'card_id', 'card_name', 'transaction_type', 'merchant_name',
+    'category', 'amount_usd', 'amount_npr', 'exchange_rate', 'description', 'is_recurring'
+]
+
+# Start of the bucket a day falls in, written without DATE_FORMAT so the
+# SQL carries no literal % next to the driver's placeholders
+TIMESERIES_BUCKETS = {
+    'day': "d.spend_date",
+    'week': "DATE_SUB(d.spend_date, INTERVAL WEEKDAY(d.spend_date) DAY)",
+    'month': "DATE_SUB(d.spend_date, INTERVAL DAYOFMONTH(d.spend_date) - 1 DAY)"
+}
+
+def bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+def bucket_range(start_date, end_date, interval):
+    buckets = []
+    current = bucket_start(start_date, interval)
+    while current <= end_date:
+        buckets.append(current)
+        if interval == 'month':
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=7 if interval == 'week' else 1)
+    return buckets
+
+def _filter_clause(filters):
+    clause = ""
+    params = []
+    if filters:
+        if 'card_id' in filters:
+            clause += " AND t.card_id = %s"
+            params.append(filters['card_id'])
+        
+        if 'category' in filters:
+            clause += " AND t.category = %s"
+            params.append(filters['category'])
+        
+        if 'transaction_type' in filters:
+            clause += " AND t.transaction_type = %s"
+            params.append(filters['transaction_type'])
+        
+        if 'start_date' in filters:
+            clause += " AND t.transaction_date >= %s"
+            params.append(filters['start_date'])
+        
+        if 'end_date' in filters:
+            clause += " AND t.transaction_date <= %s"
+            params.append(filters['end_date'])
+    return clause, params
+
+class ExportStream:
+    """Rows of an export query; releases its pooled connection once
+    exhausted or closed, whichever comes first."""
+
+    def __init__(self, pool, connection, cursor, batch_size):
+        self._pool = pool
+        self._connection = connection
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._released = False
+
+    def __iter__(self):
+        while not self._released:
+            batch = self._cursor.fetchmany(self._batch_size)
+            if not batch:
+                self._release(finished=True)
+                break
+            yield from batch
+
+    def _release(self, finished):
+        if self._released:
+            return
+        self._released = True
+        if finished:
+            self._cursor.close()
+            self._pool.release(self._connection)
+        else:
+            # Closing an unread server-side cursor would pull every remaining
+            # row off the wire, so drop the connection instead
+            self._pool.release(self._connection, discard=True)
+
+    def close(self):
+        self._release(finished=False)
 
 class Transaction:
     """Handles transaction-related database operations."""
@@ -28,7 +142,7 @@ class Transaction:
                 }    
 
 
-            exchange_rate = get_latest_exchange_rate()
+            exchange_rate = get_exchange_rate_for_date(transaction_data['transaction_date'])
             amount_usd = float(transaction_data['amount_usd'])
             amount_npr = amount_usd * exchange_rate
             cursor.execute(
@@ -61,13 +175,32 @@ class Transaction:
                     "UPDATE cards SET current_balance = current_balance + %s WHERE id = %s",
                     (amount, transaction_data['card_id'])
                 )
+                CardLedger.record(cursor, transaction_data['card_id'], user_id, 'refund', amount,
+                                  transaction_data['transaction_date'], transaction_id)
             else:
                 cursor.execute(
                     "UPDATE cards SET current_balance = current_balance - %s WHERE id = %s",
                     (amount, transaction_data['card_id'])
                 )
+                CardLedger.record(cursor, transaction_data['card_id'], user_id, 'purchase', -amount,
+                                  transaction_data['transaction_date'], transaction_id)
+            
+            SpendingRollup.apply(cursor, user_id, [(
+                transaction_data['transaction_date'],
+                transaction_data['category'],
+                transaction_data['card_id'],
+                amount_usd,
+                amount_npr,
+                1
+            )])
             
             conn.commit()
+            invalidate_dashboard(user_id, 'cards', 'recent_transactions', 'spending_summary')
+            publish_event(user_id, 'transaction', {
+                'action': 'created',
+                'transaction_id': transaction_id,
+                'card_id': transaction_data['card_id']
+            })
             
             return Transaction.get_transaction_by_id(transaction_id, user_id)
             
@@ -94,27 +227,9 @@ class Transaction:
                 JOIN cards c ON t.card_id = c.id
                 WHERE t.user_id = %s
             """
-            params = [user_id]
-            if filters:
-                if 'card_id' in filters:
-                    query += " AND t.card_id = %s"
-                    params.append(filters['card_id'])
-                
-                if 'category' in filters:
-                    query += " AND t.category = %s"
-                    params.append(filters['category'])
-                
-                if 'transaction_type' in filters:
-                    query += " AND t.transaction_type = %s"
-                    params.append(filters['transaction_type'])
-                
-                if 'start_date' in filters:
-                    query += " AND t.transaction_date >= %s"
-                    params.append(filters['start_date'])
-                
-                if 'end_date' in filters:
-                    query += " AND t.transaction_date <= %s"
-                    params.append(filters['end_date'])
+            clause, params = _filter_clause(filters)
+            query += clause
+            params = [user_id] + params
             
             query += " ORDER BY t.transaction_date DESC"
             
@@ -128,6 +243,117 @@ class Transaction:
         finally:
             close_db_connection(conn, cursor)
 
+    @staticmethod
+    def get_user_transactions_page(user_id, filters=None, limit=50, cursor=None, fields=None):
+        """Keyset-paginated transactions, newest first.
+
+        Returns (transactions, next_cursor). The cursor is an opaque token
+        encoding the (transaction_date, id) of the last row returned;
+        next_cursor is None on the last page. `fields` restricts the
+        selected columns to a subset of TRANSACTION_FIELDS.
+        """
+        if fields:
+            unknown = [field for field in fields if field not in TRANSACTION_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            # The keyset columns are always needed to build the next cursor
+            columns = list(dict.fromkeys(['id', 'transaction_date', *fields]))
+            select = ", ".join(f"{TRANSACTION_FIELDS[field]} AS {field}" for field in columns)
+            needs_card = any(TRANSACTION_FIELDS[field].startswith('c.') for field in columns)
+        else:
+            select = "t.*, c.card_name, c.last_four_digits"
+            needs_card = True
+        
+        after = None
+        if cursor:
+            after_date, after_id = decode_cursor(cursor, 2)
+            try:
+                after = (datetime.strptime(after_date, '%Y-%m-%d').date(), int(after_id))
+            except ValueError:
+                raise ValueError('Invalid cursor')
+        
+        conn = get_db_connection()
+        if not conn:
+            return [], None
+        
+        db_cursor = conn.cursor()
+        
+        try:
+            query = f"SELECT {select} FROM transactions t"
+            if needs_card:
+                query += " JOIN cards c ON t.card_id = c.id"
+            query += " WHERE t.user_id = %s"
+            
+            clause, params = _filter_clause(filters)
+            query += clause
+            params = [user_id] + params
+            
+            if after:
+                query += " AND (t.transaction_date < %s OR (t.transaction_date = %s AND t.id < %s))"
+                params.extend([after[0], after[0], after[1]])
+            
+            # Fetch one extra row to know whether another page exists
+            query += " ORDER BY t.transaction_date DESC, t.id DESC LIMIT %s"
+            params.append(limit + 1)
+            
+            db_cursor.execute(query, tuple(params))
+            transactions = db_cursor.fetchall()
+            
+            next_cursor = None
+            if len(transactions) > limit:
+                transactions = transactions[:limit]
+                last = transactions[-1]
+                next_cursor = encode_cursor(last['transaction_date'], last['id'])
+            
+            return transactions, next_cursor
+            
+        except Exception as e:
+            print(f"Error getting transactions page: {e}")
+            return [], None
+            
+        finally:
+            close_db_connection(conn, db_cursor)
+
+    @staticmethod
+    def stream_user_transactions(user_id, filters=None, batch_size=1000):
+        """Start an export query and return an iterator over its rows.
+
+        Rows come from an unbuffered server-side cursor, so memory stays flat
+        however many rows match and the first row is available before MySQL
+        has finished the scan. The query runs on its own pooled connection,
+        outside the request's unit of work, because the response body is
+        produced after the request has been torn down. Returns None if the
+        query could not be started.
+        
+        The caller must close() the returned stream (Response.call_on_close)
+        so the connection goes back to the pool even when the body is never
+        iterated, e.g. for HEAD requests or clients that hang up early.
+        """
+        pool = get_pool()
+        try:
+            conn = pool.acquire()
+        except Exception as e:
+            print(f"Error connecting to MySQL: {e}")
+            return None
+        
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            query = f"""
+                SELECT {', '.join(TRANSACTION_FIELDS[field] + ' AS ' + field for field in EXPORT_FIELDS)}
+                FROM transactions t
+                JOIN cards c ON t.card_id = c.id
+                WHERE t.user_id = %s
+            """
+            clause, params = _filter_clause(filters)
+            query += clause + " ORDER BY t.transaction_date DESC, t.id DESC"
+            cursor.execute(query, tuple([user_id] + params))
+        except Exception as e:
+            print(f"Error starting transaction export: {e}")
+            pool.release(conn, discard=True)
+            return None
+        
+        return ExportStream(pool, conn, cursor, batch_size)
+
     @staticmethod
     def get_transaction_by_id(transaction_id, user_id):
         conn = get_db_connection()
@@ -165,48 +391,58 @@ class Transaction:
         cursor = conn.cursor()
         
         try:
-            query = "SELECT * FROM transactions WHERE user_id = %s"
+            # Reads the daily rollup, so the cost grows with days x categories
+            # x cards in the range rather than with the number of transactions
+            query = """
+                SELECT category, card_id,
+                       GROUPING(category) AS all_categories, GROUPING(card_id) AS all_cards,
+                       SUM(amount_usd) AS usd, SUM(amount_npr) AS npr,
+                       CAST(SUM(transaction_count) AS SIGNED) AS count
+                FROM daily_spending
+                WHERE user_id = %s
+            """
             params = [user_id]
             
             if start_date:
-                query += " AND transaction_date >= %s"
+                query += " AND spend_date >= %s"
                 params.append(start_date)
             
             if end_date:
-                query += " AND transaction_date <= %s"
+                query += " AND spend_date <= %s"
                 params.append(end_date)
             
-            cursor.execute(query, tuple(params))
-            transactions = cursor.fetchall()
+            # One row per (category, card) plus a subtotal per category and a
+            # grand total, so only the aggregates ever leave the database.
+            # Subtotal rows are recognised with GROUPING() (MySQL 8.0+), not by
+            # NULL values.
+            query += " GROUP BY category, card_id WITH ROLLUP"
             
-            # Calculate totals
-            total_usd = sum(t['amount_usd'] for t in transactions)
-            total_npr = sum(t['amount_npr'] for t in transactions)
+            cursor.execute(query, tuple(params))
+            rows = cursor.fetchall()
             
-            # By category
+            total = {'usd': 0, 'npr': 0, 'count': 0}
             by_category = {}
-            for t in transactions:
-                cat = t['category']
-                if cat not in by_category:
-                    by_category[cat] = {'usd': 0, 'npr': 0, 'count': 0}
-                by_category[cat]['usd'] += t['amount_usd']
-                by_category[cat]['npr'] += t['amount_npr']
-                by_category[cat]['count'] += 1
-            
-            # By card
             by_card = {}
-            for t in transactions:
-                card_id = t['card_id']
-                if card_id not in by_card:
-                    by_card[card_id] = {'usd': 0, 'npr': 0, 'count': 0}
-                by_card[card_id]['usd'] += t['amount_usd']
-                by_card[card_id]['npr'] += t['amount_npr']
-                by_card[card_id]['count'] += 1
+            
+            for row in rows:
+                amounts = {'usd': row['usd'], 'npr': row['npr'], 'count': row['count']}
+                
+                if row['all_categories']:
+                    total = amounts
+                elif row['all_cards']:
+                    by_category[row['category']] = amounts
+                else:
+                    card_id = row['card_id']
+                    if card_id not in by_card:
+                        by_card[card_id] = {'usd': 0, 'npr': 0, 'count': 0}
+                    by_card[card_id]['usd'] += row['usd']
+                    by_card[card_id]['npr'] += row['npr']
+                    by_card[card_id]['count'] += row['count']
             
             return {
-                'total_usd': total_usd,
-                'total_npr': total_npr,
-                'transaction_count': len(transactions),
+                'total_usd': total['usd'],
+                'total_npr': total['npr'],
+                'transaction_count': total['count'],
                 'by_category': by_category,
                 'by_card': by_card
             }
@@ -218,6 +454,73 @@ class Transaction:
         finally:
             close_db_connection(conn, cursor)
 
+    @staticmethod
+    def get_spending_timeseries(user_id, start_date, end_date, interval='day', group_by=None):
+        """Spending per day/week/month between two dates, from the daily rollup.
+
+        Returns {'buckets': [...], 'series': [...]} where every series has one
+        value per bucket, zero-filled, in bucket order. group_by splits the
+        series by 'category' or 'card'; otherwise there is a single 'total'.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        
+        try:
+            bucket = TIMESERIES_BUCKETS[interval]
+            if group_by == 'category':
+                key, label, join = "d.category", "d.category", ""
+            elif group_by == 'card':
+                key, label, join = "d.card_id", "c.card_name", " LEFT JOIN cards c ON c.id = d.card_id"
+            else:
+                key, label, join = "'total'", "'total'", ""
+            
+            cursor.execute(
+                f"""
+                SELECT {bucket} AS bucket, {key} AS series_key, {label} AS label,
+                       SUM(d.amount_usd) AS usd, SUM(d.amount_npr) AS npr,
+                       CAST(SUM(d.transaction_count) AS SIGNED) AS count
+                FROM daily_spending d{join}
+                WHERE d.user_id = %s AND d.spend_date >= %s AND d.spend_date <= %s
+                GROUP BY bucket, series_key, label
+                """,
+                (user_id, start_date, end_date)
+            )
+            rows = cursor.fetchall()
+            
+            buckets = bucket_range(start_date, end_date, interval)
+            position = {day: index for index, day in enumerate(buckets)}
+            series = {}
+            
+            for row in rows:
+                if row['series_key'] not in series:
+                    series[row['series_key']] = {
+                        'key': row['series_key'],
+                        'label': row['label'],
+                        'usd': [0.0] * len(buckets),
+                        'npr': [0.0] * len(buckets),
+                        'count': [0] * len(buckets)
+                    }
+                entry = series[row['series_key']]
+                index = position[bucket_start(row['bucket'], interval)]
+                entry['usd'][index] = float(row['usd'])
+                entry['npr'][index] = float(row['npr'])
+                entry['count'][index] = row['count']
+            
+            return {
+                'buckets': [day.isoformat() for day in buckets],
+                'series': sorted(series.values(), key=lambda entry: -sum(entry['usd']))
+            }
+            
+        except Exception as e:
+            print(f"Error getting spending timeseries: {e}")
+            return None
+            
+        finally:
+            close_db_connection(conn, cursor)
+
     @staticmethod
     def delete_transaction(transaction_id, user_id):
         conn = get_db_connection()
@@ -228,7 +531,10 @@ class Transaction:
         
         try:
             cursor.execute(
-                "SELECT card_id, amount_usd FROM transactions WHERE id = %s AND user_id = %s",
+                """
+                SELECT card_id, amount_usd, amount_npr, category, transaction_type, transaction_date
+                FROM transactions WHERE id = %s AND user_id = %s
+                """,
                 (transaction_id, user_id)
             )
             transaction = cursor.fetchone()
@@ -241,16 +547,42 @@ class Transaction:
                 (transaction_id, user_id)
             )
             
+            # Undo exactly what add_transaction applied: refunds had added to
+            # the balance, everything else had been taken from it
+            if transaction['transaction_type'] == 'refund':
+                reversal = -transaction['amount_usd']
+            else:
+                reversal = transaction['amount_usd']
+            
             cursor.execute(
                 """
                 UPDATE cards 
-                SET current_balance = current_balance - %s 
+                SET current_balance = current_balance + %s 
                 WHERE id = %s
                 """,
-                (transaction['amount_usd'], transaction['card_id'])
+                (reversal, transaction['card_id'])
             )
             
+            # Dated like the original entry so historical balances no longer include it
+            CardLedger.record(cursor, transaction['card_id'], user_id, 'reversal', reversal,
+                              transaction['transaction_date'], transaction_id)
+            
+            SpendingRollup.apply(cursor, user_id, [(
+                transaction['transaction_date'],
+                transaction['category'],
+                transaction['card_id'],
+                -transaction['amount_usd'],
+                -transaction['amount_npr'],
+                -1
+            )])
+            
             conn.commit()
+            invalidate_dashboard(user_id, 'cards', 'recent_transactions', 'spending_summary')
+            publish_event(user_id, 'transaction', {
+                'action': 'deleted',
+                'transaction_id': transaction_id,
+                'card_id': transaction['card_id']
+            })
             return True
             
         except Exception as e:
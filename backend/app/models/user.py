@@ -1,11 +1,15 @@
-import bcrypt
-from app.utils.database import get_db_connection, close_db_connection
+from app.utils.database import get_db_connection, close_db_connection, get_pool
+from app.utils.passwords import get_password_hasher, PasswordHasherBusy
 import secrets
 
 class User:
 
     @staticmethod
     def create_user(email, password, full_name):
+        # Hash before checking out a connection so it is not held while
+        # bcrypt runs; PasswordHasherBusy propagates to the route
+        password_hash = get_password_hasher().hash(password)
+        
         conn = get_db_connection()
         if not conn:
             return None
@@ -17,8 +21,6 @@ class User:
             if cursor.fetchone():
                 return {'error': 'Email already exists'}
             
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-            
             verification_token = secrets.token_urlsafe(32)
 
             cursor.execute(
@@ -46,20 +48,27 @@ class User:
         finally:
             close_db_connection(conn, cursor)
 
+    @staticmethod
+    def _get_login_row(email):
+        # Read on a connection of its own and hand it straight back, so no
+        # pooled connection (nor the request's unit of work) is held while
+        # bcrypt runs
+        pool = get_pool()
+        conn = pool.acquire()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT id, email, password_hash, full_name, is_verified FROM users WHERE email = %s",
+                    (email,)
+                )
+                return cursor.fetchone()
+        finally:
+            pool.release(conn)
+
     @staticmethod
     def verify_password(email, password):
-        conn = get_db_connection()
-        if not conn:
-            return None
-        
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute(
-                "SELECT id, email, password_hash, full_name, is_verified FROM users WHERE email = %s",
-                (email,)
-            )
-            user = cursor.fetchone()
+            user = User._get_login_row(email)
             
             if not user:
                 return None  # User not found
@@ -67,20 +76,48 @@ class User:
             if not user['is_verified']:
                 return {'error': 'Please verify your email before logging in'}
             
-            if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                return {
-                    'id': user['id'],
-                    'email': user['email'],
-                    'full_name': user['full_name'],
-                    'is_verified': user['is_verified']
-                }
-            else:
+            hasher = get_password_hasher()
+            if not hasher.check(password, user['password_hash']):
                 return None  # Wrong password
                 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             print(f"Error verifying password: {e}")
             return None
-            
+        
+        if hasher.needs_rehash(user['password_hash']):
+            User._rehash_password(user, password)
+        return {
+            'id': user['id'],
+            'email': user['email'],
+            'full_name': user['full_name'],
+            'is_verified': user['is_verified']
+        }
+
+    @staticmethod
+    def _rehash_password(user, password):
+        """Upgrade a hash made with an old BCRYPT_ROUNDS; a failure never blocks the login."""
+        try:
+            new_hash = get_password_hasher().hash(password)
+        except PasswordHasherBusy:
+            return  # try again on the next login
+        
+        conn = get_db_connection()
+        if not conn:
+            return
+        
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s",
+                (new_hash, user['id'], user['password_hash'])
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"Error rehashing password: {e}")
+            conn.rollback()
         finally:
             close_db_connection(conn, cursor)
 
@@ -0,0 +1,83 @@
+from flask import Blueprint, request, jsonify
+from app.services import alert_service
+from app.utils.auth import token_required
+from app.utils.pagination import parse_page_size
+
+bp = Blueprint('alerts', __name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+@bp.route('', methods=['GET'])
+@token_required
+def get_alerts(user_id):
+    try:
+        try:
+            limit = parse_page_size(request.args.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+            alerts, next_cursor = alert_service.get_user_alerts(
+                user_id,
+                unread_only=request.args.get('unread', 'false').lower() == 'true',
+                limit=limit,
+                cursor=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'alerts': alerts,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), 200
+        
+    except Exception as e:
+        print(f"Get alerts error: {e}")
+        return jsonify({'error': 'Failed to get alerts'}), 500
+
+@bp.route('/unread-count', methods=['GET'])
+@token_required
+def get_unread_count(user_id):
+    try:
+        return jsonify({'unread_count': alert_service.get_unread_count(user_id)}), 200
+        
+    except Exception as e:
+        print(f"Unread count error: {e}")
+        return jsonify({'error': 'Failed to get unread count'}), 500
+
+@bp.route('/<int:alert_id>/read', methods=['POST'])
+@token_required
+def mark_alert_as_read(user_id, alert_id):
+    try:
+        if not alert_service.mark_alert_as_read(alert_id, user_id):
+            return jsonify({'error': 'Failed to mark alert as read'}), 500
+        
+        return jsonify({'message': 'Alert marked as read'}), 200
+        
+    except Exception as e:
+        print(f"Mark alert read error: {e}")
+        return jsonify({'error': 'Failed to mark alert as read'}), 500
+
+@bp.route('/read-all', methods=['POST'])
+@token_required
+def mark_all_alerts_as_read(user_id):
+    try:
+        if not alert_service.mark_all_alerts_as_read(user_id):
+            return jsonify({'error': 'Failed to mark alerts as read'}), 500
+        
+        return jsonify({'message': 'All alerts marked as read'}), 200
+        
+    except Exception as e:
+        print(f"Mark all alerts read error: {e}")
+        return jsonify({'error': 'Failed to mark alerts as read'}), 500
+
+@bp.route('/<int:alert_id>', methods=['DELETE'])
+@token_required
+def delete_alert(user_id, alert_id):
+    try:
+        if not alert_service.delete_alert(alert_id, user_id):
+            return jsonify({'error': 'Alert not found'}), 404
+        
+        return jsonify({'message': 'Alert deleted successfully'}), 200
+        
+    except Exception as e:
+        print(f"Delete alert error: {e}")
+        return jsonify({'error': 'Failed to delete alert'}), 500
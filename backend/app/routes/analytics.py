@@ -1,33 +1,64 @@
 from flask import Blueprint, request, jsonify
-from app.models.transaction import Transaction
+from app.models.transaction import Transaction, bucket_start
 from app.models.card import Card
 from app.models.subscription import Subscription
 from app.utils.auth import token_required
+from app.utils.concurrency import run_concurrently
+from app.utils.cache import get_cache, dashboard_key, dashboard_range, load_cacheable
 
 bp = Blueprint('analytics', __name__)
 
+MAX_TIMESERIES_BUCKETS = 1000
+
 @bp.route('/dashboard', methods=['GET'])
 @token_required
 def get_dashboard_data(user_id):
     try:
-        cards = Card.get_user_cards(user_id)
+        start_of_month, today = dashboard_range()
         
-        all_transactions = Transaction.get_user_transactions(user_id)
-        recent_transactions = all_transactions[:10] if all_transactions else []
+        # Each section is a small targeted query; none of them depends on
+        # another, so cache misses run side by side on separate pooled
+        # connections.
+        loaders = {
+            'cards': lambda: Card.get_user_cards(user_id),
+            'recent_transactions': lambda: Transaction.get_user_transactions_page(user_id, limit=10)[0],
+            'spending_summary': lambda: Transaction.get_spending_summary(
+                user_id,
+                start_date=start_of_month.isoformat(),
+                end_date=today.isoformat()
+            ),
+            'active_subscriptions': lambda: Subscription.get_user_subscriptions(user_id, status='active', limit=5),
+            'subscription_summary': lambda: Subscription.get_subscription_summary(user_id)
+        }
         
-        from datetime import datetime, date
-        today = date.today()
-        start_of_month = date(today.year, today.month, 1)
+        # The summary's key carries its date range, so a new day or month
+        # never reuses the previous one
+        keys = {section: dashboard_key(user_id, section) for section in loaders}
+        keys['spending_summary'] = dashboard_key(user_id, 'spending_summary', start_of_month, today)
         
-        spending_summary = Transaction.get_spending_summary(
-            user_id,
-            start_date=start_of_month.isoformat(),
-            end_date=today.isoformat()
-        )
+        cache = get_cache()
+        results = {}
+        for section in loaders:
+            cached = cache.get(keys[section])
+            if cached is not None:
+                results[section] = cached
         
-        active_subscriptions = Subscription.get_user_subscriptions(user_id, status='active')
+        missing = {
+            section: lambda loader=loader: load_cacheable(loader)
+            for section, loader in loaders.items() if section not in results
+        }
+        if missing:
+            loaded = run_concurrently(missing)
+            for section, (value, cacheable) in loaded.items():
+                if cacheable:
+                    cache.set(keys[section], value)
+                results[section] = value
         
-        subscription_summary = Subscription.get_subscription_summary(user_id)
+        cards = results['cards']
+        recent_transactions = results['recent_transactions']
+        spending_summary = results['spending_summary']
+        active_subscriptions = results['active_subscriptions']
+        subscription_summary = results['subscription_summary']
         
         total_balance = sum(card['current_balance'] for card in cards)
         total_limit = sum(card['credit_limit'] for card in cards)
@@ -37,7 +68,7 @@ def get_dashboard_data(user_id):
             'cards': cards,
             'recent_transactions': recent_transactions,
             'spending_summary': spending_summary,
-            'active_subscriptions': active_subscriptions[:5],  # Top 5
+            'active_subscriptions': active_subscriptions,  # Top 5
             'subscription_summary': subscription_summary,
             'totals': {
                 'total_balance_usd': total_balance,
@@ -77,4 +108,59 @@ def get_spending_trends(user_id):
         
     except Exception as e:
         print(f"Trends error: {e}")
-        return jsonify({'error': 'Failed to get trends'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to get trends'}), 500
+
+@bp.route('/spending-timeseries', methods=['GET'])
+@token_required
+def get_spending_timeseries(user_id):
+    try:
+        from datetime import datetime, timedelta, date
+        
+        interval = request.args.get('interval', 'day')
+        group_by = request.args.get('group_by') or None
+        
+        if interval not in ('day', 'week', 'month'):
+            return jsonify({'error': 'interval must be day, week or month'}), 400
+        
+        if group_by not in (None, 'category', 'card'):
+            return jsonify({'error': 'group_by must be category or card'}), 400
+        
+        try:
+            end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+                if request.args.get('end_date') else date.today()
+            if request.args.get('start_date'):
+                start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+            elif interval == 'day':
+                start_date = end_date - timedelta(days=29)
+            elif interval == 'week':
+                start_date = end_date - timedelta(weeks=11)
+            else:
+                # The twelve months ending with end_date's month
+                start_date = date(end_date.year - (end_date.month < 12), end_date.month % 12 + 1, 1)
+        except ValueError:
+            return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+        
+        if start_date > end_date:
+            return jsonify({'error': 'start_date must be before end_date'}), 400
+        
+        span_days = (end_date - bucket_start(start_date, interval)).days
+        approx_buckets = {'day': span_days, 'week': span_days // 7, 'month': span_days // 28}[interval] + 1
+        if approx_buckets > MAX_TIMESERIES_BUCKETS:
+            return jsonify({'error': f'Range too large, at most {MAX_TIMESERIES_BUCKETS} {interval} buckets'}), 400
+        
+        timeseries = Transaction.get_spending_timeseries(user_id, start_date, end_date, interval, group_by)
+        
+        if timeseries is None:
+            return jsonify({'error': 'Failed to get spending timeseries'}), 500
+        
+        return jsonify({
+            'interval': interval,
+            'group_by': group_by,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            **timeseries
+        }), 200
+        
+    except Exception as e:
+        print(f"Timeseries error: {e}")
+        return jsonify({'error': 'Failed to get spending timeseries'}), 500
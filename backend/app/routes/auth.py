@@ -1,10 +1,19 @@
 import re
 from flask import Blueprint, request, jsonify
-from app.utils.auth import generate_token, token_required
+from app.config import Config
+from app.utils.auth import generate_token, token_required, get_request_token, revoke_token
+from app.utils.passwords import PasswordHasherBusy
+from app.utils.rate_limit import get_rate_limiter
 from app.services.email_service import send_verification_email
 
 bp = Blueprint('auth', __name__)
 
+def _busy_response():
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @bp.route('/register', methods=['POST'])
 def register():
     from app.models.user import User
@@ -39,11 +48,12 @@ def register():
             return jsonify(result), 400
         
         try:
-            print("Trying to send email")
-            send_verification_email( user_email=result['email'], verification_token=result['verification_token'])
-            print("[DEBUG] Verification email sent")
+            # Queued in the same transaction as the new user; the outbox
+            # workers deliver it after the response has gone out
+            if not send_verification_email(user_email=result['email'], verification_token=result['verification_token']):
+                print("[WARNING] Failed to queue verification email")
         except Exception as email_error:
-            print(f"[WARNING] Failed to send email: {email_error}")
+            print(f"[WARNING] Failed to queue email: {email_error}")
         
         response_data = {
             'message': 'Registration successful! Please check your email to verify your account.',
@@ -54,6 +64,8 @@ def register():
             }
         }
         return jsonify(response_data), 201  
+    except PasswordHasherBusy:
+        return _busy_response()
     except Exception as e:
         print(f"[ERROR] Exception in register endpoint: {e}")
         import traceback
@@ -71,6 +83,18 @@ def login():
         if 'email' not in data or 'password' not in data:
             return jsonify({'error':'Email and password are required'}),400
         
+        # Every attempt counts, so a burst is turned away before it reaches bcrypt
+        limiter = get_rate_limiter()
+        email_key = f"login:email:{str(data['email']).strip().lower()}"
+        retry_after = max(
+            limiter.hit(email_key, Config.LOGIN_RATE_PER_EMAIL, Config.LOGIN_RATE_WINDOW),
+            limiter.hit(f"login:ip:{request.remote_addr}", Config.LOGIN_RATE_PER_IP, Config.LOGIN_RATE_WINDOW)
+        )
+        if retry_after:
+            response = jsonify({'error': 'Too many login attempts, please try again later'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+        
         user = User.verify_password(data['email'], data['password'])
 
         if not user:
@@ -79,6 +103,7 @@ def login():
         if isinstance(user, dict) and 'error' in user:
             return jsonify({'error' : user['error']}), 403
         
+        limiter.reset(email_key)
         token = generate_token(user['id'])
 
         return jsonify({
@@ -86,10 +111,25 @@ def login():
             'token': token,
             'user': {'id': user['id'], 'email':user['email'],'full_name': user['full_name'], 'is_verified': user['is_verified']}
         }), 200
+    except PasswordHasherBusy:
+        return _busy_response()
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'error':'Login failed'}),500
     
+@bp.route('/logout', methods=['POST'])
+@token_required
+def logout(user_id):
+    try:
+        if not revoke_token(get_request_token()):
+            return jsonify({'error': 'Logout failed'}), 500
+        
+        return jsonify({'message': 'Logged out successfully'}), 200
+        
+    except Exception as e:
+        print(f"Logout error: {e}")
+        return jsonify({'error': 'Logout failed'}), 500
+    
 @bp.route('/verify-email', methods=['POST'])
 def verify_email():
     try:
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app.models.card import Card
+from app.models.ledger import CardLedger
 from app.utils.auth import token_required
+from datetime import datetime
 
 bp = Blueprint('cards', __name__)
 
@@ -28,6 +30,29 @@ def get_card(user_id, card_id):
         print(f"Get card error: {e}")
         return jsonify({'error': 'Failed to get card'}), 500
 
+@bp.route('/<int:card_id>/balance', methods=['GET'])
+@token_required
+def get_card_balance_at(user_id, card_id):
+    try:
+        as_of = request.args.get('date')
+        if not as_of:
+            return jsonify({'error': 'date is required'}), 400
+        
+        try:
+            as_of = datetime.strptime(as_of, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+        
+        balance = CardLedger.get_balance_at(card_id, user_id, as_of)
+        
+        if balance is None:
+            return jsonify({'error': 'Card not found'}), 404
+        
+        return jsonify({'card_id': card_id, 'date': as_of.isoformat(), 'balance': balance}), 200
+    except Exception as e:
+        print(f"Get card balance error: {e}")
+        return jsonify({'error': 'Failed to get card balance'}), 500
+
 @bp.route('', methods=['POST'])
 @token_required
 def add_card(user_id):
@@ -0,0 +1,57 @@
+from flask import Blueprint, request, jsonify, Response
+from app.config import Config
+from app.services.events import get_event_broker, format_sse
+from app.utils.auth import token_required, generate_stream_ticket, redeem_stream_ticket
+
+bp = Blueprint('events', __name__)
+
+@bp.route('/ticket', methods=['POST'])
+@token_required
+def create_stream_ticket(user_id):
+    try:
+        return jsonify({'ticket': generate_stream_ticket(user_id), 'expires_in': Config.EVENTS_TICKET_SECONDS}), 200
+
+    except Exception as e:
+        print(f"Stream ticket error: {e}")
+        return jsonify({'error': 'Failed to create stream ticket'}), 500
+
+@bp.route('', methods=['GET'])
+def stream_events():
+    # EventSource cannot send an Authorization header, so the stream is
+    # opened with a single-use ticket from POST /ticket instead of the
+    # login token, which would otherwise end up in access and proxy logs.
+    #
+    # Each open stream occupies one worker thread for as long as the client
+    # stays connected; EVENTS_MAX_CONNECTIONS keeps that to a small share of
+    # the threads (see app/services/events.py).
+    ticket = request.args.get('ticket')
+    if not ticket:
+        return jsonify({'error': 'Stream ticket is missing'}), 401
+
+    user_id = redeem_stream_ticket(ticket)
+    if user_id is None:
+        return jsonify({'error': 'Stream ticket is invalid, expired or already used'}), 401
+
+    subscription = get_event_broker().subscribe(user_id)
+
+    if subscription is None:
+        return jsonify({'error': 'Too many open event streams, retry later'}), 503
+
+    def stream():
+        yield "retry: 5000\nevent: ready\ndata: {}\n\n"
+        while True:
+            event = subscription.get(timeout=Config.EVENTS_HEARTBEAT_SECONDS)
+            if event is None:
+                # Keeps proxies from closing an idle connection and lets
+                # the server notice a client that has gone away
+                yield ": keepalive\n\n"
+            else:
+                yield format_sse(event)
+
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs even if the body is never iterated (HEAD, early disconnect)
+    response.call_on_close(subscription.close)
+    return response
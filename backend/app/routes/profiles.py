@@ -0,0 +1,40 @@
+from flask import Blueprint, Response, jsonify
+from app.utils.auth import token_required
+from app.utils.profiler import allowed_profile_users, get_profile_store
+
+bp = Blueprint('profiles', __name__)
+
+@bp.route('', methods=['GET'])
+@token_required
+def list_profiles(user_id):
+    try:
+        if user_id not in allowed_profile_users():
+            return jsonify({'error': 'Not allowed to view profiles'}), 403
+
+        return jsonify({'profiles': get_profile_store().list()}), 200
+
+    except Exception as e:
+        print(f"List profiles error: {e}")
+        return jsonify({'error': 'Failed to list profiles'}), 500
+
+@bp.route('/<profile_id>', methods=['GET'])
+@token_required
+def download_profile(user_id, profile_id):
+    try:
+        if user_id not in allowed_profile_users():
+            return jsonify({'error': 'Not allowed to view profiles'}), 403
+
+        collapsed = get_profile_store().get(profile_id)
+        if collapsed is None:
+            return jsonify({'error': 'Profile not found'}), 404
+
+        # Collapsed stacks, ready for flamegraph.pl or speedscope
+        return Response(
+            collapsed,
+            mimetype='text/plain',
+            headers={'Content-Disposition': f'attachment; filename="{profile_id}.collapsed"'}
+        )
+
+    except Exception as e:
+        print(f"Download profile error: {e}")
+        return jsonify({'error': 'Failed to download profile'}), 500
@@ -2,10 +2,11 @@ from flask import Blueprint, request, jsonify, send_file
 from app.models.transaction import Transaction
 from app.models.card import Card
 from app.models.user import User
-from app.services.pdf_generator import generate_monthly_statement
+from app.models.ledger import CardLedger
+from app.services.statement_jobs import submit_statement_job, get_statement_job, get_statement_result
 from app.utils.auth import token_required
 from datetime import datetime
-import os
+from io import BytesIO
 
 bp = Blueprint('statements', __name__)
 
@@ -14,16 +15,12 @@ bp = Blueprint('statements', __name__)
 def generate_statement(user_id):
     try:
         data = request.get_json()
-        print(f"Retrieved: {data}")
-        data['card_id'] = int(data['card_id'])
-        data['year'] = int(data['year'])
         if 'card_id' not in data or 'month' not in data or 'year' not in data:
-            print(f"Card id: {data['card_id']}, Month: {data['month']}")
             return jsonify({'error': 'card_id, month, and year are required'}), 400
         
-        card_id = data['card_id']
-        month = data['month']
-        year = data['year']
+        card_id = int(data['card_id'])
+        month = int(data['month'])
+        year = int(data['year'])
         
         user = User.get_user_by_id(user_id)
         
@@ -47,30 +44,79 @@ def generate_statement(user_id):
         
         transactions = Transaction.get_user_transactions(user_id, filters)
         
+        balances = CardLedger.get_statement_balances(card_id, start_date, end_date)
+        if balances is None:
+            return jsonify({'error': 'Failed to generate statement'}), 500
+        opening_balance, closing_balance = balances
+        
         card_data = {
             'card_name': card['card_name'],
-            'current_balance': card['current_balance'],
+            'current_balance': closing_balance,
             'credit_limit': card['credit_limit'],
-            'opening_balance': card['current_balance'] + sum(t['amount_usd'] for t in transactions)
+            'opening_balance': opening_balance
         }
         
         filename = f"statement_{card['card_name']}_{year}_{month:02d}.pdf"
-        output_path = os.path.join(r"C:\Users\D E L L\OneDrive\Desktop\Refined-PyWatch\StatementDownloads", filename)
+        
+        # Rendering happens in the statement process pool; the client polls
+        # the job and downloads the PDF once it is done.
+        job_id = submit_statement_job(user_id, user, transactions, card_data, filename)
+        
+        if not job_id:
+            return jsonify({'error': 'Failed to generate statement'}), 500
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'pending',
+            'status_url': f"/api/statements/jobs/{job_id}",
+            'download_url': f"/api/statements/jobs/{job_id}/download"
+        }), 202
+    
+    except Exception as e:
+        print(f"Generate statement error: {e}")
+        return jsonify({'error': 'Failed to generate statement'}), 500
 
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_statement_status(user_id, job_id):
+    try:
+        job = get_statement_job(job_id, user_id)
         
-        success = generate_monthly_statement(user, transactions, card_data, output_path)
+        if not job:
+            return jsonify({'error': 'Statement job not found'}), 404
         
-        if not success:
+        return jsonify({'job': job}), 200
+    
+    except Exception as e:
+        print(f"Statement status error: {e}")
+        return jsonify({'error': 'Failed to get statement status'}), 500
+
+@bp.route('/jobs/<job_id>/download', methods=['GET'])
+@token_required
+def download_statement(user_id, job_id):
+    try:
+        job = get_statement_job(job_id, user_id)
+        
+        if not job:
+            return jsonify({'error': 'Statement job not found'}), 404
+        
+        if job['status'] == 'failed':
             return jsonify({'error': 'Failed to generate statement'}), 500
         
+        result = get_statement_result(job_id, user_id)
+        
+        if not result:
+            return jsonify({'error': 'Statement is not ready yet', 'status': job['status']}), 409
+        
+        content, filename = result
+        
         return send_file(
-            output_path,
+            BytesIO(content) if isinstance(content, bytes) else content,
             as_attachment=True,
             download_name=filename,
             mimetype='application/pdf'
         )
-        
+    
     except Exception as e:
-        print(f"Generate statement error: {e}")
-        return jsonify({'error': 'Failed to generate statement'}), 500
\ No newline at end of file
+        print(f"Download statement error: {e}")
+        return jsonify({'error': 'Failed to download statement'}), 500
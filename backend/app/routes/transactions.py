@@ -1,39 +1,138 @@
-from flask import Blueprint, request, jsonify
-from app.models.transaction import Transaction
+import csv
+import io
+import json
+from decimal import Decimal
+from flask import Blueprint, request, jsonify, Response
+from app.models.transaction import Transaction, EXPORT_FIELDS
+from app.services.transaction_import import import_transactions as bulk_import, iter_csv_rows, iter_ndjson_rows
 from app.utils.auth import token_required
+from app.utils.pagination import parse_page_size
 from datetime import datetime, date
 
 bp = Blueprint('transactions', __name__)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_FLUSH_ROWS = 500
+IMPORT_ERROR_STATUS = {'too_many_rows': 400, 'conflict': 409, 'database': 500}
+
+def _parse_filters():
+    filters = {}
+    
+    if request.args.get('card_id'):
+        filters['card_id'] = int(request.args.get('card_id'))
+    
+    if request.args.get('category'):
+        filters['category'] = request.args.get('category')
+    
+    if request.args.get('transaction_type'):
+        filters['transaction_type'] = request.args.get('transaction_type')
+    
+    if request.args.get('start_date'):
+        filters['start_date'] = request.args.get('start_date')
+    
+    if request.args.get('end_date'):
+        filters['end_date'] = request.args.get('end_date')
+    
+    return filters
+
 @bp.route('', methods=['GET'])
 @token_required
 def get_transactions(user_id):
     try:
-        filters = {}
-        
-        if request.args.get('card_id'):
-            filters['card_id'] = int(request.args.get('card_id'))
-        
-        if request.args.get('category'):
-            filters['category'] = request.args.get('category')
-        
-        if request.args.get('transaction_type'):
-            filters['transaction_type'] = request.args.get('transaction_type')
-        
-        if request.args.get('start_date'):
-            filters['start_date'] = request.args.get('start_date')
-        
-        if request.args.get('end_date'):
-            filters['end_date'] = request.args.get('end_date')
-        
-        transactions = Transaction.get_user_transactions(user_id, filters)
+        try:
+            filters = _parse_filters()
+            limit = parse_page_size(request.args.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+            fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+            
+            transactions, next_cursor = Transaction.get_user_transactions_page(
+                user_id,
+                filters,
+                limit=limit,
+                cursor=request.args.get('cursor'),
+                fields=fields or None
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({'transactions': transactions}), 200
+        return jsonify({
+            'transactions': transactions,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), 200
         
     except Exception as e:
         print(f"Get transactions error: {e}")
         return jsonify({'error': 'Failed to get transactions'}), 500
 
+def _export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _export_ndjson(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({key: _export_value(value) for key, value in row.items()}))
+        if len(lines) == EXPORT_FLUSH_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+@bp.route('/export', methods=['GET'])
+@token_required
+def export_transactions(user_id):
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+        
+        try:
+            filters = _parse_filters()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        rows = Transaction.stream_user_transactions(user_id, filters)
+        
+        if rows is None:
+            return jsonify({'error': 'Failed to export transactions'}), 500
+        
+        if export_format == 'csv':
+            body, mimetype = _export_csv(rows), 'text/csv'
+        else:
+            body, mimetype = _export_ndjson(rows), 'application/x-ndjson'
+        
+        filename = f"transactions_{date.today().strftime('%Y%m%d')}.{export_format}"
+        response = Response(body, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Let proxies pass chunks through instead of buffering the whole file
+            'X-Accel-Buffering': 'no'
+        })
+        # Runs even if the body is never iterated (HEAD, early disconnect)
+        response.call_on_close(rows.close)
+        return response
+        
+    except Exception as e:
+        print(f"Export transactions error: {e}")
+        return jsonify({'error': 'Failed to export transactions'}), 500
+
 @bp.route('/<int:transaction_id>', methods=['GET'])
 @token_required
 def get_transaction(user_id, transaction_id):
@@ -77,6 +176,43 @@ def add_transaction(user_id):
         print(f"Add transaction error: {e}")
         return jsonify({'error': 'Failed to add transaction'}), 500
 
+@bp.route('/import', methods=['POST'])
+@token_required
+def import_transactions(user_id):
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        name = (upload.filename or '') if upload else ''
+        content_type = (upload.mimetype if upload else request.mimetype) or ''
+        
+        import_format = request.args.get('format')
+        if not import_format:
+            if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type:
+                import_format = 'ndjson'
+            elif name.endswith('.csv') or 'csv' in content_type:
+                import_format = 'csv'
+        
+        if import_format == 'csv':
+            rows = iter_csv_rows(stream)
+        elif import_format == 'ndjson':
+            rows = iter_ndjson_rows(stream)
+        else:
+            return jsonify({'error': 'Upload a .csv or .ndjson file, or pass format=csv|ndjson'}), 400
+        
+        report = bulk_import(user_id, rows)
+        
+        if 'error' in report:
+            return jsonify({'error': report['error']}), IMPORT_ERROR_STATUS.get(report.get('code'), 500)
+        
+        return jsonify({
+            'message': f"Imported {report['imported']} transaction(s)",
+            **report
+        }), 201 if report['imported'] else 200
+        
+    except Exception as e:
+        print(f"Import transactions error: {e}")
+        return jsonify({'error': 'Failed to import transactions'}), 500
+
 @bp.route('/<int:transaction_id>', methods=['DELETE'])
 @token_required
 def delete_transaction(user_id, transaction_id):
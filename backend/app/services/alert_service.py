@@ -1,6 +1,48 @@
 from app.utils.database import get_db_connection, close_db_connection
+from app.utils.cache import get_cache, alert_count_key, invalidate_alert_count
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.services.events import publish_event
 from datetime import datetime
 
+ALERT_COLUMNS = "id, alert_type, title, message, related_id, is_read, created_at"
+
+def _adjust_unread_count(cursor, user_id, delta):
+    _adjust_unread_counts(cursor, {user_id: delta})
+
+def _adjust_unread_counts(cursor, deltas):
+    """Apply {user_id: delta} to alert_counters, batched per direction."""
+    increments = [(user_id, delta) for user_id, delta in deltas.items() if delta > 0]
+    decrements = [(-delta, user_id) for user_id, delta in deltas.items() if delta < 0]
+    
+    # executemany rewrites INSERT ... VALUES into one multi-row statement and
+    # leaves the ON DUPLICATE KEY clause unformatted, so it must not take
+    # parameters of its own
+    if increments:
+        cursor.executemany(
+            """
+            INSERT INTO alert_counters (user_id, unread_count) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE unread_count = unread_count + VALUES(unread_count)
+            """,
+            increments
+        )
+    if decrements:
+        cursor.executemany(
+            "UPDATE alert_counters SET unread_count = GREATEST(unread_count - %s, 0) WHERE user_id = %s",
+            decrements
+        )
+    for user_id in deltas:
+        invalidate_alert_count(user_id)
+
+def _reset_unread_count(cursor, user_id):
+    cursor.execute(
+        """
+        INSERT INTO alert_counters (user_id, unread_count) VALUES (%s, 0)
+        ON DUPLICATE KEY UPDATE unread_count = 0
+        """,
+        (user_id,)
+    )
+    invalidate_alert_count(user_id)
+
 def create_alert(user_id, alert_type, title, message, related_id=None):
     conn = get_db_connection()
     if not conn:
@@ -16,8 +58,17 @@ def create_alert(user_id, alert_type, title, message, related_id=None):
             """,
             (user_id, alert_type, title, message, related_id)
         )
+        alert_id = cursor.lastrowid
+        _adjust_unread_count(cursor, user_id, 1)
         
         conn.commit()
+        publish_event(user_id, 'alert', {
+            'id': alert_id,
+            'alert_type': alert_type,
+            'title': title,
+            'message': message,
+            'related_id': related_id
+        })
         return True
         
     except Exception as e:
@@ -28,42 +79,53 @@ def create_alert(user_id, alert_type, title, message, related_id=None):
     finally:
         close_db_connection(conn, cursor)
 
-def get_user_alerts(user_id, unread_only=False):
+def get_user_alerts(user_id, unread_only=False, limit=50, cursor=None):
+    """Keyset-paginated alerts, newest first. Returns (alerts, next_cursor)."""
+    after = None
+    if cursor:
+        after_created, after_id = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(after_created), int(after_id))
+        except ValueError:
+            raise ValueError('Invalid cursor')
+    
     conn = get_db_connection()
     if not conn:
-        return []
+        return [], None
     
-    cursor = conn.cursor()
+    db_cursor = conn.cursor()
     
     try:
+        query = f"SELECT {ALERT_COLUMNS} FROM alerts WHERE user_id = %s"
+        params = [user_id]
+        
         if unread_only:
-            cursor.execute(
-                """
-                SELECT * FROM alerts 
-                WHERE user_id = %s AND is_read = FALSE
-                ORDER BY created_at DESC
-                """,
-                (user_id,)
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT * FROM alerts 
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                """,
-                (user_id,)
-            )
-        
-        alerts = cursor.fetchall()
-        return alerts
+            query += " AND is_read = FALSE"
+        
+        if after:
+            query += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+            params.extend([after[0], after[0], after[1]])
+        
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        db_cursor.execute(query, tuple(params))
+        alerts = db_cursor.fetchall()
+        
+        next_cursor = None
+        if len(alerts) > limit:
+            alerts = alerts[:limit]
+            last = alerts[-1]
+            next_cursor = encode_cursor(last['created_at'].isoformat(), last['id'])
+        
+        return alerts, next_cursor
         
     except Exception as e:
         print(f"Error getting alerts: {e}")
-        return []
+        return [], None
         
     finally:
-        close_db_connection(conn, cursor)
+        close_db_connection(conn, db_cursor)
 
 def mark_alert_as_read(alert_id, user_id):
     conn = get_db_connection()
@@ -77,11 +139,15 @@ def mark_alert_as_read(alert_id, user_id):
             """
             UPDATE alerts 
             SET is_read = TRUE 
-            WHERE id = %s AND user_id = %s
+            WHERE id = %s AND user_id = %s AND is_read = FALSE
             """,
             (alert_id, user_id)
         )
         
+        # Only a row that actually flipped from unread changes the count
+        if cursor.rowcount > 0:
+            _adjust_unread_count(cursor, user_id, -1)
+        
         conn.commit()
         return True
         
@@ -102,9 +168,10 @@ def mark_all_alerts_as_read(user_id):
     
     try:
         cursor.execute(
-            "UPDATE alerts SET is_read = TRUE WHERE user_id = %s",
+            "UPDATE alerts SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE",
             (user_id,)
         )
+        _reset_unread_count(cursor, user_id)
         
         conn.commit()
         return True
@@ -125,11 +192,23 @@ def delete_alert(alert_id, user_id):
     cursor = conn.cursor()
     
     try:
+        cursor.execute(
+            "SELECT is_read FROM alerts WHERE id = %s AND user_id = %s FOR UPDATE",
+            (alert_id, user_id)
+        )
+        alert = cursor.fetchone()
+        
+        if not alert:
+            return False
+        
         cursor.execute(
             "DELETE FROM alerts WHERE id = %s AND user_id = %s",
             (alert_id, user_id)
         )
         
+        if not alert['is_read']:
+            _adjust_unread_count(cursor, user_id, -1)
+        
         conn.commit()
         return True
         
@@ -141,36 +220,50 @@ def delete_alert(alert_id, user_id):
     finally:
         close_db_connection(conn, cursor)
 
-def get_unread_count(user_id):
+def _load_unread_count(user_id):
     conn = get_db_connection()
     if not conn:
-        return 0
+        return None
     
     cursor = conn.cursor()
     
     try:
         cursor.execute(
-            """
-            SELECT COUNT(*) as count 
-            FROM alerts 
-            WHERE user_id = %s AND is_read = FALSE
-            """,
+            "SELECT unread_count FROM alert_counters WHERE user_id = %s",
             (user_id,)
         )
         
         result = cursor.fetchone()
-        return result[0] if result else 0
+        return result['unread_count'] if result else 0
         
     except Exception as e:
         print(f"Error getting unread count: {e}")
-        return 0
+        return None
         
     finally:
         close_db_connection(conn, cursor)
 
-def create_trial_ending_alert(user_id, subscription_id, service_name, days_remaining):
+def get_unread_count(user_id):
+    count = get_cache().get_or_set(alert_count_key(user_id), lambda: _load_unread_count(user_id))
+    return count or 0
+
+def trial_ending_alert_text(service_name, days_remaining):
     title = f"Trial Ending Soon: {service_name}"
     message = f"Your {service_name} trial ends in {days_remaining} day(s). Cancel before you're charged!"
+    return title, message
+
+def credit_limit_alert_text(card_name, utilization):
+    title = f"Credit Limit Warning: {card_name}"
+    message = f"Your {card_name} has reached {utilization}% of its credit limit."
+    return title, message
+
+def subscription_renewal_alert_text(service_name, amount, date):
+    title = f"Subscription Renewal: {service_name}"
+    message = f"Your {service_name} subscription (${amount}) will renew on {date}."
+    return title, message
+
+def create_trial_ending_alert(user_id, subscription_id, service_name, days_remaining):
+    title, message = trial_ending_alert_text(service_name, days_remaining)
     
     return create_alert(
         user_id=user_id,
@@ -181,8 +274,7 @@ def create_trial_ending_alert(user_id, subscription_id, service_name, days_remai
     )
 
 def create_credit_limit_alert(user_id, card_id, card_name, utilization):
-    title = f"Credit Limit Warning: {card_name}"
-    message = f"Your {card_name} has reached {utilization}% of its credit limit."
+    title, message = credit_limit_alert_text(card_name, utilization)
     
     return create_alert(
         user_id=user_id,
@@ -193,8 +285,7 @@ def create_credit_limit_alert(user_id, card_id, card_name, utilization):
     )
 
 def create_subscription_renewal_alert(user_id, subscription_id, service_name, amount, date):
-    title = f"Subscription Renewal: {service_name}"
-    message = f"Your {service_name} subscription (${amount}) will renew on {date}."
+    title, message = subscription_renewal_alert_text(service_name, amount, date)
     
     return create_alert(
         user_id=user_id,
@@ -0,0 +1,206 @@
+"""Scheduled sweep that raises credit-limit, trial-ending and renewal alerts.
+
+Candidates are found set-based across all users, one keyset batch at a
+time, so memory stays bounded by ALERT_SWEEP_BATCH_SIZE however many users
+there are. Each batch is written in one transaction: the alerts with one
+executemany, the unread counters, and the matching emails in the outbox.
+
+A candidate is skipped when the same alert already exists unread, or was
+raised inside its cooldown window. Without the window, an alert the user
+has read would be raised again by the next run.
+"""
+import time
+from datetime import date, timedelta
+from app.config import Config
+from app.services.alert_service import (
+    _adjust_unread_counts, trial_ending_alert_text, credit_limit_alert_text, subscription_renewal_alert_text
+)
+from app.services.email_outbox import enqueue_emails
+from app.services.email_service import outbox_message, trial_ending_email, credit_limit_email, subscription_renewal_email
+from app.services.events import publish_event
+from app.utils.cache import get_cache, alert_count_key
+from app.utils.database import get_db_connection, close_db_connection
+
+def _not_alerted(alias, alert_type):
+    return f"""
+        NOT EXISTS (
+            SELECT 1 FROM alerts a
+            WHERE a.user_id = {alias}.user_id AND a.alert_type = '{alert_type}'
+              AND a.related_id = {alias}.id
+              AND (a.is_read = FALSE OR a.created_at >= %(cooldown_start)s)
+        )
+    """
+
+# alert_type -> (candidate query, table alias, cooldown in days,
+#                row -> (title, message), row -> (subject, body))
+SWEEPS = {
+    'credit_limit': (
+        f"""
+        SELECT c.id, c.user_id, c.card_name, u.email, u.is_verified,
+               ROUND(c.current_balance / c.credit_limit * 100) AS utilization
+        FROM cards c
+        JOIN users u ON u.id = c.user_id
+        WHERE c.is_active = TRUE AND c.credit_limit > 0
+          AND c.current_balance >= c.credit_limit * %(threshold)s
+          AND {_not_alerted('c', 'credit_limit')}
+        """,
+        'c',
+        lambda: Config.ALERT_CREDIT_LIMIT_COOLDOWN_DAYS,
+        lambda row: credit_limit_alert_text(row['card_name'], row['utilization']),
+        lambda row: credit_limit_email(row['card_name'], row['utilization'])
+    ),
+    'trial_ending': (
+        f"""
+        SELECT s.id, s.user_id, s.service_name, u.email, u.is_verified,
+               DATEDIFF(s.trial_end_date, %(today)s) AS days_remaining
+        FROM subscriptions s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.status IN ('active', 'trial')
+          AND s.trial_end_date BETWEEN %(today)s AND %(trial_until)s
+          AND {_not_alerted('s', 'trial_ending')}
+        """,
+        's',
+        lambda: Config.ALERT_TRIAL_DAYS,
+        lambda row: trial_ending_alert_text(row['service_name'], row['days_remaining']),
+        lambda row: trial_ending_email(row['service_name'], row['days_remaining'])
+    ),
+    'subscription_renewal': (
+        f"""
+        SELECT s.id, s.user_id, s.service_name, s.amount_usd, s.next_billing_date, u.email, u.is_verified
+        FROM subscriptions s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.status = 'active'
+          AND s.next_billing_date BETWEEN %(today)s AND %(renewal_until)s
+          AND {_not_alerted('s', 'subscription_renewal')}
+        """,
+        's',
+        lambda: Config.ALERT_RENEWAL_DAYS,
+        lambda row: subscription_renewal_alert_text(row['service_name'], row['amount_usd'], row['next_billing_date']),
+        lambda row: subscription_renewal_email(row['service_name'], row['amount_usd'], row['next_billing_date'])
+    )
+}
+
+def _sweep_batch(alert_type, params, after, batch_size, dry_run):
+    """Alert one batch of candidates after (user_id, id); returns (rows, last key)."""
+    query, alias, _, alert_text, email_text = SWEEPS[alert_type]
+    
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError('Database connection failed')
+    
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            query + f"""
+              AND ({alias}.user_id > %(after_user)s
+                   OR ({alias}.user_id = %(after_user)s AND {alias}.id > %(after_id)s))
+            ORDER BY {alias}.user_id, {alias}.id
+            LIMIT %(batch_size)s
+            """,
+            {**params, 'after_user': after[0], 'after_id': after[1], 'batch_size': batch_size}
+        )
+        rows = cursor.fetchall()
+        
+        if not rows or dry_run:
+            return rows, (rows[-1]['user_id'], rows[-1]['id']) if rows else after
+        
+        alerts = []
+        emails = []
+        counts = {}
+        for row in rows:
+            title, message = alert_text(row)
+            alerts.append((row['user_id'], alert_type, title, message, row['id']))
+            counts[row['user_id']] = counts.get(row['user_id'], 0) + 1
+            if row['is_verified']:
+                emails.append(outbox_message(row['email'], *email_text(row)))
+        
+        cursor.executemany(
+            """
+            INSERT INTO alerts (user_id, alert_type, title, message, related_id)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            alerts
+        )
+        _adjust_unread_counts(cursor, counts)
+        enqueue_emails(emails, cursor=cursor)
+        conn.commit()
+        
+        # Outside a request the counter invalidation above ran before the
+        # commit; drop the cached counts again now that it is visible
+        get_cache().delete(*[alert_count_key(user_id) for user_id in counts])
+        for user_id, _, title, message, related_id in alerts:
+            publish_event(user_id, 'alert', {
+                'alert_type': alert_type,
+                'title': title,
+                'message': message,
+                'related_id': related_id
+            })
+        
+        return rows, (rows[-1]['user_id'], rows[-1]['id'])
+        
+    except Exception:
+        conn.rollback()
+        raise
+        
+    finally:
+        close_db_connection(conn, cursor)
+
+def run_alert_sweep(dry_run=False, batch_size=None):
+    """Run every sweep; returns {alert_type: {'alerts', 'batches'}, 'elapsed_ms'}."""
+    batch_size = batch_size or Config.ALERT_SWEEP_BATCH_SIZE
+    
+    # Held on its own connection for the whole run, so two schedulers
+    # (or a manual run next to cron) cannot raise the same alerts twice
+    lock_conn = get_db_connection()
+    if not lock_conn:
+        return {'error': 'Database connection failed'}
+    lock_cursor = lock_conn.cursor()
+    
+    try:
+        lock_cursor.execute("SELECT GET_LOCK('paywatch_alert_sweep', 0) AS acquired")
+        if not lock_cursor.fetchone()['acquired']:
+            return {'error': 'Another alert sweep is already running'}
+        
+        try:
+            return _run_sweeps(dry_run, batch_size)
+        except Exception as e:
+            print(f"Error running alert sweep: {e}")
+            return {'error': f'Alert sweep failed: {e}'}
+        finally:
+            lock_cursor.execute("SELECT RELEASE_LOCK('paywatch_alert_sweep')")
+            lock_cursor.fetchone()
+        
+    finally:
+        close_db_connection(lock_conn, lock_cursor)
+
+def _run_sweeps(dry_run, batch_size):
+    today = date.today()
+    started = time.perf_counter()
+    report = {}
+    
+    for alert_type, (_, _, cooldown_days, _, _) in SWEEPS.items():
+        params = {
+            'today': today,
+            'threshold': Config.ALERT_UTILIZATION_THRESHOLD / 100,
+            'trial_until': today + timedelta(days=Config.ALERT_TRIAL_DAYS),
+            'renewal_until': today + timedelta(days=Config.ALERT_RENEWAL_DAYS),
+            'cooldown_start': today - timedelta(days=cooldown_days())
+        }
+        after = (0, 0)
+        total = 0
+        batches = 0
+        
+        while True:
+            rows, after = _sweep_batch(alert_type, params, after, batch_size, dry_run)
+            if not rows:
+                break
+            total += len(rows)
+            batches += 1
+            if len(rows) < batch_size:
+                break
+        
+        report[alert_type] = {'alerts': total, 'batches': batches}
+    
+    report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return report
@@ -0,0 +1,270 @@
+"""Transactional email outbox.
+
+email_service.send_* helpers only insert a row into email_outbox, inside the
+caller's transaction, so an HTTP request never waits on SMTP. A small pool
+of worker threads claims due rows in batches, sends each batch over one
+SMTP connection, and retries failures with exponential backoff.
+
+To try it locally against a throwaway SMTP server:
+
+    python -m aiosmtpd -n -l localhost:8025
+    MAIL_SERVER=localhost MAIL_PORT=8025 MAIL_USE_TLS=False python run.py
+
+EmailOutboxWorker(app).run_once() drains one batch synchronously, which is
+handy in scripts and tests.
+"""
+import os
+import smtplib
+import socket
+import threading
+import time
+import uuid
+from flask_mail import Message
+from app.config import Config
+from app.utils.database import get_db_connection, close_db_connection
+
+def enqueue_email(to_email, subject, body):
+    return enqueue_emails([(to_email, subject, body)]) > 0
+
+def enqueue_emails(messages, cursor=None):
+    """Queue many (to_email, subject, body) tuples with one executemany.
+
+    Pass a cursor to queue them inside the caller's transaction.
+    """
+    messages = list(messages)
+    if not messages:
+        return 0
+    
+    if cursor is not None:
+        cursor.executemany(
+            "INSERT INTO email_outbox (to_email, subject, body) VALUES (%s, %s, %s)",
+            messages
+        )
+        return len(messages)
+    
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    
+    cursor = conn.cursor()
+    
+    try:
+        cursor.executemany(
+            "INSERT INTO email_outbox (to_email, subject, body) VALUES (%s, %s, %s)",
+            messages
+        )
+        conn.commit()
+        return len(messages)
+        
+    except Exception as e:
+        print(f"Error queueing email: {e}")
+        conn.rollback()
+        return 0
+        
+    finally:
+        close_db_connection(conn, cursor)
+
+class RateLimiter:
+    """Token bucket shared by all workers so the mail server sees at most
+    `rate` messages per second (with bursts up to `burst`)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def _retry_delay(attempts):
+    return min(Config.EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), Config.EMAIL_RETRY_MAX_SECONDS)
+
+class EmailOutboxWorker:
+    def __init__(self, app, rate_limiter=None, batch_size=None):
+        from app import mail
+        self.app = app
+        self.mail = mail
+        self.rate_limiter = rate_limiter or RateLimiter(Config.EMAIL_SEND_RATE)
+        self.batch_size = batch_size or Config.EMAIL_BATCH_SIZE
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def _claim_batch(self):
+        conn = get_db_connection()
+        if not conn:
+            return []
+        
+        cursor = conn.cursor()
+        claim = f"{self.worker_id}-{uuid.uuid4().hex[:8]}"
+        
+        try:
+            # Hand rows claimed by a crashed worker back to the queue. The
+            # crash counts as an attempt, so a message that keeps killing
+            # its worker eventually fails instead of retrying forever.
+            cursor.execute(
+                """
+                UPDATE email_outbox
+                SET status = IF(attempts + 1 >= %s, 'failed', 'pending'),
+                    attempts = attempts + 1, claimed_by = NULL,
+                    last_error = 'Claim timed out'
+                WHERE status = 'sending' AND claimed_at < NOW() - INTERVAL %s SECOND
+                """,
+                (Config.EMAIL_MAX_ATTEMPTS, Config.EMAIL_CLAIM_TIMEOUT_SECONDS)
+            )
+            cursor.execute(
+                """
+                UPDATE email_outbox
+                SET status = 'sending', claimed_by = %s, claimed_at = NOW()
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY id
+                LIMIT %s
+                """,
+                (claim, self.batch_size)
+            )
+            conn.commit()
+            
+            if cursor.rowcount == 0:
+                return []
+            
+            cursor.execute(
+                """
+                SELECT id, to_email, subject, body, attempts
+                FROM email_outbox WHERE claimed_by = %s AND status = 'sending'
+                ORDER BY id
+                """,
+                (claim,)
+            )
+            return cursor.fetchall()
+            
+        except Exception as e:
+            print(f"Error claiming outbox batch: {e}")
+            conn.rollback()
+            return []
+            
+        finally:
+            close_db_connection(conn, cursor)
+
+    def _record_results(self, sent_ids, failures):
+        conn = get_db_connection()
+        if not conn:
+            return
+        
+        cursor = conn.cursor()
+        
+        try:
+            if sent_ids:
+                cursor.executemany(
+                    """
+                    UPDATE email_outbox
+                    SET status = 'sent', sent_at = NOW(), attempts = attempts + 1, claimed_by = NULL
+                    WHERE id = %s
+                    """,
+                    [(email_id,) for email_id in sent_ids]
+                )
+            
+            rows = []
+            for email, error, counts_as_attempt in failures:
+                attempts = email['attempts'] + (1 if counts_as_attempt else 0)
+                status = 'failed' if attempts >= Config.EMAIL_MAX_ATTEMPTS else 'pending'
+                delay = _retry_delay(max(attempts, 1))
+                rows.append((status, attempts, delay, str(error)[:1000], email['id']))
+            if rows:
+                # Due times are compared with the database clock, so they
+                # are computed by it too
+                cursor.executemany(
+                    """
+                    UPDATE email_outbox
+                    SET status = %s, attempts = %s, next_attempt_at = NOW() + INTERVAL %s SECOND,
+                        last_error = %s, claimed_by = NULL
+                    WHERE id = %s
+                    """,
+                    rows
+                )
+            
+            conn.commit()
+            
+        except Exception as e:
+            print(f"Error recording outbox results: {e}")
+            conn.rollback()
+            
+        finally:
+            close_db_connection(conn, cursor)
+
+    def run_once(self):
+        """Claim and send one batch; returns how many emails were claimed."""
+        batch = self._claim_batch()
+        if not batch:
+            return 0
+        
+        sent_ids = []
+        failures = []
+        
+        with self.app.app_context():
+            try:
+                # One SMTP handshake (and STARTTLS/login) for the whole batch
+                with self.mail.connect() as smtp:
+                    for position, email in enumerate(batch):
+                        self.rate_limiter.acquire()
+                        try:
+                            smtp.send(Message(
+                                subject=email['subject'],
+                                recipients=[email['to_email']],
+                                body=email['body']
+                            ))
+                            sent_ids.append(email['id'])
+                        except smtplib.SMTPServerDisconnected as e:
+                            # The connection is gone; the rest never got a chance
+                            failures.append((email, e, True))
+                            failures.extend((rest, e, False) for rest in batch[position + 1:])
+                            break
+                        except Exception as e:
+                            failures.append((email, e, True))
+            except Exception as e:
+                print(f"Error connecting to mail server: {e}")
+                done = set(sent_ids) | {email['id'] for email, _, _ in failures}
+                failures.extend((email, e, True) for email in batch if email['id'] not in done)
+        
+        self._record_results(sent_ids, failures)
+        return len(batch)
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                print(f"Email worker error: {e}")
+                claimed = 0
+            if not claimed:
+                stop_event.wait(Config.EMAIL_POLL_INTERVAL)
+
+_workers = []
+_stop_event = threading.Event()
+
+def start_email_workers(app, count=None):
+    if _workers:
+        return _workers
+    
+    rate_limiter = RateLimiter(Config.EMAIL_SEND_RATE)
+    for number in range(count or Config.EMAIL_OUTBOX_WORKERS):
+        worker = EmailOutboxWorker(app, rate_limiter=rate_limiter)
+        thread = threading.Thread(target=worker.run, args=(_stop_event,), name=f'email-outbox-{number}', daemon=True)
+        thread.start()
+        _workers.append(thread)
+    return _workers
+
+def stop_email_workers(timeout=5):
+    _stop_event.set()
+    for thread in _workers:
+        thread.join(timeout)
@@ -1,23 +1,19 @@
-from flask_mail import Message
-from app import mail
 from app.config import Config
+from app.services.email_outbox import enqueue_email
+
+def outbox_message(to_email, subject, body):
+    return (to_email, f"[{Config.APP_NAME}] {subject}", body)
 
 def send_email(to_email, subject, body):
+    """Queue an email for the outbox workers; returns True once queued."""
     try:
-        msg = Message(
-            subject=f"[{Config.APP_NAME}] {subject}",
-            recipients=[to_email],
-            body=body
-        )
-        
-        mail.send(msg)
-        return True
+        return enqueue_email(*outbox_message(to_email, subject, body))
         
     except Exception as e:
         print(f"Error sending email: {e}")
         return False
 
-def send_tr_remial_endinginder(user_email, service_name, days_remaining):
+def trial_ending_email(service_name, days_remaining):
     subject = f"Trial Ending Soon: {service_name}"
     
     body = f"""
@@ -33,9 +29,12 @@ Best regards,
 PayWatch Team
     """
     
-    return send_email(user_email, subject, body)
+    return subject, body
 
-def send_credit_limit_alert(user_email, card_name, utilization_percentage):
+def send_tr_remial_endinginder(user_email, service_name, days_remaining):
+    return send_email(user_email, *trial_ending_email(service_name, days_remaining))
+
+def credit_limit_email(card_name, utilization_percentage):
     subject = f"Credit Limit Alert: {card_name}"
     
     body = f"""
@@ -51,9 +50,12 @@ Best regards,
 PayWatch Team
     """
     
-    return send_email(user_email, subject, body)
+    return subject, body
 
-def send_subscription_renewal_reminder(user_email, service_name, amount, renewal_date):
+def send_credit_limit_alert(user_email, card_name, utilization_percentage):
+    return send_email(user_email, *credit_limit_email(card_name, utilization_percentage))
+
+def subscription_renewal_email(service_name, amount, renewal_date):
     subject = f"Subscription Renewal: {service_name}"
     
     body = f"""
@@ -69,7 +71,10 @@ Best regards,
 PayWatch Team
     """
     
-    return send_email(user_email, subject, body)
+    return subject, body
+
+def send_subscription_renewal_reminder(user_email, service_name, amount, renewal_date):
+    return send_email(user_email, *subscription_renewal_email(service_name, amount, renewal_date))
 
 def send_price_change_alert(user_email, service_name, old_price, new_price):
     subject = f"Price Change Detected: {service_name}"
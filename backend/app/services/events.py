@@ -0,0 +1,165 @@
+"""Per-user event fan-out for the /api/events Server-Sent Events stream.
+
+Write paths call publish_event(), which delivers once the surrounding
+transaction commits. Every worker process keeps an in-process broker that
+holds one bounded queue per open SSE connection. With EVENTS_BACKEND=redis
+events go through Redis pub/sub instead, and one listener thread per
+process feeds them into the local broker. That way events published by
+any worker reach connections held by every worker, and each connection
+costs only a queue rather than a Redis subscription.
+
+The server is threaded, so every open stream also holds one request
+thread for as long as the client stays connected. EVENTS_MAX_CONNECTIONS
+caps that per process and must stay a small fraction of the process's
+worker threads (for example 4 of gunicorn --threads 16), or a handful of
+open tabs takes every thread and the API stops answering. Streams over
+the cap get a 503 and the client falls back to retrying.
+"""
+import json
+import queue
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from app.config import Config
+
+RESYNC = 'resync'
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class EventSubscription:
+    def __init__(self, broker, user_id, maxsize):
+        self.broker = broker
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A client that stopped reading loses its backlog and is told
+            # to refetch instead of holding an unbounded queue in memory
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            self.queue.put_nowait({'event': RESYNC, 'data': {}})
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class EventBroker:
+    """In-process pub/sub: user_id -> open subscriptions."""
+
+    def __init__(self, queue_size=100, max_connections=4):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self._subscriptions = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._count >= self.max_connections:
+                return None
+            subscription = EventSubscription(self, user_id, self.queue_size)
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def dispatch(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def publish(self, user_id, event):
+        self.dispatch(user_id, event)
+
+    def stats(self):
+        with self._lock:
+            return {'connections': self._count, 'users': len(self._subscriptions)}
+
+class RedisEventBroker(EventBroker):
+    """Publishes through Redis so every worker process sees every event.
+
+    Needs the optional `redis` package (pip install redis).
+    """
+
+    def __init__(self, url, prefix='paywatch:events:', **kwargs):
+        super().__init__(**kwargs)
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._listener = threading.Thread(target=self._listen, name='events-redis-listener', daemon=True)
+        self._listener.start()
+
+    def publish(self, user_id, event):
+        try:
+            self._client.publish(f"{self.prefix}{user_id}", json.dumps(event, default=_json_default))
+        except Exception as e:
+            print(f"Error publishing event: {e}")
+
+    def _listen(self):
+        import time
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{self.prefix}*")
+                for message in pubsub.listen():
+                    channel = message['channel'].decode('utf-8')
+                    try:
+                        user_id = int(channel[len(self.prefix):])
+                    except ValueError:
+                        continue
+                    self.dispatch(user_id, json.loads(message['data']))
+            except Exception as e:
+                print(f"Event listener error, reconnecting: {e}")
+                time.sleep(1)
+
+    def stats(self):
+        stats = super().stats()
+        stats['backend'] = 'redis'
+        return stats
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_event_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                options = {'queue_size': Config.EVENTS_QUEUE_SIZE, 'max_connections': Config.EVENTS_MAX_CONNECTIONS}
+                if Config.EVENTS_BACKEND == 'redis':
+                    _broker = RedisEventBroker(Config.EVENTS_REDIS_URL, **options)
+                else:
+                    _broker = EventBroker(**options)
+    return _broker
+
+def publish_event(user_id, event, data=None):
+    """Send an event to the user's open streams once the current transaction commits."""
+    from app.utils.database import after_commit
+
+    payload = {'event': event, 'data': data or {}}
+    after_commit(lambda: get_event_broker().publish(user_id, payload))
+
+def format_sse(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=_json_default)}\n\n"
@@ -1,9 +1,15 @@
+import bisect
+import threading
+import time
 import requests
-from datetime import date
+from datetime import date, datetime, timedelta
 from app.config import Config
-from app.utils.database import get_db_connection, close_db_connection
+from app.utils.database import get_db_connection, close_db_connection, after_commit
+from app.utils.metrics import EXCHANGE_RATE_FETCH
 
 def fetch_current_exchange_rate():
+    started = time.perf_counter()
+    outcome = 'error'
     try:
         api_key = Config.EXCHANGE_RATE_API_KEY
         api_url = f"{Config.EXCHANGE_RATE_API_URL}/{api_key}/latest/USD"
@@ -15,6 +21,7 @@ def fetch_current_exchange_rate():
         npr_rate = data['conversion_rates']['NPR']
         print(f"rate: {npr_rate}")
         
+        outcome = 'success'
         return float(npr_rate)
         
     except requests.exceptions.RequestException as e:
@@ -23,8 +30,102 @@ def fetch_current_exchange_rate():
     except KeyError as e:
         print(f"Error parsing exchange rate data: {e}")
         return None
+    finally:
+        EXCHANGE_RATE_FETCH.observe(time.perf_counter() - started, outcome=outcome)
+
+FALLBACK_RATE = 133.0
+
+# Process-wide cache of the daily USD->NPR rate: {fetch_date: (rate, expires_at)}
+_rates = {}
+_last_known = None  # (fetch_date, rate) served while a refresh is pending
+_state_lock = threading.Lock()
+_refresh_lock = threading.Lock()  # single flight: one refresh per process
+_refresher = None
+
+class ExchangeRateIndex:
+    """Date-sorted, in-memory copy of the exchange_rates table.
+
+    Resolves the rate in force on any date (the nearest row on or before
+    it) with a bisect, so re-valuing thousands of backdated transactions
+    costs no queries once loaded. Rows written through save_exchange_rate
+    are merged in as they commit; rows newer than the index are pulled in
+    with an incremental query at most once per sync interval.
+    """
+
+    def __init__(self, sync_interval=60):
+        self.sync_interval = sync_interval
+        self._dates = []
+        self._rates = []
+        self._loaded = False
+        self._last_sync = 0
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        conn = get_db_connection()
+        if not conn:
+            return
+        
+        cursor = conn.cursor()
+        
+        try:
+            if self._loaded and self._dates:
+                cursor.execute(
+                    "SELECT fetch_date, rate FROM exchange_rates WHERE fetch_date > %s ORDER BY fetch_date",
+                    (self._dates[-1],)
+                )
+            else:
+                cursor.execute("SELECT fetch_date, rate FROM exchange_rates ORDER BY fetch_date")
+            
+            for row in cursor.fetchall():
+                self._upsert(row['fetch_date'], float(row['rate']))
+            self._loaded = True
+            self._last_sync = time.monotonic()
+            
+        except Exception as e:
+            print(f"Error loading exchange rate index: {e}")
+            
+        finally:
+            close_db_connection(conn, cursor)
+
+    def _upsert(self, fetch_date, rate):
+        position = bisect.bisect_left(self._dates, fetch_date)
+        if position < len(self._dates) and self._dates[position] == fetch_date:
+            self._rates[position] = rate
+        else:
+            self._dates.insert(position, fetch_date)
+            self._rates.insert(position, rate)
+
+    def upsert(self, fetch_date, rate):
+        with self._lock:
+            if self._loaded:
+                self._upsert(fetch_date, rate)
+
+    def _ensure_covers(self, latest):
+        stale = time.monotonic() - self._last_sync > self.sync_interval
+        if not self._loaded or (stale and (not self._dates or latest > self._dates[-1])):
+            self._sync()
+
+    def _lookup(self, on_date):
+        position = bisect.bisect_right(self._dates, on_date)
+        return self._rates[position - 1] if position else None
 
-def save_exchange_rate(rate):
+    def rate_on(self, on_date):
+        with self._lock:
+            self._ensure_covers(on_date)
+            return self._lookup(on_date)
+
+    def rates_on(self, dates):
+        """Map each date in `dates` to its rate (None before the first row)."""
+        dates = set(dates)
+        if not dates:
+            return {}
+        with self._lock:
+            self._ensure_covers(max(dates))
+            return {on_date: self._lookup(on_date) for on_date in dates}
+
+_rate_index = ExchangeRateIndex()
+
+def save_exchange_rate(rate, fetch_date=None):
     conn = get_db_connection()
     if not conn:
         return False
@@ -32,25 +133,27 @@ def save_exchange_rate(rate):
     cursor = conn.cursor()
     
     try:
-        today = date.today()
+        fetch_date = fetch_date or date.today()
         cursor.execute(
             "SELECT id FROM exchange_rates WHERE fetch_date = %s",
-            (today,)
+            (fetch_date,)
         )
         existing = cursor.fetchone()
         
         if existing:
             cursor.execute(
                 "UPDATE exchange_rates SET rate = %s WHERE fetch_date = %s",
-                (rate, today)
+                (rate, fetch_date)
             )
         else:
             cursor.execute(
                 "INSERT INTO exchange_rates (rate, fetch_date) VALUES (%s, %s)",
-                (rate, today)
+                (rate, fetch_date)
             )
         
         conn.commit()
+        after_commit(lambda: _remember_rate(fetch_date, float(rate)))
+        after_commit(lambda: _rate_index.upsert(fetch_date, float(rate)))
         return True
         
     except Exception as e:
@@ -61,40 +164,175 @@ def save_exchange_rate(rate):
     finally:
         close_db_connection(conn, cursor)
 
-def get_latest_exchange_rate():
+def _remember_rate(fetch_date, rate, ttl=None, authoritative=True):
+    global _last_known
+    expires_at = time.monotonic() + (ttl if ttl is not None else Config.EXCHANGE_RATE_CACHE_TTL)
+    with _state_lock:
+        _rates[fetch_date] = (rate, expires_at)
+        if authoritative and (_last_known is None or fetch_date >= _last_known[0]):
+            _last_known = (fetch_date, rate)
+        for cached_date in [d for d in _rates if d < date.today()]:
+            del _rates[cached_date]
+
+def _load_rate_from_db(fetch_date):
     conn = get_db_connection()
     if not conn:
-        return 133.0  # Fallback rate if database unavailable
+        return None
     
     cursor = conn.cursor()
     
     try:
-        today = date.today()
         cursor.execute(
             "SELECT rate FROM exchange_rates WHERE fetch_date = %s",
-            (today,)
+            (fetch_date,)
         )
         result = cursor.fetchone()
-        print(f"{result}:cp1")
-        
         if result:
             return float(result['rate'])
-        else:
-            new_rate = fetch_current_exchange_rate()
-            
-            if new_rate:
-                save_exchange_rate(new_rate)
-                return new_rate
-            else:
-                cursor.execute(
-                    "SELECT rate FROM exchange_rates ORDER BY fetch_date DESC LIMIT 1"
-                )
-                fallback = cursor.fetchone()
-                return float(fallback[0]) if fallback else 133.0
-                
+        
+        cursor.execute(
+            "SELECT rate, fetch_date FROM exchange_rates ORDER BY fetch_date DESC LIMIT 1"
+        )
+        latest = cursor.fetchone()
+        if latest:
+            _remember_last_known(latest['fetch_date'], float(latest['rate']))
+        return None
+        
     except Exception as e:
-        print(f"Error getting exchange rate: {e}")
-        return 133.0  # Fallback rate
+        print(f"Error loading exchange rate: {e}")
+        return None
         
     finally:
-        close_db_connection(conn, cursor)
\ No newline at end of file
+        close_db_connection(conn, cursor)
+
+def _remember_last_known(fetch_date, rate):
+    global _last_known
+    with _state_lock:
+        if _last_known is None or fetch_date > _last_known[0]:
+            _last_known = (fetch_date, rate)
+
+def refresh_exchange_rate(fetch_date=None):
+    """Load the rate for fetch_date (today by default) into the cache.
+
+    Reads the exchange_rates row first and only calls the external API
+    when there is none. Returns the rate, or None if neither source had
+    one; in that case the date is retried after a short back-off.
+    """
+    fetch_date = fetch_date or date.today()
+    
+    rate = _load_rate_from_db(fetch_date)
+    if rate is None:
+        rate = fetch_current_exchange_rate()
+        if rate is not None:
+            save_exchange_rate(rate, fetch_date)
+    
+    if rate is not None:
+        _remember_rate(fetch_date, rate)
+    elif _last_known is not None:
+        # Keep serving the last known rate, try the API again soon
+        _remember_rate(fetch_date, _last_known[1], ttl=Config.EXCHANGE_RATE_RETRY_SECONDS, authoritative=False)
+    return rate
+
+def _refresh_in_background(fetch_date):
+    def run():
+        try:
+            refresh_exchange_rate(fetch_date)
+        finally:
+            _refresh_lock.release()
+    
+    if _refresh_lock.acquire(blocking=False):
+        threading.Thread(target=run, name='exchange-rate-refresh', daemon=True).start()
+
+def get_latest_exchange_rate():
+    today = date.today()
+    
+    with _state_lock:
+        cached = _rates.get(today)
+        last_known = _last_known
+    
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    
+    if last_known is not None:
+        # Stale-while-revalidate: answer now, let one thread refresh
+        _refresh_in_background(today)
+        return cached[0] if cached else last_known[1]
+    
+    # Cold cache: the first caller refreshes, concurrent callers wait for it
+    with _refresh_lock:
+        with _state_lock:
+            cached = _rates.get(today)
+        if cached is None:
+            try:
+                refresh_exchange_rate(today)
+            except Exception as e:
+                print(f"Error getting exchange rate: {e}")
+    
+    with _state_lock:
+        cached = _rates.get(today)
+        last_known = _last_known
+    if cached:
+        return cached[0]
+    return last_known[1] if last_known else FALLBACK_RATE
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+def get_exchange_rate_for_date(on_date):
+    """Rate in force on `on_date`: today's cached rate for today or later,
+    otherwise the nearest exchange_rates row on or before the date."""
+    on_date = _as_date(on_date)
+    if on_date >= date.today():
+        return get_latest_exchange_rate()
+    
+    rate = _rate_index.rate_on(on_date)
+    return rate if rate is not None else get_latest_exchange_rate()
+
+def get_exchange_rates_for_dates(dates):
+    """Resolve many dates at once; used by bulk imports and re-valuations."""
+    dates = {_as_date(on_date) for on_date in dates}
+    today = date.today()
+    past = [on_date for on_date in dates if on_date < today]
+    
+    rates = _rate_index.rates_on(past)
+    if len(rates) < len(dates) or any(rate is None for rate in rates.values()):
+        latest = get_latest_exchange_rate()
+        for on_date in dates:
+            if rates.get(on_date) is None:
+                rates[on_date] = latest
+    return rates
+
+def _seconds_until(moment):
+    return max(0.0, (moment - datetime.now()).total_seconds())
+
+def _run_refresher(stop_event):
+    while not stop_event.is_set():
+        tomorrow = date.today() + timedelta(days=1)
+        midnight = datetime.combine(tomorrow, datetime.min.time())
+        delay = timedelta(seconds=Config.EXCHANGE_RATE_REFRESH_DELAY_SECONDS)
+        
+        # The API only serves the current rate, so fetch the new day's row
+        # shortly after midnight rather than storing today's rate under
+        # tomorrow's date.
+        if stop_event.wait(_seconds_until(midnight + delay)):
+            return
+        with _refresh_lock:
+            try:
+                refresh_exchange_rate(date.today())
+            except Exception as e:
+                print(f"Error refreshing exchange rate: {e}")
+
+def start_exchange_rate_refresher():
+    global _refresher
+    if _refresher is not None:
+        return _refresher
+    
+    stop_event = threading.Event()
+    thread = threading.Thread(target=_run_refresher, args=(stop_event,), name='exchange-rate-refresher', daemon=True)
+    thread.start()
+    _refresher = (thread, stop_event)
+    return _refresher
@@ -5,9 +5,18 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from datetime import datetime
+from io import BytesIO
 import os
 
+def render_monthly_statement(user_data, transactions, card_data):
+    """Render the statement into memory and return the PDF bytes (or None)."""
+    buffer = BytesIO()
+    if not generate_monthly_statement(user_data, transactions, card_data, buffer):
+        return None
+    return buffer.getvalue()
+
 def generate_monthly_statement(user_data, transactions, card_data, output_path):
+    # output_path may be a filesystem path or any writable binary file object
     try:
         # Create the PDF document
         doc = SimpleDocTemplate(
@@ -0,0 +1,266 @@
+"""Statement rendering jobs.
+
+ReportLab rendering is CPU bound, so it runs in a process pool instead of
+on the request worker. The request only gathers the data, submits a job and
+returns its id; clients poll the job and download the PDF when it is done.
+Job state lives in the statement_jobs table, so any web worker can answer a
+poll or serve the download. The PDF is stored in the row by default, or
+written to STATEMENT_STORAGE_DIR when that is set.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.config import Config
+from app.services.pdf_generator import render_monthly_statement
+from app.utils.database import get_db_connection, close_db_connection, after_commit
+from app.utils.metrics import STATEMENT_RENDER, STATEMENT_RENDERS
+
+_executor = None
+_executor_lock = threading.Lock()
+# Futures of the jobs this process submitted, to tell a running job from
+# one still waiting for a render process
+_futures = {}
+_futures_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: forking a process that runs DB/email threads is unsafe
+                _executor = ProcessPoolExecutor(
+                    max_workers=Config.STATEMENT_WORKERS or os.cpu_count(),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _executor
+
+def _reset_executor(broken):
+    """Drop a pool whose render process died; the next job starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def _storage_path(user_id, job_id):
+    return os.path.join(Config.STATEMENT_STORAGE_DIR, f"{user_id}-{job_id}.pdf")
+
+def _render_job(user, transactions, card_data, storage_path=None):
+    """Runs in a worker process."""
+    started_at = time.time()
+    started = time.perf_counter()
+    content = render_monthly_statement(user, transactions, card_data)
+    render_seconds = time.perf_counter() - started
+    
+    if content is None:
+        raise RuntimeError('Failed to generate statement')
+    
+    if storage_path:
+        os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+        partial = f"{storage_path}.part"
+        with open(partial, 'wb') as output:
+            output.write(content)
+        os.replace(partial, storage_path)
+        return {'path': storage_path, 'started_at': started_at, 'render_seconds': render_seconds}
+    
+    return {'content': content, 'started_at': started_at, 'render_seconds': render_seconds}
+
+def _record_render(future):
+    if future.cancelled() or future.exception():
+        STATEMENT_RENDERS.inc(outcome='failed')
+        return
+    STATEMENT_RENDERS.inc(outcome='done')
+    STATEMENT_RENDER.observe(future.result()['render_seconds'])
+
+def _fail_job(job_id):
+    _update_job(job_id, "UPDATE statement_jobs SET status = 'failed', finished_at = NOW() WHERE id = %s", (job_id,))
+
+def _finish_job(job_id, submitted_at, executor, future):
+    """Done callback: store the outcome so every web worker can see it."""
+    with _futures_lock:
+        _futures.pop(job_id, None)
+    
+    if future.cancelled() or future.exception():
+        if not future.cancelled():
+            print(f"Statement job {job_id} failed: {future.exception()}")
+            if isinstance(future.exception(), BrokenProcessPool):
+                _reset_executor(executor)
+        _fail_job(job_id)
+        return
+    
+    output = future.result()
+    # Where a slow statement spent its time: waiting for a render
+    # process, or rendering
+    query = """
+        UPDATE statement_jobs
+        SET status = 'done', storage_path = %s, content = %s,
+            queued_seconds = %s, render_seconds = %s, finished_at = NOW()
+        WHERE id = %s
+    """
+    params = (
+        output.get('path'),
+        output.get('content'),
+        round(max(0.0, output['started_at'] - submitted_at), 3),
+        round(output['render_seconds'], 3),
+        job_id
+    )
+    _update_job(job_id, query, params)
+
+def _update_job(job_id, query, params):
+    conn = get_db_connection()
+    if not conn:
+        return
+    
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(query, params)
+        conn.commit()
+        
+    except Exception as e:
+        print(f"Error recording statement job {job_id}: {e}")
+        conn.rollback()
+        
+    finally:
+        close_db_connection(conn, cursor)
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _prune_jobs(cursor):
+    cursor.execute(
+        """
+        SELECT storage_path FROM statement_jobs
+        WHERE created_at < NOW() - INTERVAL %s SECOND AND storage_path IS NOT NULL
+        """,
+        (Config.STATEMENT_JOB_TTL,)
+    )
+    paths = [row['storage_path'] for row in cursor.fetchall()]
+    cursor.execute(
+        "DELETE FROM statement_jobs WHERE created_at < NOW() - INTERVAL %s SECOND",
+        (Config.STATEMENT_JOB_TTL,)
+    )
+    # Jobs whose render was lost, e.g. the web process that queued them
+    # restarted before it finished
+    cursor.execute(
+        """
+        UPDATE statement_jobs SET status = 'failed', finished_at = NOW()
+        WHERE status = 'pending' AND created_at < NOW() - INTERVAL %s SECOND
+        """,
+        (Config.STATEMENT_JOB_TIMEOUT,)
+    )
+    if paths:
+        after_commit(lambda: _remove_files(paths))
+
+def _submit_render(job_id, user, transactions, card_data, storage_path):
+    submitted_at = time.time()
+    executor = _get_executor()
+    try:
+        future = executor.submit(_render_job, user, transactions, card_data, storage_path)
+    except Exception as e:
+        print(f"Error queueing statement job {job_id}: {e}")
+        STATEMENT_RENDERS.inc(outcome='failed')
+        if isinstance(e, BrokenProcessPool):
+            _reset_executor(executor)
+        _fail_job(job_id)
+        return
+    with _futures_lock:
+        _futures[job_id] = future
+    future.add_done_callback(_record_render)
+    future.add_done_callback(lambda done: _finish_job(job_id, submitted_at, executor, done))
+
+def submit_statement_job(user_id, user, transactions, card_data, filename):
+    """Record a pending job and queue its render; returns the job id, or None."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor()
+    job_id = uuid.uuid4().hex
+    storage_path = _storage_path(user_id, job_id) if Config.STATEMENT_STORAGE_DIR else None
+    
+    try:
+        _prune_jobs(cursor)
+        cursor.execute(
+            "INSERT INTO statement_jobs (id, user_id, filename) VALUES (%s, %s, %s)",
+            (job_id, user_id, filename)
+        )
+        conn.commit()
+        
+    except Exception as e:
+        print(f"Error creating statement job: {e}")
+        conn.rollback()
+        return None
+        
+    finally:
+        close_db_connection(conn, cursor)
+    
+    # Only once the row is committed, so the done callback has a row to update
+    after_commit(lambda: _submit_render(job_id, user, transactions, card_data, storage_path))
+    return job_id
+
+def _fetch_job(job_id, user_id, columns):
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            f"SELECT {columns} FROM statement_jobs WHERE id = %s AND user_id = %s",
+            (job_id, user_id)
+        )
+        return cursor.fetchone()
+        
+    except Exception as e:
+        print(f"Error getting statement job: {e}")
+        return None
+        
+    finally:
+        close_db_connection(conn, cursor)
+
+def get_statement_job(job_id, user_id):
+    job = _fetch_job(
+        job_id, user_id,
+        'status, filename, queued_seconds, render_seconds, TIMESTAMPDIFF(SECOND, created_at, NOW()) AS age_seconds'
+    )
+    if job is None:
+        return None
+    
+    status = job['status']
+    if status == 'pending' and job['age_seconds'] > Config.STATEMENT_JOB_TIMEOUT:
+        # Its render was lost; stop clients from polling forever
+        _fail_job(job_id)
+        status = 'failed'
+    elif status == 'pending':
+        with _futures_lock:
+            future = _futures.get(job_id)
+        # Only the worker that submitted the job can tell whether it has
+        # started; the others report it as pending
+        if future is not None and future.running():
+            status = 'running'
+    
+    result = {'job_id': job_id, 'status': status, 'filename': job['filename']}
+    if status == 'failed':
+        result['error'] = 'Failed to generate statement'
+    elif status == 'done':
+        result['queued_seconds'] = float(job['queued_seconds'])
+        result['render_seconds'] = float(job['render_seconds'])
+    return result
+
+def get_statement_result(job_id, user_id):
+    """Return (pdf_bytes_or_path, filename), or None when not ready."""
+    job = _fetch_job(job_id, user_id, 'status, filename, storage_path, content')
+    if job is None or job['status'] != 'done':
+        return None
+    
+    return job['storage_path'] or job['content'], job['filename']
@@ -0,0 +1,244 @@
+"""Bulk transaction import from CSV or NDJSON bank exports.
+
+Rows are parsed and validated as they stream in, their dates are converted
+with one exchange-rate lookup for the whole file, and everything is written
+in one transaction: executemany INSERTs in chunks, one aggregated ledger
+entry per card/date, one rollup row per day/category/card and one balance
+UPDATE per card.
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+from app.config import Config
+from app.models.ledger import CardLedger
+from app.models.spending_rollup import SpendingRollup
+from app.services.exchange_rate import get_exchange_rates_for_dates
+from app.services.events import publish_event
+from app.utils.cache import invalidate_dashboard
+from app.utils.database import get_db_connection, close_db_connection
+
+REQUIRED_FIELDS = ['card_id', 'transaction_type', 'merchant_name', 'amount_usd', 'category', 'transaction_date']
+TRANSACTION_TYPES = ('purchase', 'subscription', 'refund')
+MAX_REPORTED_ERRORS = 1000
+
+def iter_csv_rows(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    # Row numbers match the file, counting the header as line 1
+    for line_number, row in enumerate(reader, start=2):
+        yield line_number, row
+
+def iter_ndjson_rows(stream):
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, row
+
+def _parse_row(row, today):
+    if not isinstance(row, dict):
+        raise ValueError('Row is not a valid JSON object')
+    
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    
+    try:
+        card_id = int(row['card_id'])
+    except (TypeError, ValueError):
+        raise ValueError('card_id must be an integer')
+    
+    transaction_type = str(row['transaction_type']).strip().lower()
+    if transaction_type not in TRANSACTION_TYPES:
+        raise ValueError(f"transaction_type must be one of {', '.join(TRANSACTION_TYPES)}")
+    
+    try:
+        amount = Decimal(str(row['amount_usd']).strip()).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError('amount_usd must be a number')
+    if amount <= 0:
+        raise ValueError('amount_usd must be positive')
+    
+    try:
+        transaction_date = datetime.strptime(str(row['transaction_date']).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('transaction_date must be YYYY-MM-DD')
+    if transaction_date > today:
+        raise ValueError('Transaction date cannot be in future')
+    
+    is_recurring = row.get('is_recurring', False)
+    if isinstance(is_recurring, str):
+        is_recurring = is_recurring.strip().lower() in ('1', 'true', 'yes', 'y')
+    
+    return {
+        'card_id': card_id,
+        'transaction_type': transaction_type,
+        'merchant_name': str(row['merchant_name']).strip(),
+        'amount_usd': amount,
+        'category': str(row['category']).strip(),
+        'description': row.get('description') or None,
+        'transaction_date': transaction_date,
+        'is_recurring': bool(is_recurring)
+    }
+
+def import_transactions(user_id, rows, chunk_size=None):
+    """Validate and insert (line_number, row) pairs; returns a report dict.
+
+    A failed import returns {'error': message, 'code': code} instead, where
+    code is 'too_many_rows', 'conflict' (card balances changed meanwhile)
+    or 'database'.
+    """
+    chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+    started = time.perf_counter()
+    errors = []
+    failed = 0
+    
+    def reject(line_number, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': line_number, 'error': message})
+    
+    conn = get_db_connection()
+    if not conn:
+        return {'error': 'Database connection failed', 'code': 'database'}
+    
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            "SELECT id, current_balance FROM cards WHERE user_id = %s AND is_active = TRUE",
+            (user_id,)
+        )
+        balances = {card['id']: card['current_balance'] for card in cursor.fetchall()}
+        starting_balances = dict(balances)
+        
+        today = date.today()
+        accepted = []
+        total_rows = 0
+        
+        for line_number, row in rows:
+            total_rows += 1
+            if total_rows > Config.IMPORT_MAX_ROWS:
+                return {'error': f'Imports are limited to {Config.IMPORT_MAX_ROWS} rows per file', 'code': 'too_many_rows'}
+            
+            try:
+                parsed = _parse_row(row, today)
+            except ValueError as e:
+                reject(line_number, str(e))
+                continue
+            
+            card_id = parsed['card_id']
+            if card_id not in balances:
+                reject(line_number, 'Card not found')
+                continue
+            
+            # Same rule as a single POST /api/transactions, applied in file order
+            if parsed['transaction_type'] == 'refund':
+                balances[card_id] += parsed['amount_usd']
+            elif parsed['amount_usd'] > balances[card_id]:
+                reject(line_number, f"Insufficient balance on this card. Card balance: ${balances[card_id]:.2f}")
+                continue
+            else:
+                balances[card_id] -= parsed['amount_usd']
+            
+            accepted.append(parsed)
+        
+        rates = get_exchange_rates_for_dates({parsed['transaction_date'] for parsed in accepted})
+        for parsed in accepted:
+            parsed['exchange_rate'] = rates[parsed['transaction_date']]
+            parsed['amount_npr'] = round(float(parsed['amount_usd']) * parsed['exchange_rate'], 2)
+        
+        for offset in range(0, len(accepted), chunk_size):
+            chunk = accepted[offset:offset + chunk_size]
+            cursor.executemany(
+                """
+                INSERT INTO transactions 
+                (user_id, card_id, transaction_type, merchant_name, amount_usd, amount_npr,
+                 exchange_rate, category, description, transaction_date, is_recurring)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                [
+                    (
+                        user_id,
+                        parsed['card_id'],
+                        parsed['transaction_type'],
+                        parsed['merchant_name'],
+                        parsed['amount_usd'],
+                        parsed['amount_npr'],
+                        parsed['exchange_rate'],
+                        parsed['category'],
+                        parsed['description'],
+                        parsed['transaction_date'],
+                        parsed['is_recurring']
+                    )
+                    for parsed in chunk
+                ]
+            )
+        
+        # One ledger entry per card, date and direction instead of one per row
+        movements = {}
+        for parsed in accepted:
+            entry_type = 'refund' if parsed['transaction_type'] == 'refund' else 'purchase'
+            sign = 1 if entry_type == 'refund' else -1
+            key = (parsed['card_id'], parsed['transaction_date'], entry_type)
+            movements[key] = movements.get(key, 0) + sign * parsed['amount_usd']
+        CardLedger.record_many(cursor, [
+            (card_id, user_id, entry_type, amount, transaction_date, None)
+            for (card_id, transaction_date, entry_type), amount in movements.items()
+        ])
+        
+        SpendingRollup.apply(cursor, user_id, [
+            (parsed['transaction_date'], parsed['category'], parsed['card_id'],
+             parsed['amount_usd'], parsed['amount_npr'], 1)
+            for parsed in accepted
+        ])
+        
+        changed = {
+            card_id: balances[card_id] - starting_balances[card_id]
+            for card_id in balances if balances[card_id] != starting_balances[card_id]
+        }
+        if changed:
+            cursor.executemany(
+                """
+                UPDATE cards SET current_balance = current_balance + %s
+                WHERE id = %s AND user_id = %s AND current_balance + %s >= 0
+                """,
+                [(delta, card_id, user_id, delta) for card_id, delta in changed.items()]
+            )
+            if cursor.rowcount != len(changed):
+                conn.rollback()
+                return {'error': 'Card balances changed during the import, please retry', 'code': 'conflict'}
+        
+        conn.commit()
+        if accepted:
+            invalidate_dashboard(user_id, 'cards', 'recent_transactions', 'spending_summary')
+            publish_event(user_id, 'transaction', {
+                'action': 'imported',
+                'count': len(accepted),
+                'card_ids': sorted({parsed['card_id'] for parsed in accepted})
+            })
+        
+        elapsed = time.perf_counter() - started
+        return {
+            'imported': len(accepted),
+            'failed': failed,
+            'errors': errors,
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'rows_per_sec': round(total_rows / elapsed, 1) if elapsed > 0 else None
+        }
+        
+    except Exception as e:
+        print(f"Error importing transactions: {e}")
+        conn.rollback()
+        return {'error': 'Import failed', 'code': 'database'}
+        
+    finally:
+        close_db_connection(conn, cursor)
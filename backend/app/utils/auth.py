@@ -1,15 +1,154 @@
+import hashlib
+import secrets
+import threading
+import time
 import jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 from app.config import Config
 
+def token_digest(token):
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+class TokenCache:
+    """Bounded LRU of already verified tokens: digest -> decoded payload.
+
+    An entry is only trusted until the token's own exp, so a hit returns
+    exactly what jwt.decode would have returned, minus the HMAC and the
+    claims checks.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry['exp'] <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry
+
+    def set(self, digest, payload):
+        if 'exp' not in payload:
+            return
+        with self._lock:
+            self._entries[digest] = payload
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+class RevocationListUnavailable(Exception):
+    pass
+
+class RevocationList:
+    """In-memory set of revoked token digests, synced from revoked_tokens.
+
+    A revocation made in this process applies immediately; one made by
+    another worker applies once this process syncs, at most
+    JWT_REVOCATION_SYNC_SECONDS later. Digests are dropped once the token
+    would have expired anyway, so the set only holds live tokens.
+
+    Until the first load succeeds, is_revoked() fails closed: it raises
+    RevocationListUnavailable (token_required answers 503) and the next
+    call retries the load, so a freshly started worker never accepts a
+    token that was revoked before it came up. Once loaded, a failed sync
+    keeps serving the current set and retries after the interval.
+    """
+
+    def __init__(self, sync_interval=30):
+        self.sync_interval = sync_interval
+        self._expires = {}
+        self._last_id = 0
+        self._last_sync = None
+        self._loaded = False
+        self._attempts = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def is_revoked(self, digest):
+        if self._last_sync is None or time.monotonic() - self._last_sync > self.sync_interval:
+            self._sync()
+        if not self._loaded:
+            raise RevocationListUnavailable('Revoked tokens could not be loaded')
+        return digest in self._expires
+
+    def add(self, digest, expires_at):
+        with self._lock:
+            self._expires[digest] = expires_at
+
+    def _sync(self):
+        # Once loaded, one request per process pays for the sync and the
+        # others keep using the current set instead of queueing behind it
+        blocking = not self._loaded
+        attempts = self._attempts
+        if not self._sync_lock.acquire(blocking=blocking):
+            return
+        try:
+            if blocking and (self._loaded or self._attempts != attempts):
+                return  # another request loaded (or failed to) while this one waited
+            self._attempts += 1
+            self._load()
+            self._loaded = True
+        except Exception as e:
+            print(f"Error syncing revoked tokens: {e}")
+            if self._loaded:
+                self._last_sync = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def _load(self):
+        from app.utils.database import get_pool
+        pool = get_pool()
+        conn = pool.acquire()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT id, token_digest,
+                           TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', expires_at) AS expires_at
+                    FROM revoked_tokens
+                    WHERE id > %s AND expires_at > UTC_TIMESTAMP()
+                    ORDER BY id
+                    """,
+                    (self._last_id,)
+                )
+                rows = cursor.fetchall()
+            conn.commit()
+        finally:
+            pool.release(conn)
+        
+        now = time.time()
+        with self._lock:
+            for row in rows:
+                self._expires[bytes(row['token_digest'])] = float(row['expires_at'])
+                self._last_id = row['id']
+            for digest in [digest for digest, expires_at in self._expires.items() if expires_at <= now]:
+                del self._expires[digest]
+        self._last_sync = time.monotonic()
+
+
+_token_cache = TokenCache(max_entries=Config.JWT_CACHE_SIZE)
+_revocations = RevocationList(sync_interval=Config.JWT_REVOCATION_SYNC_SECONDS)
+
 def generate_token(user_id):
     expiration = datetime.utcnow() + timedelta(hours=Config.JWT_EXPIRATION_HOURS)
     payload = {
         'user_id' : user_id,
         'exp': int(expiration.timestamp()),
-        'iat': int(datetime.utcnow().timestamp()) # token issue time
+        'iat': int(datetime.utcnow().timestamp()), # token issue time
+        'jti': secrets.token_urlsafe(8) # makes every token unique, so revoking one never revokes another
     }
 
     token = jwt.encode(payload, 
@@ -18,31 +157,125 @@ def generate_token(user_id):
     
     return token
 
+STREAM_TICKET_AUDIENCE = 'events'
+
+def generate_stream_ticket(user_id):
+    """Short-lived, single-use credential for opening an event stream.
+
+    EventSource cannot send headers, so the stream URL has to carry the
+    credential; this keeps the long-lived login token out of access logs.
+    The audience claim stops a ticket from being accepted as a login token.
+    """
+    now = int(time.time())
+    payload = {
+        'user_id': user_id,
+        'aud': STREAM_TICKET_AUDIENCE,
+        'iat': now,
+        'exp': now + Config.EVENTS_TICKET_SECONDS,
+        'jti': secrets.token_urlsafe(12)
+    }
+    return jwt.encode(payload, Config.JWT_SECRET_KEY, algorithm=Config.JWT_ALGORITHM)
+
+def redeem_stream_ticket(ticket):
+    """Return the ticket's user_id, or None if it is invalid, expired or already used."""
+    from app.utils.cache import get_cache
+
+    try:
+        payload = jwt.decode(ticket, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM], audience=STREAM_TICKET_AUDIENCE)
+    except jwt.InvalidTokenError:
+        return None
+
+    # Shared between workers with CACHE_BACKEND=redis; per process otherwise
+    key = f"events:ticket:{payload['jti']}"
+    cache = get_cache()
+    if cache.get(key) is not None:
+        return None
+    cache.set(key, True, ttl=Config.EVENTS_TICKET_SECONDS + 5)
+    return payload['user_id']
+
 def verify_token(token):
+    digest = token_digest(token)
+    if _revocations.is_revoked(digest):
+        return None
+    
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
     
+    _token_cache.set(digest, payload)
+    return payload
+
+def revoke_token(token):
+    """Reject this token from now on, in every worker. Returns False if it was not valid."""
+    payload = verify_token(token)
+    if not payload:
+        return False
+    
+    from app.utils.database import get_db_connection, close_db_connection
+    digest = token_digest(token)
+    
+    conn = get_db_connection()
+    if not conn:
+        return False
+    
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            """
+            INSERT IGNORE INTO revoked_tokens (token_digest, user_id, expires_at)
+            VALUES (%s, %s, %s)
+            """,
+            (digest, payload['user_id'], datetime.utcfromtimestamp(payload['exp']))
+        )
+        conn.commit()
+        
+        _revocations.add(digest, payload['exp'])
+        _token_cache.delete(digest)
+        return True
+        
+    except Exception as e:
+        print(f"Error revoking token: {e}")
+        conn.rollback()
+        return False
+        
+    finally:
+        close_db_connection(conn, cursor)
+
+def get_request_token():
+    """Bearer token from the Authorization header; raises ValueError if malformed."""
+    if 'Authorization' not in request.headers:
+        return None
+    try:
+        return request.headers['Authorization'].split(' ')[1]
+    except IndexError:
+        raise ValueError('Invalid token format. Expected "Bearer <token>"')
+    
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(' ')[1]
-            except IndexError:
-                return jsonify({'error': 'Invalid token format. Expected "Bearer <token>"'}), 401
+        try:
+            token = get_request_token()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 401
             
         if not token:
             return jsonify({'error': 'Token is missing'}), 401 
 
-        payload = verify_token(token)
+        try:
+            payload = verify_token(token)
+        except RevocationListUnavailable as e:
+            print(f"Token check unavailable: {e}")
+            response = jsonify({'error': 'Authentication is temporarily unavailable, please retry'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
 
         if not payload:
             return jsonify({'error': 'Token is invalid or expired'}), 401
@@ -0,0 +1,201 @@
+"""Read-through cache for per-user query results.
+
+CACHE_BACKEND=memory keeps entries in each worker process, and
+invalidation only reaches the process that made the change; other workers
+serve stale data until CACHE_DEFAULT_TTL runs out. It is meant for a
+single process (development, tests). Production, with several workers or
+hosts, needs CACHE_BACKEND=redis.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from app.config import Config
+
+def load_cacheable(loader):
+    """Run loader and return (value, cacheable).
+
+    Models log database errors and return None, [] or {}; a value loaded
+    while a query failed is returned but must not be cached for the TTL.
+    """
+    from app.utils.database import database_errors
+
+    errors = database_errors()
+    value = loader()
+    return value, value is not None and database_errors() == errors
+
+class BaseCache:
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'deletes': 0}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get_or_set(self, key, loader, ttl=None):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value, cacheable = load_cacheable(loader)
+        if cacheable:
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0
+        return stats
+
+class MemoryCache(BaseCache):
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries=10000, default_ttl=300):
+        super().__init__()
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._count('hits')
+                    return value
+                del self._entries[key]
+        self._count('misses')
+        return None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._count('sets')
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        self._count('deletes', len(keys))
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats['entries'] = len(self._entries)
+        stats['backend'] = 'memory'
+        return stats
+
+class RedisCache(BaseCache):
+    """Cache shared between workers through a Redis-compatible server.
+
+    Needs the optional `redis` package (pip install redis).
+    """
+
+    def __init__(self, url, default_ttl=300, prefix='paywatch:'):
+        super().__init__()
+        import redis
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        try:
+            raw = self._client.get(self.prefix + key)
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            raw = None
+
+        if raw is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self._client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl or self.default_ttl))
+            self._count('sets')
+        except Exception as e:
+            print(f"Cache set error: {e}")
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self._client.delete(*[self.prefix + key for key in keys])
+            self._count('deletes', len(keys))
+        except Exception as e:
+            print(f"Cache delete error: {e}")
+
+    def stats(self):
+        stats = super().stats()
+        stats['backend'] = 'redis'
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if Config.CACHE_BACKEND == 'redis':
+                    _cache = RedisCache(Config.CACHE_REDIS_URL, default_ttl=Config.CACHE_DEFAULT_TTL)
+                else:
+                    _cache = MemoryCache(max_entries=Config.CACHE_MAX_ENTRIES, default_ttl=Config.CACHE_DEFAULT_TTL)
+    return _cache
+
+DASHBOARD_SECTIONS = ('cards', 'recent_transactions', 'spending_summary', 'active_subscriptions', 'subscription_summary')
+
+def dashboard_range(today=None):
+    """(start, end) of the dashboard's spending summary: month to date."""
+    today = today or date.today()
+    return date(today.year, today.month, 1), today
+
+def dashboard_key(user_id, section, *params):
+    """Cache key of a dashboard section; params are the section's query
+    arguments, e.g. the spending summary's date range."""
+    return ':'.join(['dashboard', str(user_id), section, *(str(param) for param in params)])
+
+def _dashboard_section_params(section):
+    return dashboard_range() if section == 'spending_summary' else ()
+
+def invalidate_dashboard(user_id, *sections):
+    """Drop cached dashboard sections for a user (all of them by default).
+
+    Keys are deleted right away and again once the surrounding request
+    commits, so a concurrent reader cannot re-cache pre-commit data.
+    """
+    from app.utils.database import after_commit
+
+    keys = [
+        dashboard_key(user_id, section, *_dashboard_section_params(section))
+        for section in (sections or DASHBOARD_SECTIONS)
+    ]
+    cache = get_cache()
+    cache.delete(*keys)
+    after_commit(lambda: cache.delete(*keys))
+
+def alert_count_key(user_id):
+    return f"alerts:{user_id}:unread_count"
+
+def invalidate_alert_count(user_id):
+    """Drop a user's cached unread alert count, now and after commit."""
+    from app.utils.database import after_commit
+
+    key = alert_count_key(user_id)
+    cache = get_cache()
+    cache.delete(key)
+    after_commit(lambda: cache.delete(key))
@@ -0,0 +1,50 @@
+"""Shared thread pool for independent queries a request runs side by side.
+
+Every pool thread checks out its own pooled connection, so the pool
+threads together hold up to QUERY_WORKERS connections on top of the ones
+the request threads hold. Size them together: DB_POOL_MAX_SIZE should
+cover the request worker threads plus QUERY_WORKERS, or requests start
+waiting for connections (DB_POOL_TIMEOUT). One request runs at most
+QUERY_MAX_PER_REQUEST tasks at a time, so a single busy page cannot take
+the whole pool.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from app.config import Config
+from app.utils.metrics import capture_request_queries, inherit_request_queries
+from app.utils.query_log import capture_query_logs, inherit_query_logs
+from app.utils.profiler import capture_profile, profile_worker
+
+_executor = ThreadPoolExecutor(max_workers=Config.QUERY_WORKERS, thread_name_prefix='query')
+
+def run_concurrently(tasks):
+    """Run independent callables on the shared query pool.
+
+    `tasks` maps a name to a zero-argument callable; returns the same names
+    mapped to results. Each callable runs outside the request, so model
+    calls check out their own pooled connection instead of sharing the
+    request's unit of work. At most QUERY_MAX_PER_REQUEST of them run at
+    once. The first exception raised is re-raised. Statements they run
+    still count towards the caller's query log, budgets and per-request DB
+    metrics, and a profiled request's profile includes their stacks.
+    """
+    query_logs = capture_query_logs()
+    request_queries = capture_request_queries()
+    profile = capture_profile()
+    pending = deque(tasks.items())
+    results = {}
+    
+    def drain():
+        with inherit_query_logs(query_logs), inherit_request_queries(request_queries), profile_worker(profile):
+            while True:
+                try:
+                    name, task = pending.popleft()
+                except IndexError:
+                    return
+                results[name] = task()
+    
+    workers = min(len(pending), max(1, Config.QUERY_MAX_PER_REQUEST))
+    futures = [_executor.submit(drain) for _ in range(workers)]
+    for future in futures:
+        future.result()
+    return {name: results[name] for name in tasks}
@@ -1,30 +1,454 @@
+import re
+import threading
+import time
+from collections import deque
 import pymysql
+from flask import g, has_request_context, jsonify
 from app.config import Config
+from app.utils.metrics import record_query
+from app.utils.query_log import record_statement
 
-def get_db_connection():
-    try:
+class PoolTimeout(Exception):
+    pass
+
+_WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+def write_count(connection):
+    """Data-changing statements sent on this connection so far."""
+    return getattr(connection, 'write_count', 0)
+
+_errors = threading.local()
+
+def database_errors():
+    """Failed statements and connection checkouts on this thread so far.
+
+    Models log and swallow database errors, so compare this before and
+    after a call to tell an empty result from a failed query.
+    """
+    return getattr(_errors, 'count', 0)
+
+def _count_database_error():
+    _errors.count = database_errors() + 1
+
+class InstrumentedCursor(pymysql.cursors.DictCursor):
+    """DictCursor that reports every statement's duration to the metrics
+    registry and, when enabled, to the per-request query log.
+
+    executemany() sends its batches through execute(), so each round trip
+    is counted once.
+    """
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        self._executed = None
+        try:
+            return super().execute(query, args)
+        except Exception:
+            _count_database_error()
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            if isinstance(query, str) and _WRITE_STATEMENT.match(query):
+                # Lets the unit of work tell read-only scopes from abandoned writes
+                self.connection.write_count = write_count(self.connection) + 1
+            record_query(seconds)
+            record_statement(self, self._executed or query, seconds)
+
+class ConnectionPool:
+    """Bounded pool of pymysql connections shared by every model and service."""
+
+    def __init__(self, min_size=2, max_size=10, max_lifetime=3600, timeout=10, health_check_interval=30):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()
+        self._created_at = {}
+        self._last_used = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'health_check_failures': 0
+        }
+
+    def _connect(self):
         connection = pymysql.connect(
             host=Config.DB_HOST,
             user=Config.DB_USER,
             password=Config.DB_PASSWORD,
             database=Config.DB_NAME,
             charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            connect_timeout=50
+            cursorclass=InstrumentedCursor,
+            connect_timeout=Config.DB_CONNECT_TIMEOUT
         )
-        
-        if connection.open:
-            return connection
-            
+        now = time.monotonic()
+        self._created_at[id(connection)] = now
+        self._last_used[id(connection)] = now
+        return connection
+
+    def _forget(self, connection):
+        self._created_at.pop(id(connection), None)
+        self._last_used.pop(id(connection), None)
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, connection):
+        now = time.monotonic()
+        created_at = self._created_at.get(id(connection), 0)
+
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+
+        if not connection.open:
+            return False
+
+        # Only ping connections that have been idle for a while, a busy pool
+        # should not pay an extra round trip on every checkout.
+        if now - self._last_used.get(id(connection), 0) > self.health_check_interval:
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                with self._lock:
+                    self._stats['health_check_failures'] += 1
+                return False
+
+        return True
+
+    def prefill(self):
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._stats['created'] += 1
+                self._idle.append(connection)
+                self._available.notify()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        while True:
+            connection = None
+            create = False
+
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f'Timed out after {self.timeout}s waiting for a database connection')
+                    if not waited:
+                        waited = True
+                        self._stats['waits'] += 1
+                    self._available.wait(remaining)
+
+                if self._idle:
+                    connection = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._available.notify()
+                    raise
+                with self._lock:
+                    self._stats['created'] += 1
+                    self._stats['checkouts'] += 1
+                return connection
+
+            if self._is_usable(connection):
+                with self._lock:
+                    self._stats['checkouts'] += 1
+                return connection
+
+            self._discard(connection)
+
+    def release(self, connection, discard=False, reset=True):
+        if connection is None:
+            return
+
+        if not connection.open:
+            discard = True
+        elif not discard and reset:
+            try:
+                # Never hand the next borrower somebody else's open transaction
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        if discard or not self._is_usable(connection):
+            self._discard(connection)
+            return
+
+        self._last_used[id(connection)] = time.monotonic()
+        with self._lock:
+            self._idle.append(connection)
+            self._available.notify()
+
+    def _discard(self, connection):
+        self._forget(connection)
+        self._close_quietly(connection)
+        with self._lock:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._available.notify()
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    min_size=Config.DB_POOL_MIN_SIZE,
+                    max_size=Config.DB_POOL_MAX_SIZE,
+                    max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    health_check_interval=Config.DB_POOL_HEALTH_CHECK_INTERVAL
+                )
+    return _pool
+
+def get_pool_stats():
+    return get_pool().stats()
+
+class UnitOfWork:
+    """One pooled connection and one database transaction per request.
+
+    Every get_db_connection() call made while handling a request opens a
+    scope on the same connection. Nested scopes are protected by a
+    savepoint so a model that rolls back only discards its own work. The
+    transaction is committed once, in after_request, so a failed commit
+    still turns into a 500 for the client; teardown rolls back whatever is
+    left and returns the connection to the pool.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.depth = 0
+        self.dirty = False
+        self.rollback_only = False
+        self._savepoint_counter = 0
+        self._callbacks = []
+
+    def begin(self):
+        savepoint = None
+        if self.depth > 0 or self.dirty:
+            self._savepoint_counter += 1
+            savepoint = f"uow_sp_{self._savepoint_counter}"
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"SAVEPOINT {savepoint}")
+
+        self.depth += 1
+        return ScopedConnection(self, savepoint, len(self._callbacks), write_count(self.connection))
+
+    def end(self):
+        self.depth = max(0, self.depth - 1)
+
+    def rollback_scope(self, savepoint, callback_mark):
+        del self._callbacks[callback_mark:]
+        if savepoint:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+        else:
+            self.connection.rollback()
+            self.dirty = False
+
+    def after_commit(self, callback):
+        self._callbacks.append(callback)
+
+    def commit(self):
+        """Commit the request's work; returns False if the commit failed
+        (the work is rolled back). After-commit callbacks run on success."""
+        if not self.dirty:
+            return True
+        if self.rollback_only:
+            return False
+        try:
+            self.connection.commit()
+        except Exception as e:
+            print(f"Error committing unit of work: {e}")
+            self.rollback_only = True
+            return False
+        self.dirty = False
+
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error running after-commit callback: {e}")
+        return True
+
+    def finish(self):
+        """Return the connection to the pool; anything not committed yet is rolled back."""
+        self._callbacks = []
+        get_pool().release(self.connection)
+
+class ScopedConnection:
+    """Connection handed to model code inside a request.
+
+    commit() is deferred to the end of the request and rollback() only
+    undoes the work done since this scope was opened.
+    """
+
+    def __init__(self, unit_of_work, savepoint, callback_mark, write_mark):
+        self._unit_of_work = unit_of_work
+        self._savepoint = savepoint
+        self._callback_mark = callback_mark
+        self._write_mark = write_mark
+        self._settled = False
+
+    def cursor(self, *args, **kwargs):
+        return self._unit_of_work.connection.cursor(*args, **kwargs)
+
+    def commit(self):
+        self._unit_of_work.dirty = True
+        self._settled = True
+
+    def rollback(self):
+        self._unit_of_work.rollback_scope(self._savepoint, self._callback_mark)
+        self._settled = True
+
+    def close_scope(self):
+        # A scope that wrote but returned without commit() or rollback() is
+        # abandoned; discard its writes so a later scope's commit() cannot
+        # persist them. Read-only scopes skip the extra round trip.
+        if not self._settled and write_count(self._unit_of_work.connection) > self._write_mark:
+            try:
+                self.rollback()
+            except Exception as e:
+                print(f"Error rolling back abandoned scope: {e}")
+                self._unit_of_work.rollback_only = True
+        self._unit_of_work.end()
+
+    def close(self):
+        # The connection belongs to the request; close_db_connection() ends the scope
+        pass
+
+    @property
+    def open(self):
+        return self._unit_of_work.connection.open
+
+    def __getattr__(self, name):
+        return getattr(self._unit_of_work.connection, name)
+
+def get_unit_of_work(create=False):
+    if not has_request_context():
+        return None
+
+    unit_of_work = g.get('db_unit_of_work')
+    if unit_of_work is None and create:
+        unit_of_work = UnitOfWork(get_pool().acquire())
+        g.db_unit_of_work = unit_of_work
+    return unit_of_work
+
+def after_commit(callback):
+    """Run callback once the current request's transaction has committed,
+    or straight away when there is no request-scoped transaction."""
+    unit_of_work = get_unit_of_work()
+    if unit_of_work is None:
+        callback()
+    else:
+        unit_of_work.after_commit(callback)
+
+def get_db_connection():
+    try:
+        unit_of_work = get_unit_of_work(create=True)
+        if unit_of_work is not None:
+            return unit_of_work.begin()
+        return get_pool().acquire()
     except Exception as e:
         print(f"Error connecting to MySQL: {e}")
+        _count_database_error()
         return None
 
 def close_db_connection(connection, cursor=None):
     try:
         if cursor:
             cursor.close()
-        if connection and connection.open:
-            connection.close()
     except Exception as e:
-        print(f"Error closing connection: {e}")
\ No newline at end of file
+        print(f"Error closing cursor: {e}")
+
+    try:
+        if isinstance(connection, ScopedConnection):
+            connection.close_scope()
+        elif connection:
+            get_pool().release(connection)
+    except Exception as e:
+        print(f"Error closing connection: {e}")
+
+def init_db(app):
+    try:
+        get_pool().prefill()
+    except Exception as e:
+        print(f"Error warming up database pool: {e}")
+
+    # Register init_db() after the other after_request hooks: Flask runs them
+    # in reverse order, so this commit happens first and the metrics and
+    # query log see the final status.
+    @app.after_request
+    def commit_unit_of_work(response):
+        unit_of_work = g.get('db_unit_of_work')
+        if unit_of_work is None:
+            return response
+        if response.status_code >= 500:
+            unit_of_work.rollback_only = True
+            return response
+        if not unit_of_work.commit():
+            response = jsonify({'error': 'Failed to save changes'})
+            response.status_code = 500
+        return response
+
+    @app.teardown_request
+    def finish_unit_of_work(exc):
+        # Also reached without after_request when an error propagates
+        unit_of_work = g.pop('db_unit_of_work', None)
+        if unit_of_work is not None:
+            unit_of_work.finish()
@@ -0,0 +1,252 @@
+"""In-process metrics with a Prometheus text exposition at /api/metrics.
+
+Each worker process keeps its own counters; scrape every worker (or run
+one worker per target) and let Prometheus sum them. Labels are limited
+to route-level values such as blueprint, endpoint, method and status, so
+the series count stays bounded whatever URLs clients send.
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from flask import Response, g, has_request_context, request
+from app.config import Config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # per-bucket counts (last slot is +Inf), sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _render_series(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'paywatch_http_request_duration_seconds', 'Time spent handling a request, until the response is returned.',
+    ('blueprint', 'endpoint', 'method')
+))
+REQUESTS = registry.register(Counter(
+    'paywatch_http_requests_total', 'Requests handled, by response status.',
+    ('blueprint', 'endpoint', 'method', 'status')
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    'paywatch_http_requests_in_flight', 'Requests currently being handled.'
+))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    'paywatch_db_query_duration_seconds', 'Time spent in a single SQL statement.', buckets=QUERY_BUCKETS
+))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    'paywatch_db_queries_per_request', 'SQL statements run while handling a request.',
+    ('blueprint', 'endpoint'), buckets=QUERY_COUNT_BUCKETS
+))
+DB_TIME_PER_REQUEST = registry.register(Histogram(
+    'paywatch_db_time_per_request_seconds', 'Time spent in SQL while handling a request.',
+    ('blueprint', 'endpoint')
+))
+EXCHANGE_RATE_FETCH = registry.register(Histogram(
+    'paywatch_exchange_rate_fetch_duration_seconds', 'Calls to the exchange rate API, by outcome.',
+    ('outcome',)
+))
+STATEMENT_RENDER = registry.register(Histogram(
+    'paywatch_statement_render_duration_seconds', 'PDF statement rendering time in the worker process.'
+))
+STATEMENT_RENDERS = registry.register(Counter(
+    'paywatch_statement_renders_total', 'Statement render jobs finished, by outcome.', ('outcome',)
+))
+
+class RequestQueries:
+    """Statements run for one request, including those on the query pool."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+_local = threading.local()
+
+def capture_request_queries():
+    """The current request's statement totals; hand them to
+    inherit_request_queries() on a worker thread."""
+    inherited = getattr(_local, 'request_queries', None)
+    if inherited is not None:
+        return inherited
+    if not has_request_context():
+        return None
+    request_queries = g.get('db_queries')
+    if request_queries is None:
+        request_queries = g.db_queries = RequestQueries()
+    return request_queries
+
+@contextmanager
+def inherit_request_queries(request_queries):
+    """Count statements run on this thread towards another thread's request."""
+    previous = getattr(_local, 'request_queries', None)
+    _local.request_queries = request_queries
+    try:
+        yield
+    finally:
+        _local.request_queries = previous
+
+def record_query(seconds):
+    """Called by the instrumented cursor for every statement sent to MySQL."""
+    DB_QUERY_LATENCY.observe(seconds)
+    request_queries = capture_request_queries()
+    if request_queries is not None:
+        request_queries.add(seconds)
+
+def _route_labels():
+    return {
+        'blueprint': request.blueprint or '',
+        # Unmatched URLs share one label so scanners cannot blow up the series count
+        'endpoint': request.endpoint or 'unmatched'
+    }
+
+def metrics_token_required(f):
+    """Guard operational endpoints with METRICS_TOKEN (as a bearer token) when it is set."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        expected = f"Bearer {Config.METRICS_TOKEN}"
+        if Config.METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return {'error': 'Unauthorized'}, 401
+        return f(*args, **kwargs)
+    return decorated
+
+def init_metrics(app):
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+
+        labels = _route_labels()
+        REQUEST_LATENCY.observe(time.perf_counter() - started, method=request.method, **labels)
+        REQUESTS.inc(method=request.method, status=response.status_code, **labels)
+        request_queries = g.get('db_queries') or RequestQueries()
+        DB_QUERIES_PER_REQUEST.observe(request_queries.count, **labels)
+        DB_TIME_PER_REQUEST.observe(request_queries.seconds, **labels)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        if g.pop('metrics_started', None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+
+    @app.route('/api/metrics')
+    @metrics_token_required
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
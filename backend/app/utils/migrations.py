@@ -0,0 +1,105 @@
+"""Versioned SQL migrations from backend/migrations.
+
+Files are named NNNN_description.sql and applied in order. Each applied
+version is recorded in schema_migrations so `flask db-migrate` only runs
+what is new. MySQL commits DDL implicitly, so a migration that fails half
+way is not rolled back; fix it and re-run, or finish it by hand and mark it
+applied with `--fake <version>`.
+"""
+import os
+import re
+from app.utils.database import get_db_connection, close_db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_[\w-]+\.sql$')
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for name in sorted(os.listdir(directory)):
+        if MIGRATION_FILE.match(name):
+            migrations.append((name[:-4], os.path.join(directory, name)))
+    return migrations
+
+def split_statements(sql):
+    """Split a migration file on semicolons that end a line, dropping -- comments."""
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('--'):
+            continue
+        current.append(line)
+        if stripped.endswith(';'):
+            statements.append('\n'.join(current).rstrip().rstrip(';'))
+            current = []
+    if current:
+        statements.append('\n'.join(current))
+    return statements
+
+def _ensure_migrations_table(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+def get_applied_versions():
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor()
+    
+    try:
+        _ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row['version'] for row in cursor.fetchall()}
+        
+    except Exception as e:
+        print(f"Error reading schema_migrations: {e}")
+        return None
+        
+    finally:
+        close_db_connection(conn, cursor)
+
+def get_pending_migrations():
+    applied = get_applied_versions()
+    if applied is None:
+        return None
+    return [(version, path) for version, path in discover_migrations() if version not in applied]
+
+def migrations_through(pending, target):
+    """The pending migrations up to and including `target`, given as its
+    number (0004) or full name (0004_daily_spending); None if none matches."""
+    for position, (version, _) in enumerate(pending):
+        if version == target or version.split('_', 1)[0] == target:
+            return pending[:position + 1]
+    return None
+
+def apply_migration(version, path, fake=False):
+    conn = get_db_connection()
+    if not conn:
+        return False
+    
+    cursor = conn.cursor()
+    
+    try:
+        if not fake:
+            with open(path, encoding='utf-8') as migration:
+                for statement in split_statements(migration.read()):
+                    cursor.execute(statement)
+        
+        cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        conn.commit()
+        return True
+        
+    except Exception as e:
+        print(f"Error applying migration {version}: {e}")
+        conn.rollback()
+        return False
+        
+    finally:
+        close_db_connection(conn, cursor)
@@ -0,0 +1,94 @@
+"""bcrypt hashing on a small dedicated thread pool.
+
+bcrypt releases the GIL, so running it on PASSWORD_HASH_WORKERS threads
+caps how many cores a login burst can take while the request workers
+keep serving other routes. At most PASSWORD_HASH_QUEUE hashes may be
+running or waiting at once; past that, callers get PasswordHasherBusy
+straight away instead of joining an ever-growing queue.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+from app.config import Config
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated; the route answers 503."""
+
+class PasswordHasher:
+    def __init__(self, workers=2, max_pending=4, timeout=10, rounds=12):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._max_pending = max_pending
+        self._stats_lock = threading.Lock()
+        self._stats = {'hashed': 0, 'checked': 0, 'rejected': 0, 'pending': 0}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordHasherBusy('Password hashing queue is full')
+
+        self._count('pending')
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._count('pending', -1)
+            self._slots.release()
+            raise
+        # The slot is released when the hash finishes, not when the caller
+        # stops waiting, so a timed-out request still counts against the queue
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._count('rejected')
+            raise PasswordHasherBusy('Timed out waiting for password hashing')
+
+    def _release(self, future):
+        self._count('pending', -1)
+        self._slots.release()
+
+    def hash(self, password):
+        hashed = self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        self._count('hashed')
+        return hashed.decode('utf-8')
+
+    def check(self, password, password_hash):
+        matched = self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+        self._count('checked')
+        return matched
+
+    def needs_rehash(self, password_hash):
+        """True when the stored hash was made with a different work factor."""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['max_pending'] = self._max_pending
+        stats['rounds'] = self.rounds
+        return stats
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher():
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher(
+                    workers=Config.PASSWORD_HASH_WORKERS,
+                    max_pending=Config.PASSWORD_HASH_QUEUE,
+                    timeout=Config.PASSWORD_HASH_TIMEOUT,
+                    rounds=Config.BCRYPT_ROUNDS
+                )
+    return _hasher
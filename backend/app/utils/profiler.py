@@ -0,0 +1,263 @@
+"""Statistical profiler for slow requests.
+
+One daemon thread samples the stacks of the threads that are handling
+profiled requests every PROFILE_INTERVAL_MS. It reads
+sys._current_frames(), so the profiled code does not slow down. The
+sampler sleeps whenever no request is being profiled. Threads from the
+run_concurrently() pool are sampled into the profile of the request they
+are working for. The body of a streamed response is only sampled when the
+profile was forced with the header, and long-lived streams
+(UNPROFILED_ENDPOINTS, e.g. the event stream) are never profiled
+automatically. Statement PDFs are rendered in another process, which the sampler
+cannot see; their queue and render times are recorded on the statement
+job instead (GET /api/statements/jobs/<id>).
+
+A request is profiled when PROFILE_REQUESTS is on, or when it sends
+`X-Profile: 1` with a token belonging to one of PROFILE_ALLOWED_USERS.
+The samples are kept if the request took at least PROFILE_SLOW_MS, or
+always if the header asked for them. Profiles are stored in Brendan
+Gregg's collapsed-stack format (flamegraph.pl, speedscope, inferno). The
+last PROFILE_MAX_PROFILES are kept in memory, or in PROFILE_DIR when set
+so every worker's profiles end up in one place.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, has_request_context, request
+from app.config import Config
+
+MAX_STACK_DEPTH = 128
+# Streams that stay open for the whole session; sampling them would keep
+# the sampler busy and fill the store with idle "slow requests"
+UNPROFILED_ENDPOINTS = {'events.stream_events'}
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def collapse_stack(frame, max_depth=MAX_STACK_DEPTH):
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class StackSampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+            self._thread.start()
+
+    def start(self, thread_id, samples=None):
+        """Sample thread_id into `samples` (a new Counter by default) until stop()."""
+        samples = Counter() if samples is None else samples
+        with self._lock:
+            self._targets[thread_id] = samples
+            self._ensure_thread()
+            self._wakeup.notify()
+        return samples
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, None)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                while not self._targets:
+                    self._wakeup.wait()
+                frames = sys._current_frames()
+                for thread_id, samples in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own_id:
+                        samples[collapse_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+class ProfileStore:
+    """Keeps the newest `max_profiles` profiles, in memory or as files in `directory`."""
+
+    def __init__(self, max_profiles=50, directory=None):
+        self.directory = directory
+        self._profiles = deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id):
+        return os.path.join(self.directory, f"{profile_id}.collapsed")
+
+    def add(self, meta, collapsed, profile_id=None):
+        profile_id = profile_id or uuid.uuid4().hex
+        entry = {'id': profile_id, **meta}
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(profile_id), 'w') as output:
+                output.write(collapsed)
+        else:
+            entry['collapsed'] = collapsed
+
+        with self._lock:
+            evicted = self._profiles[0] if len(self._profiles) == self._profiles.maxlen else None
+            self._profiles.append(entry)
+
+        if evicted and self.directory:
+            try:
+                os.remove(self._path(evicted['id']))
+            except OSError:
+                pass
+        return profile_id
+
+    def list(self):
+        with self._lock:
+            return [{key: value for key, value in entry.items() if key != 'collapsed'} for entry in reversed(self._profiles)]
+
+    def get(self, profile_id):
+        with self._lock:
+            entry = next((entry for entry in self._profiles if entry['id'] == profile_id), None)
+        if entry is None:
+            # May have been written by another worker sharing PROFILE_DIR
+            if self.directory and all(c in '0123456789abcdef' for c in profile_id) and os.path.exists(self._path(profile_id)):
+                with open(self._path(profile_id)) as source:
+                    return source.read()
+            return None
+        if 'collapsed' in entry:
+            return entry['collapsed']
+        try:
+            with open(self._path(profile_id)) as source:
+                return source.read()
+        except OSError:
+            return None
+
+_sampler = None
+_store = None
+_profiler_lock = threading.Lock()
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        with _profiler_lock:
+            if _sampler is None:
+                _sampler = StackSampler(interval=Config.PROFILE_INTERVAL_MS / 1000)
+    return _sampler
+
+def get_profile_store():
+    global _store
+    if _store is None:
+        with _profiler_lock:
+            if _store is None:
+                _store = ProfileStore(max_profiles=Config.PROFILE_MAX_PROFILES, directory=Config.PROFILE_DIR)
+    return _store
+
+def allowed_profile_users():
+    return {int(user_id) for user_id in Config.PROFILE_ALLOWED_USERS.split(',') if user_id.strip().isdigit()}
+
+def _header_user_allowed():
+    from app.utils.auth import RevocationListUnavailable, get_request_token, verify_token
+
+    allowed = allowed_profile_users()
+    if not allowed:
+        return False
+    try:
+        token = get_request_token()
+    except ValueError:
+        return False
+    try:
+        payload = verify_token(token) if token else None
+    except RevocationListUnavailable:
+        return False
+    return bool(payload) and payload.get('user_id') in allowed
+
+def capture_profile():
+    """The current request's samples, or None when it is not being profiled."""
+    if not has_request_context():
+        return None
+    return g.get('profile_samples')
+
+@contextmanager
+def profile_worker(samples):
+    """Sample this (pool) thread into a request's profile while the block runs."""
+    if samples is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    get_sampler().start(thread_id, samples)
+    try:
+        yield
+    finally:
+        get_sampler().stop(thread_id)
+
+def _format_collapsed(samples):
+    return ''.join(f"{stack} {count}\n" for stack, count in samples.most_common(Config.PROFILE_MAX_STACKS))
+
+def init_profiler(app):
+    @app.before_request
+    def start_profiling():
+        forced = request.headers.get('X-Profile') == '1' and _header_user_allowed()
+        if not (forced or (Config.PROFILE_REQUESTS and request.endpoint not in UNPROFILED_ENDPOINTS)):
+            return
+        g.profile_forced = forced
+        g.profile_started = time.perf_counter()
+        g.profile_thread = threading.get_ident()
+        g.profile_samples = get_sampler().start(g.profile_thread)
+
+    @app.after_request
+    def store_profile(response):
+        thread_id = g.pop('profile_thread', None)
+        if thread_id is None:
+            return response
+
+        forced = g.profile_forced
+        started = g.profile_started
+        meta = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'streamed': response.is_streamed
+        }
+
+        def finish(profile_id=None):
+            samples = get_sampler().stop(thread_id)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if samples and (forced or elapsed_ms >= Config.PROFILE_SLOW_MS):
+                return get_profile_store().add({
+                    **meta,
+                    'elapsed_ms': round(elapsed_ms, 2),
+                    'samples': sum(samples.values()),
+                    'created_at': datetime.utcnow().isoformat()
+                }, _format_collapsed(samples), profile_id=profile_id)
+            return None
+
+        if response.is_streamed and forced:
+            # The body is produced after this hook returns, on this same
+            # thread; keep sampling until the server closes the response.
+            # A forced profile is always kept, so it gets the header up front.
+            profile_id = uuid.uuid4().hex
+            response.call_on_close(lambda: finish(profile_id))
+            response.headers['X-Profile-Id'] = profile_id
+            return response
+
+        profile_id = finish()
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        # after_request does not run when an error propagates (debug/testing)
+        thread_id = g.pop('profile_thread', None)
+        if thread_id is not None:
+            get_sampler().stop(thread_id)
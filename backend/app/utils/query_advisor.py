@@ -0,0 +1,112 @@
+"""EXPLAIN every query the read paths issue and flag the expensive plans.
+
+The advisor runs a representative call of each model/service read method
+for one user while recording the SQL the instrumented cursor sends, then
+EXPLAINs one instance of every distinct SELECT shape with its real
+parameters. Plans that scan a whole table or
+index, sort with a filesort or build a temporary table are reported.
+"""
+from datetime import date, timedelta
+from app.utils.database import get_db_connection, close_db_connection
+from app.utils.query_log import query_shape, record_statements
+
+def _workload(user_id):
+    from app.models.card import Card
+    from app.models.ledger import CardLedger
+    from app.models.subscription import Subscription
+    from app.models.transaction import Transaction
+    from app.services import alert_service
+    from app.services.exchange_rate import ExchangeRateIndex, _load_rate_from_db
+    
+    today = date.today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    cards = Card.get_user_cards(user_id)
+    card_id = cards[0]['id'] if cards else 0
+    rate_index = ExchangeRateIndex(sync_interval=0)
+    
+    def second_page():
+        _, cursor = Transaction.get_user_transactions_page(user_id, limit=10)
+        if cursor:
+            Transaction.get_user_transactions_page(user_id, limit=10, cursor=cursor)
+    
+    return [
+        ('Transaction.get_user_transactions_page', lambda: Transaction.get_user_transactions_page(user_id)),
+        ('Transaction.get_user_transactions_page (next page)', second_page),
+        ('Transaction.get_user_transactions_page (card + dates)', lambda: Transaction.get_user_transactions_page(
+            user_id, {'card_id': card_id, 'start_date': month_ago, 'end_date': today.isoformat()})),
+        ('Transaction.get_user_transactions (statement)', lambda: Transaction.get_user_transactions(
+            user_id, {'card_id': card_id, 'start_date': month_ago, 'end_date': today.isoformat()})),
+        ('Transaction.get_spending_summary', lambda: Transaction.get_spending_summary(user_id)),
+        ('Transaction.get_spending_summary (dates)', lambda: Transaction.get_spending_summary(
+            user_id, month_ago, today.isoformat())),
+        ('Card.get_user_cards', lambda: Card.get_user_cards(user_id)),
+        ('Card.get_limit_info', lambda: Card.get_limit_info(card_id, user_id)),
+        ('CardLedger.get_balance_at', lambda: CardLedger.get_balance_at(card_id, user_id, today - timedelta(days=30))),
+        ('Subscription.get_user_subscriptions', lambda: Subscription.get_user_subscriptions(user_id)),
+        ('Subscription.get_user_subscriptions (active)', lambda: Subscription.get_user_subscriptions(user_id, 'active')),
+        ('Subscription.get_subscription_summary', lambda: Subscription.get_subscription_summary(user_id)),
+        ('alert_service.get_user_alerts', lambda: alert_service.get_user_alerts(user_id)),
+        ('alert_service.get_user_alerts (unread)', lambda: alert_service.get_user_alerts(user_id, unread_only=True)),
+        ('alert_service._load_unread_count', lambda: alert_service._load_unread_count(user_id)),
+        ('exchange_rate._load_rate_from_db', lambda: _load_rate_from_db(today)),
+        ('ExchangeRateIndex sync', lambda: (rate_index._sync(), rate_index._sync()))
+    ]
+
+def _plan_issues(plan):
+    issues = []
+    table = plan.get('table') or ''
+    if table.startswith('<'):
+        # Derived tables and UNION results are reported on their source rows
+        return issues
+    
+    extra = plan.get('Extra') or ''
+    if plan.get('type') == 'ALL':
+        issues.append(f"full table scan on {table} (~{plan.get('rows')} rows)")
+    elif plan.get('type') == 'index':
+        issues.append(f"full index scan of {table}.{plan.get('key')} (~{plan.get('rows')} rows)")
+    if 'Using filesort' in extra:
+        issues.append(f"filesort on {table}")
+    if 'Using temporary' in extra:
+        issues.append(f"temporary table for {table}")
+    return issues
+
+def explain_model_queries(user_id):
+    """Return one report dict per distinct SELECT issued by the workload."""
+    recorded = []
+    for source, call in _workload(user_id):
+        with record_statements() as query_log:
+            call()
+        recorded.extend((source, statement['sql']) for statement in query_log.statements)
+    
+    reports = {}
+    for source, sql in recorded:
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        shape = query_shape(sql)
+        if shape in reports:
+            reports[shape]['sources'].add(source)
+            continue
+        # The recorded SQL already has its parameters interpolated
+        reports[shape] = {'query': shape, 'sql': sql, 'sources': {source}}
+    
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor()
+    
+    try:
+        for report in reports.values():
+            try:
+                cursor.execute(f"EXPLAIN {report['sql']}")
+                report['plan'] = cursor.fetchall()
+                report['issues'] = [issue for plan in report['plan'] for issue in _plan_issues(plan)]
+            except Exception as e:
+                report['plan'] = []
+                report['issues'] = [f"EXPLAIN failed: {e}"]
+            report['sources'] = sorted(report['sources'])
+            del report['sql']
+        return list(reports.values())
+        
+    finally:
+        close_db_connection(conn, cursor)
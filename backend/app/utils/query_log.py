@@ -0,0 +1,184 @@
+"""Per-request SQL statement log, N+1 detection and query budgets.
+
+With SQL_DEBUG=True every statement a request sends through a pooled
+cursor is recorded with its duration and MySQL connection id. The
+response then carries X-SQL-Queries / X-SQL-Time-Ms headers, and one
+summary line is printed per request. Query shapes that repeat
+SQL_DEBUG_REPEAT_THRESHOLD or more times in one request are flagged as
+a likely N+1. Queries a request runs on the run_concurrently() pool are
+attributed to it: the pool captures the active logs at submit time.
+
+query_budget() records statements independently of SQL_DEBUG and is
+meant for tests:
+
+    with query_budget(5):
+        client.get('/api/analytics/dashboard', headers=headers)
+
+record_statements() collects them without a limit, for tooling such as
+the query advisor.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from app.config import Config
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_ROW_LIST = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+_local = threading.local()
+
+def query_shape(sql):
+    """Collapse literals, placeholders and IN/VALUES lists so repeats of one query compare equal."""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?)', shape)
+    shape = _ROW_LIST.sub(r'\1', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+class QueryLog:
+    def __init__(self):
+        self.statements = []
+
+    def add(self, sql, seconds, connection_id):
+        # list.append is atomic, so pool threads working for the same
+        # request can share one log
+        self.statements.append({'sql': sql, 'seconds': seconds, 'connection_id': connection_id})
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_seconds(self):
+        return sum(statement['seconds'] for statement in self.statements)
+
+    def repeated(self, threshold=2):
+        """[(shape, times)] for shapes executed at least `threshold` times, most repeated first."""
+        shapes = Counter(query_shape(statement['sql']) for statement in self.statements)
+        return [(shape, times) for shape, times in shapes.most_common() if times >= threshold]
+
+    def connections(self):
+        return len({statement['connection_id'] for statement in self.statements})
+
+    def describe(self):
+        lines = []
+        for statement in self.statements:
+            sql = _WHITESPACE.sub(' ', statement['sql']).strip()
+            lines.append(f"  [{statement['connection_id']}] {statement['seconds'] * 1000:.2f}ms {sql[:200]}")
+        return '\n'.join(lines)
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def _connection_id(connection):
+    try:
+        return connection.thread_id()
+    except Exception:
+        return id(connection)
+
+def _active_logs():
+    logs = list(getattr(_local, 'recorders', None) or ())
+    logs.extend(getattr(_local, 'inherited', None) or ())
+    if Config.SQL_DEBUG and has_request_context():
+        query_log = g.get('query_log')
+        if query_log is None:
+            query_log = g.query_log = QueryLog()
+        logs.append(query_log)
+    return logs
+
+def record_statement(cursor, sql, seconds):
+    """Called by the instrumented cursor; a no-op unless SQL_DEBUG or a budget is active."""
+    logs = _active_logs()
+    if not logs:
+        return
+
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    connection_id = _connection_id(cursor.connection)
+    for query_log in logs:
+        query_log.add(sql, seconds, connection_id)
+
+def capture_query_logs():
+    """The logs statements on this thread go to; hand them to inherit_query_logs() on a worker thread."""
+    return _active_logs()
+
+@contextmanager
+def inherit_query_logs(logs):
+    """Record statements run on this thread into logs captured on another one."""
+    previous = getattr(_local, 'inherited', None)
+    _local.inherited = logs
+    try:
+        yield
+    finally:
+        _local.inherited = previous
+
+@contextmanager
+def record_statements():
+    """Yield a QueryLog of every statement the block runs, on this thread
+    and on the run_concurrently() pool."""
+    query_log = QueryLog()
+    recorders = _local.__dict__.setdefault('recorders', [])
+    recorders.append(query_log)
+    try:
+        yield query_log
+    finally:
+        recorders.remove(query_log)
+
+@contextmanager
+def query_budget(max_queries, max_repeats=None):
+    """Fail with QueryBudgetExceeded if the block runs more than max_queries
+    statements, or repeats one query shape more than max_repeats times."""
+    with record_statements() as query_log:
+        yield query_log
+
+    if query_log.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"Expected at most {max_queries} queries, ran {query_log.count}:\n{query_log.describe()}"
+        )
+    if max_repeats is not None:
+        repeated = query_log.repeated(max_repeats + 1)
+        if repeated:
+            shape, times = repeated[0]
+            raise QueryBudgetExceeded(
+                f"Query repeated {times} times (at most {max_repeats} allowed): {shape}\n{query_log.describe()}"
+            )
+
+def init_query_log(app):
+    if not Config.SQL_DEBUG:
+        return
+
+    @app.before_request
+    def start_query_log():
+        g.query_log = QueryLog()
+        g.query_log_started = time.perf_counter()
+
+    @app.after_request
+    def summarize_query_log(response):
+        query_log = g.get('query_log')
+        if query_log is None:
+            return response
+
+        response.headers['X-SQL-Queries'] = str(query_log.count)
+        response.headers['X-SQL-Time-Ms'] = f"{query_log.total_seconds * 1000:.2f}"
+
+        summary = (
+            f"[sql] {request.method} {request.path} {response.status_code}: "
+            f"{query_log.count} queries on {query_log.connections()} connection(s), "
+            f"{query_log.total_seconds * 1000:.2f}ms in SQL"
+        )
+        repeated = query_log.repeated(Config.SQL_DEBUG_REPEAT_THRESHOLD)
+        if repeated:
+            response.headers['X-SQL-Repeated'] = str(len(repeated))
+            summary += ''.join(f"\n  possible N+1: {times}x {shape[:200]}" for shape, times in repeated)
+        if Config.SQL_DEBUG_STATEMENTS and query_log.count:
+            summary += '\n' + query_log.describe()
+        print(summary)
+        return response
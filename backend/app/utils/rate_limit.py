@@ -0,0 +1,96 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from app.config import Config
+
+class SlidingWindowLimiter:
+    """In-process sliding-window limiter: at most `limit` hits per key in `window` seconds."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """Record an attempt; returns 0 if allowed, otherwise seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            self._hits.move_to_end(key)
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+
+            if len(hits) >= limit:
+                return max(1, int(hits[0] + window - now) + 1)
+
+            hits.append(now)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'keys': len(self._hits)}
+
+class RedisRateLimiter:
+    """Sliding-window limiter shared between workers, one sorted set per key.
+
+    Needs the optional `redis` package (pip install redis). If Redis is
+    unreachable the attempt is allowed rather than locking everyone out.
+    """
+
+    def __init__(self, url, prefix='paywatch:ratelimit:'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def hit(self, key, limit, window):
+        redis_key = self.prefix + key
+        now = time.time()
+        try:
+            pipe = self._client.pipeline()
+            pipe.zremrangebyscore(redis_key, 0, now - window)
+            pipe.zrange(redis_key, 0, 0, withscores=True)
+            pipe.zcard(redis_key)
+            _, oldest, count = pipe.execute()
+
+            if count >= limit:
+                return max(1, int(oldest[0][1] + window - now) + 1) if oldest else 1
+
+            pipe = self._client.pipeline()
+            pipe.zadd(redis_key, {f"{now}:{uuid.uuid4().hex}": now})
+            pipe.expire(redis_key, int(window) + 1)
+            pipe.execute()
+        except Exception as e:
+            print(f"Rate limit error: {e}")
+        return 0
+
+    def reset(self, key):
+        try:
+            self._client.delete(self.prefix + key)
+        except Exception as e:
+            print(f"Rate limit reset error: {e}")
+
+    def stats(self):
+        return {'backend': 'redis'}
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if Config.RATE_LIMIT_BACKEND == 'redis':
+                    _limiter = RedisRateLimiter(Config.RATE_LIMIT_REDIS_URL)
+                else:
+                    _limiter = SlidingWindowLimiter()
+    return _limiter
@@ -0,0 +1,66 @@
+"""Per-request cost of token_required with and without the verified-token cache.
+
+Needs no database: the revocation list is marked as freshly synced so the
+benchmark measures only the decorator, the cache and jwt.decode.
+
+    python -m benchmarks.bench_auth [--calls 100000]
+"""
+import argparse
+import time
+import jwt
+from flask import Flask
+from app.config import Config
+from app.utils import auth
+
+def per_call_us(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=100_000)
+    args = parser.parse_args()
+
+    if not Config.JWT_SECRET_KEY:
+        Config.JWT_SECRET_KEY = 'benchmark-secret-key-benchmark-secret'
+    auth._revocations.sync_interval = float('inf')
+    auth._revocations._last_sync = time.monotonic()
+
+    token = auth.generate_token(1)
+    app = Flask(__name__)
+
+    @auth.token_required
+    def view(user_id):
+        return user_id
+
+    def uncached_decode():
+        jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
+
+    def cached_verify():
+        auth.verify_token(token)
+
+    def cold_verify():
+        auth._token_cache.delete(auth.token_digest(token))
+        auth.verify_token(token)
+
+    print(f"{'path':<34} {'us/call':>8}")
+    print(f"{'jwt.decode':<34} {per_call_us(uncached_decode, args.calls):>8.2f}")
+    print(f"{'verify_token, cache miss':<34} {per_call_us(cold_verify, args.calls):>8.2f}")
+    print(f"{'verify_token, cache hit':<34} {per_call_us(cached_verify, args.calls):>8.2f}")
+
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        decorated = per_call_us(view, args.calls)
+        auth._token_cache.delete(auth.token_digest(token))
+        original_get = auth._token_cache.get
+        auth._token_cache.get = lambda digest: None
+        try:
+            uncached = per_call_us(view, args.calls)
+        finally:
+            auth._token_cache.get = original_get
+    print(f"{'token_required, cache hit':<34} {decorated:>8.2f}")
+    print(f"{'token_required, cache disabled':<34} {uncached:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compare the bulk CSV import with one Transaction.add_transaction per row.
+
+Generates a synthetic bank export, imports it through the same code path as
+POST /api/transactions/import and reports rows/sec for both approaches. The
+per-row baseline only runs a sample since it is orders of magnitude slower.
+
+    python -m benchmarks.bench_bulk_import [--rows 20000] [--baseline 500]
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import date, timedelta
+from app.models.transaction import Transaction
+from app.services.transaction_import import import_transactions, iter_csv_rows
+from app.utils.database import get_db_connection, close_db_connection
+from benchmarks.common import CATEGORIES, create_bench_user, drop_bench_user
+
+def make_rows(card_ids, count, days=365):
+    today = date.today()
+    for _ in range(count):
+        yield {
+            'card_id': random.choice(card_ids),
+            'transaction_type': random.choice(['purchase', 'purchase', 'subscription', 'refund']),
+            'merchant_name': 'Bench Merchant',
+            'amount_usd': f"{random.uniform(1, 50):.2f}",
+            'category': random.choice(CATEGORIES),
+            'description': '',
+            'transaction_date': (today - timedelta(days=random.randrange(days))).isoformat(),
+            'is_recurring': 'false'
+        }
+
+def make_csv(card_ids, count):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[
+        'card_id', 'transaction_type', 'merchant_name', 'amount_usd',
+        'category', 'description', 'transaction_date', 'is_recurring'
+    ])
+    writer.writeheader()
+    writer.writerows(make_rows(card_ids, count))
+    return io.BytesIO(buffer.getvalue().encode('utf-8'))
+
+def fund_cards(card_ids, amount):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            "UPDATE cards SET current_balance = %s WHERE id = %s",
+            [(amount, card_id) for card_id in card_ids]
+        )
+        conn.commit()
+    finally:
+        close_db_connection(conn, cursor)
+
+def card_totals(user_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT c.id, c.current_balance,
+                   (SELECT COALESCE(SUM(amount), 0) FROM card_ledger l WHERE l.card_id = c.id) AS ledger
+            FROM cards c WHERE c.user_id = %s
+            """,
+            (user_id,)
+        )
+        return cursor.fetchall()
+    finally:
+        close_db_connection(conn, cursor)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--baseline', type=int, default=500, help='rows inserted one call at a time')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+
+    funding = args.rows * 50 + args.baseline * 50
+    user_id, card_ids = create_bench_user(card_count=3, credit_limit=funding)
+    try:
+        fund_cards(card_ids, funding)
+
+        if args.baseline:
+            started = time.perf_counter()
+            for row in make_rows(card_ids, args.baseline):
+                Transaction.add_transaction(user_id, row)
+            elapsed = time.perf_counter() - started
+            print(f"per-row add_transaction: {args.baseline} rows in {elapsed:.2f}s "
+                  f"({args.baseline / elapsed:.0f} rows/s)")
+
+        upload = make_csv(card_ids, args.rows)
+        started = time.perf_counter()
+        report = import_transactions(user_id, iter_csv_rows(upload), chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+        if 'error' in report:
+            raise SystemExit(report['error'])
+        print(f"bulk import: {report['imported']} rows in {elapsed:.2f}s "
+              f"({args.rows / elapsed:.0f} rows/s), {report['failed']} rejected")
+
+        # Every card's balance must equal the opening funding plus its ledger
+        # movements, i.e. the aggregated UPDATE and ledger entries agree.
+        for card in card_totals(user_id):
+            assert card['current_balance'] == funding + card['ledger'], f"card {card['id']} drifted"
+        print("card balances match the ledger")
+    finally:
+        drop_bench_user(user_id)
+
+if __name__ == '__main__':
+    main()
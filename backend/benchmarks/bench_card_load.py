@@ -0,0 +1,84 @@
+"""Hammer one card with concurrent Card.load_balance calls.
+
+Checks that the conditional UPDATE never lets the balance or the yearly
+total exceed the card limit, that every successful load is accounted for
+exactly once, and reports throughput.
+
+    python -m benchmarks.bench_card_load [--threads 32] [--loads 200]
+"""
+import argparse
+import random
+import threading
+import time
+from decimal import Decimal
+from app.models.card import Card
+from app.utils.database import get_pool, get_db_connection, close_db_connection
+from benchmarks.common import create_bench_user, drop_bench_user
+
+def read_card(card_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT credit_limit, current_balance, total_loaded_this_year FROM cards WHERE id = %s",
+            (card_id,)
+        )
+        return cursor.fetchone()
+    finally:
+        close_db_connection(conn, cursor)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--loads', type=int, default=200, help='loads per thread')
+    parser.add_argument('--limit', type=int, default=50_000, help='card credit limit')
+    args = parser.parse_args()
+
+    get_pool().max_size = max(get_pool().max_size, args.threads)
+    user_id, (card_id,) = create_bench_user(card_count=1, credit_limit=args.limit)
+
+    lock = threading.Lock()
+    accepted = []
+    rejected = [0]
+    errors = []
+    start_barrier = threading.Barrier(args.threads)
+
+    def worker():
+        start_barrier.wait()
+        for _ in range(args.loads):
+            amount = Decimal(random.randint(1, 100))
+            result = Card.load_balance(card_id, user_id, amount)
+            with lock:
+                if result.get('success'):
+                    accepted.append(amount)
+                elif 'limit' in result.get('error', ''):
+                    rejected[0] += 1
+                else:
+                    errors.append(result.get('error'))
+
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        card = read_card(card_id)
+        total = args.threads * args.loads
+        print(f"{total} loads from {args.threads} threads in {elapsed:.2f}s "
+              f"({total / elapsed:.0f} loads/s)")
+        print(f"accepted={len(accepted)} rejected_by_limit={rejected[0]} other_errors={len(errors)}")
+        print(f"balance={card['current_balance']} loaded_this_year={card['total_loaded_this_year']} "
+              f"limit={card['credit_limit']}")
+
+        assert card['current_balance'] == sum(accepted), 'lost or duplicated update'
+        assert card['total_loaded_this_year'] == sum(accepted), 'yearly total drifted from balance'
+        assert card['current_balance'] <= card['credit_limit'], 'balance exceeded the card limit'
+        print("invariants hold")
+    finally:
+        drop_bench_user(user_id)
+
+if __name__ == '__main__':
+    main()
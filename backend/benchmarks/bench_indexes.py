@@ -0,0 +1,107 @@
+"""Before/after timings for the indexes added in migrations/0003_hot_path_indexes.sql.
+
+Seeds several users (the indexes matter because the tables hold everyone's
+rows, not just the caller's), then runs each hot query shape once with the
+migration's indexes hidden through IGNORE INDEX and once with them visible.
+Run `flask db-migrate` first.
+
+    python -m benchmarks.bench_indexes [--users 10] [--rows 100000]
+"""
+import argparse
+from datetime import date, timedelta
+from app.utils.database import get_db_connection, close_db_connection
+from benchmarks.common import (create_bench_user, seed_transactions, seed_subscriptions,
+                               seed_alerts, drop_bench_user, timed)
+
+MIGRATION_INDEXES = {
+    'transactions': ['idx_transactions_user_date', 'idx_transactions_user_card_date'],
+    'subscriptions': ['idx_subscriptions_user_status_billing'],
+    'alerts': ['idx_alerts_user_read_created'],
+    'exchange_rates': ['idx_exchange_rates_fetch_date']
+}
+
+# (name, table, query); {hint} goes right after the table reference
+SHAPES = [
+    ('transaction page (keyset)', 'transactions',
+     "SELECT * FROM transactions {hint} WHERE user_id = %(user_id)s "
+     "ORDER BY transaction_date DESC, id DESC LIMIT 51"),
+    ('transactions last 30 days', 'transactions',
+     "SELECT category, card_id, SUM(amount_usd), SUM(amount_npr), COUNT(*) FROM transactions {hint} "
+     "WHERE user_id = %(user_id)s AND transaction_date >= %(month_ago)s GROUP BY category, card_id WITH ROLLUP"),
+    ('card statement month', 'transactions',
+     "SELECT * FROM transactions {hint} WHERE user_id = %(user_id)s AND card_id = %(card_id)s "
+     "AND transaction_date BETWEEN %(month_ago)s AND %(today)s ORDER BY transaction_date DESC"),
+    ('active subscriptions', 'subscriptions',
+     "SELECT * FROM subscriptions {hint} WHERE user_id = %(user_id)s AND status = 'active' "
+     "ORDER BY next_billing_date ASC"),
+    ('unread alert count', 'alerts',
+     "SELECT COUNT(*) AS count FROM alerts {hint} WHERE user_id = %(user_id)s AND is_read = FALSE"),
+    ('exchange rate on date', 'exchange_rates',
+     "SELECT rate FROM exchange_rates {hint} WHERE fetch_date = %(today)s")
+]
+
+def existing_indexes(cursor, table):
+    cursor.execute(f"SHOW INDEX FROM {table}")
+    return {row['Key_name'] for row in cursor.fetchall()}
+
+def run(cursor, query, params):
+    cursor.execute(query, params)
+    cursor.fetchall()
+
+def plan(cursor, query, params):
+    cursor.execute(f"EXPLAIN {query}", params)
+    row = cursor.fetchone()
+    return f"{row['type']}/{row['key'] or '-'}/{row['rows']}"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=100_000, help='transactions per user')
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    users = []
+    try:
+        for _ in range(args.users):
+            user_id, card_ids = create_bench_user()
+            users.append(user_id)
+            seed_transactions(user_id, card_ids, args.rows)
+            seed_subscriptions(user_id, card_ids, 200)
+            seed_alerts(user_id, args.rows // 10)
+
+        today = date.today()
+        params = {
+            'user_id': users[0],
+            'month_ago': today - timedelta(days=30),
+            'today': today
+        }
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT id FROM cards WHERE user_id = %s LIMIT 1", (users[0],))
+            params['card_id'] = cursor.fetchone()['id']
+            cursor.execute("ANALYZE TABLE transactions, subscriptions, alerts, exchange_rates")
+            cursor.fetchall()
+
+            print(f"{'query':<28} {'without':>10} {'with':>10} {'speedup':>8}  plan without -> with (type/key/rows)")
+            for name, table, template in SHAPES:
+                indexes = [index for index in MIGRATION_INDEXES[table] if index in existing_indexes(cursor, table)]
+                if not indexes:
+                    print(f"{name:<28} skipped: migration 0003 not applied to {table}")
+                    continue
+
+                without = template.format(hint=f"IGNORE INDEX ({', '.join(indexes)})")
+                with_index = template.format(hint='')
+                _, without_p50 = timed(lambda: run(cursor, without, params), args.repeat)
+                _, with_p50 = timed(lambda: run(cursor, with_index, params), args.repeat)
+                print(f"{name:<28} {without_p50:>8.2f}ms {with_p50:>8.2f}ms {without_p50 / with_p50:>7.1f}x  "
+                      f"{plan(cursor, without, params)} -> {plan(cursor, with_index, params)}")
+        finally:
+            close_db_connection(conn, cursor)
+    finally:
+        for user_id in users:
+            drop_bench_user(user_id)
+
+if __name__ == '__main__':
+    main()
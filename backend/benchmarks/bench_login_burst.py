@@ -0,0 +1,114 @@
+"""Latency of other routes while a burst of logins hits the same workers.
+
+Needs no database. A thread pool stands in for the request workers and a
+semaphore of --db-pool slots for the connection pool; every request
+holds a slot for its (1 ms) query. A burst of logins is submitted
+alongside a steady stream of cheap requests in three modes:
+
+- inline bcrypt: the old code, checking the password while holding the
+  request's connection;
+- hasher, connection held: the bounded PasswordHasher, still holding
+  the connection while it waits;
+- hasher, connection released: the current User.verify_password, which
+  returns the connection before the check.
+
+The p99 of the cheap requests is what the burst costs everyone else.
+
+    python -m benchmarks.bench_login_burst [--workers 16] [--db-pool 10] [--logins 64] [--rounds 12]
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from app.utils.passwords import PasswordHasher, PasswordHasherBusy
+
+QUERY_SECONDS = 0.001
+
+def other_request(db):
+    with db:
+        time.sleep(QUERY_SECONDS)
+    return sum(i * i for i in range(2000))
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def run(workers, db_pool, logins, login, duration, interval):
+    db = threading.BoundedSemaphore(db_pool)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    latencies = []
+    outcomes = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+
+    def timed_other(submitted):
+        other_request(db)
+        with lock:
+            latencies.append(time.perf_counter() - submitted)
+
+    def timed_login():
+        try:
+            login(db)
+            key = 'ok'
+        except PasswordHasherBusy:
+            key = 'busy'
+        with lock:
+            outcomes[key] += 1
+
+    for _ in range(logins):
+        pool.submit(timed_login)
+
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        pool.submit(timed_other, time.perf_counter())
+        time.sleep(interval)
+    pool.shutdown(wait=True)
+
+    ms = [latency * 1000 for latency in latencies]
+    return statistics.median(ms), percentile(ms, 99), outcomes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--db-pool', type=int, default=10)
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--hash-queue', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--interval', type=float, default=0.005)
+    args = parser.parse_args()
+
+    password = b'Benchmark-Passw0rd!'
+    stored = bcrypt.hashpw(password, bcrypt.gensalt(args.rounds))
+    hasher = PasswordHasher(workers=args.hash_workers, max_pending=args.hash_queue, rounds=args.rounds)
+
+    def inline(db):
+        with db:
+            time.sleep(QUERY_SECONDS)
+            bcrypt.checkpw(password, stored)
+
+    def hasher_holding_connection(db):
+        with db:
+            time.sleep(QUERY_SECONDS)
+            hasher.check(password.decode(), stored.decode())
+
+    def hasher_after_release(db):
+        with db:
+            time.sleep(QUERY_SECONDS)
+        hasher.check(password.decode(), stored.decode())
+
+    modes = {
+        'inline bcrypt': inline,
+        'hasher, conn held': hasher_holding_connection,
+        'hasher, released': hasher_after_release,
+    }
+
+    print(f"{'mode':<20} {'p50 ms':>8} {'p99 ms':>8} {'logins ok':>10} {'503':>6}")
+    for name, login in modes.items():
+        p50, p99, outcomes = run(args.workers, args.db_pool, args.logins, login, args.duration, args.interval)
+        print(f"{name:<20} {p50:>8.2f} {p99:>8.2f} {outcomes['ok']:>10} {outcomes['busy']:>6}")
+
+if __name__ == '__main__':
+    main()
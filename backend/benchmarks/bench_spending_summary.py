@@ -0,0 +1,76 @@
+"""Compare the old fetch-everything spending summary with the daily_spending rollup.
+
+    python -m benchmarks.bench_spending_summary [--sizes 10000,100000,1000000]
+"""
+import argparse
+from app.models.transaction import Transaction
+from app.utils.database import get_db_connection, close_db_connection
+from benchmarks.common import create_bench_user, seed_transactions, drop_bench_user, timed
+
+def legacy_spending_summary(user_id, start_date=None, end_date=None):
+    """The pre-aggregation implementation: pull every row, sum in Python."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        query = "SELECT * FROM transactions WHERE user_id = %s"
+        params = [user_id]
+        if start_date:
+            query += " AND transaction_date >= %s"
+            params.append(start_date)
+        if end_date:
+            query += " AND transaction_date <= %s"
+            params.append(end_date)
+
+        cursor.execute(query, tuple(params))
+        transactions = cursor.fetchall()
+
+        by_category = {}
+        by_card = {}
+        for t in transactions:
+            for key, groups in ((t['category'], by_category), (t['card_id'], by_card)):
+                group = groups.setdefault(key, {'usd': 0, 'npr': 0, 'count': 0})
+                group['usd'] += t['amount_usd']
+                group['npr'] += t['amount_npr']
+                group['count'] += 1
+
+        return {
+            'total_usd': sum(t['amount_usd'] for t in transactions),
+            'total_npr': sum(t['amount_npr'] for t in transactions),
+            'transaction_count': len(transactions),
+            'by_category': by_category,
+            'by_card': by_card
+        }
+    finally:
+        close_db_connection(conn, cursor)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    user_id, card_ids = create_bench_user()
+    seeded = 0
+    try:
+        print(f"{'rows':>10} {'legacy best':>12} {'legacy p50':>12} {'sql best':>10} {'sql p50':>10} {'speedup':>8}")
+        for size in sizes:
+            seed_transactions(user_id, card_ids, size - seeded)
+            seeded = size
+
+            expected = legacy_spending_summary(user_id)
+            actual = Transaction.get_spending_summary(user_id)
+            assert expected['transaction_count'] == actual['transaction_count'] == size
+            assert expected['total_usd'] == actual['total_usd']
+            assert expected['by_category'] == actual['by_category']
+            assert expected['by_card'] == actual['by_card']
+
+            legacy_best, legacy_p50 = timed(lambda: legacy_spending_summary(user_id), args.repeat)
+            sql_best, sql_p50 = timed(lambda: Transaction.get_spending_summary(user_id), args.repeat)
+            print(f"{size:>10} {legacy_best:>10.1f}ms {legacy_p50:>10.1f}ms "
+                  f"{sql_best:>8.1f}ms {sql_p50:>8.1f}ms {legacy_p50 / sql_p50:>7.1f}x")
+    finally:
+        drop_bench_user(user_id)
+
+if __name__ == '__main__':
+    main()
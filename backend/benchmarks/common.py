@@ -0,0 +1,141 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks run against the database configured in .env and create their own
+throwaway user, so never point them at production. Run them from backend/:
+
+    python -m benchmarks.bench_spending_summary
+"""
+import random
+import secrets
+import time
+from datetime import date, timedelta
+from app.models.spending_rollup import SpendingRollup
+from app.utils.database import get_db_connection, close_db_connection
+
+CATEGORIES = ['Entertainment', 'Software', 'Shopping', 'Education', 'Travel', 'Food', 'Utilities', 'Other']
+TRANSACTION_TYPES = ['purchase', 'subscription', 'refund']
+
+def create_bench_user(card_count=3, credit_limit=1_000_000):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        email = f"bench-{secrets.token_hex(6)}@paywatch.local"
+        cursor.execute(
+            """INSERT INTO users (email, password_hash, full_name, is_verified)
+            VALUES (%s, %s, %s, TRUE)""",
+            (email, 'x', 'Benchmark User')
+        )
+        user_id = cursor.lastrowid
+
+        card_ids = []
+        for i in range(card_count):
+            cursor.execute(
+                """INSERT INTO cards
+                (user_id, card_name, card_type, last_four_digits, credit_limit,
+                    current_balance, expiry_date, total_loaded_this_year, year_started)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                (user_id, f"Bench Card {i}", 'Visa', f"{i:04d}", credit_limit,
+                 0, '2099-12-31', 0, date.today().year)
+            )
+            card_ids.append(cursor.lastrowid)
+
+        conn.commit()
+        return user_id, card_ids
+    finally:
+        close_db_connection(conn, cursor)
+
+def seed_transactions(user_id, card_ids, count, days=3 * 365, chunk_size=5000):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    today = date.today()
+    try:
+        for offset in range(0, count, chunk_size):
+            rows = []
+            for _ in range(min(chunk_size, count - offset)):
+                amount = round(random.uniform(1, 500), 2)
+                rows.append((
+                    user_id,
+                    random.choice(card_ids),
+                    random.choice(TRANSACTION_TYPES),
+                    'Bench Merchant',
+                    amount,
+                    round(amount * 133.0, 2),
+                    133.0,
+                    random.choice(CATEGORIES),
+                    today - timedelta(days=random.randrange(days))
+                ))
+            cursor.executemany(
+                """INSERT INTO transactions
+                (user_id, card_id, transaction_type, merchant_name, amount_usd, amount_npr,
+                 exchange_rate, category, transaction_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                rows
+            )
+            conn.commit()
+    finally:
+        close_db_connection(conn, cursor)
+    # Raw inserts bypass Transaction.add_transaction, so rebuild the rollup
+    SpendingRollup.rebuild(user_id)
+
+def seed_subscriptions(user_id, card_ids, count):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    today = date.today()
+    try:
+        cursor.executemany(
+            """INSERT INTO subscriptions
+            (user_id, card_id, service_name, category, amount_usd, billing_cycle, next_billing_date, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+            [
+                (user_id, random.choice(card_ids), f"Bench Service {i}", random.choice(CATEGORIES),
+                 round(random.uniform(1, 50), 2), random.choice(['weekly', 'monthly', 'quarterly', 'yearly']),
+                 today + timedelta(days=random.randrange(365)),
+                 random.choice(['active', 'active', 'trial', 'cancelled']))
+                for i in range(count)
+            ]
+        )
+        conn.commit()
+    finally:
+        close_db_connection(conn, cursor)
+
+def seed_alerts(user_id, count, chunk_size=5000):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for offset in range(0, count, chunk_size):
+            cursor.executemany(
+                """INSERT INTO alerts (user_id, alert_type, title, message, is_read)
+                VALUES (%s, %s, %s, %s, %s)""",
+                [
+                    (user_id, 'renewal', 'Bench alert', 'Benchmark alert', random.random() < 0.9)
+                    for _ in range(min(chunk_size, count - offset))
+                ]
+            )
+            conn.commit()
+    finally:
+        close_db_connection(conn, cursor)
+
+def drop_bench_user(user_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM card_balance_snapshots WHERE card_id IN (SELECT id FROM cards WHERE user_id = %s)",
+            (user_id,)
+        )
+        for table in ('card_ledger', 'daily_spending', 'alert_counters', 'transactions', 'subscriptions', 'alerts', 'cards'):
+            cursor.execute(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+    finally:
+        close_db_connection(conn, cursor)
+
+def timed(fn, repeat=5):
+    """Return (best, median) wall time in milliseconds over `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
@@ -0,0 +1,40 @@
+-- Append-only record of every card balance movement plus periodic per-card
+-- snapshots (app/models/ledger.py). Balance on a date = latest snapshot on
+-- or before it + the ledger entries after the snapshot.
+CREATE TABLE IF NOT EXISTS card_ledger (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    card_id INT NOT NULL,
+    user_id INT NOT NULL,
+    entry_type VARCHAR(20) NOT NULL,  -- opening, load, purchase, refund, reversal, adjustment
+    amount DECIMAL(12, 2) NOT NULL,   -- signed: positive adds to the balance
+    effective_date DATE NOT NULL,
+    reference_id BIGINT NULL,         -- transactions.id for purchase/refund/reversal
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_card_ledger_card_date (card_id, effective_date, amount)
+);
+
+CREATE TABLE IF NOT EXISTS card_balance_snapshots (
+    card_id INT NOT NULL,
+    snapshot_date DATE NOT NULL,
+    balance DECIMAL(12, 2) NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (card_id, snapshot_date)
+);
+
+-- Backfill: one entry per existing transaction ...
+INSERT INTO card_ledger (card_id, user_id, entry_type, amount, effective_date, reference_id)
+SELECT t.card_id, t.user_id,
+       IF(t.transaction_type = 'refund', 'refund', 'purchase'),
+       IF(t.transaction_type = 'refund', t.amount_usd, -t.amount_usd),
+       t.transaction_date, t.id
+FROM transactions t;
+
+-- ... and an opening entry per card that reconciles the ledger with the
+-- stored current_balance (loads made before the ledger existed end up here).
+INSERT INTO card_ledger (card_id, user_id, entry_type, amount, effective_date)
+SELECT c.id, c.user_id, 'opening',
+       c.current_balance - COALESCE(SUM(IF(t.transaction_type = 'refund', t.amount_usd, -t.amount_usd)), 0),
+       LEAST(DATE(c.created_at), COALESCE(MIN(t.transaction_date), DATE(c.created_at)))
+FROM cards c
+LEFT JOIN transactions t ON t.card_id = c.id
+GROUP BY c.id, c.user_id, c.current_balance, c.created_at;
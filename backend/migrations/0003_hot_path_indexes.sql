@@ -0,0 +1,31 @@
+-- Composite indexes for the access paths the models hit on every request.
+-- benchmarks/bench_indexes.py measures each one against IGNORE INDEX on a
+-- seeded dataset; `flask explain-queries` shows which plan every model
+-- query ends up with.
+
+-- Transaction list, keyset pagination and export: WHERE user_id = ?
+-- [AND transaction_date range] ORDER BY transaction_date DESC, id DESC.
+-- InnoDB appends the primary key to secondary indexes, so this index is
+-- already in (user_id, transaction_date, id) order and LIMIT stops early
+-- instead of sorting all of a user's rows.
+ALTER TABLE transactions
+    ADD INDEX idx_transactions_user_date (user_id, transaction_date);
+
+-- Per-card filters and statement generation: user_id + card_id + date range
+ALTER TABLE transactions
+    ADD INDEX idx_transactions_user_card_date (user_id, card_id, transaction_date);
+
+-- Subscription list by status ordered by next_billing_date, and the
+-- active/trial summary (range on status, still index-only for the count)
+ALTER TABLE subscriptions
+    ADD INDEX idx_subscriptions_user_status_billing (user_id, status, next_billing_date);
+
+-- Unread alert count and list: covers WHERE user_id = ? AND is_read = FALSE
+-- ORDER BY created_at DESC without touching the rows for the count
+ALTER TABLE alerts
+    ADD INDEX idx_alerts_user_read_created (user_id, is_read, created_at);
+
+-- Rate on a date and the incremental index sync (fetch_date > ?), both
+-- answered from the index alone
+ALTER TABLE exchange_rates
+    ADD INDEX idx_exchange_rates_fetch_date (fetch_date, rate);
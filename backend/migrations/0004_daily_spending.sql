@@ -0,0 +1,21 @@
+-- Per-user, per-day, per-category, per-card spending totals maintained in
+-- the same transaction as every transactions insert/delete
+-- (app/models/spending_rollup.py). Summaries and trends read this table
+-- instead of scanning transactions. `flask rebuild-spending-rollup`
+-- recomputes it from transactions.
+CREATE TABLE IF NOT EXISTS daily_spending (
+    user_id INT NOT NULL,
+    spend_date DATE NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    card_id INT NOT NULL,
+    amount_usd DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    amount_npr DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    transaction_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, spend_date, category, card_id)
+);
+
+INSERT INTO daily_spending (user_id, spend_date, category, card_id, amount_usd, amount_npr, transaction_count)
+SELECT user_id, transaction_date, COALESCE(category, ''), card_id,
+       SUM(amount_usd), SUM(amount_npr), COUNT(*)
+FROM transactions
+GROUP BY user_id, transaction_date, COALESCE(category, ''), card_id;
@@ -0,0 +1,18 @@
+-- Per-user unread alert count kept in step with the alerts table by
+-- app/services/alert_service.py, so the notification badge never counts rows.
+CREATE TABLE IF NOT EXISTS alert_counters (
+    user_id INT PRIMARY KEY,
+    unread_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO alert_counters (user_id, unread_count)
+SELECT user_id, SUM(is_read = FALSE)
+FROM alerts
+GROUP BY user_id
+ON DUPLICATE KEY UPDATE unread_count = VALUES(unread_count);
+
+-- Keyset pagination of the full alert list (newest first); the unread
+-- list is served by idx_alerts_user_read_created from 0003
+ALTER TABLE alerts
+    ADD INDEX idx_alerts_user_created (user_id, created_at);
@@ -0,0 +1,12 @@
+-- Tokens revoked before their exp (logout). Every worker keeps the
+-- digests of unexpired rows in memory (app/utils/auth.py) and pulls new
+-- rows incrementally by id.
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    token_digest BINARY(16) NOT NULL,
+    user_id INT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_revoked_tokens_digest (token_digest),
+    INDEX idx_revoked_tokens_expires (expires_at)
+);
@@ -0,0 +1,17 @@
+-- Statement rendering jobs (app/services/statement_jobs.py). Kept here
+-- rather than in the web worker that accepted the job, so status polls and
+-- downloads can be served by any worker. The PDF itself is stored in
+-- `content`, or under STATEMENT_STORAGE_DIR (`storage_path`) when that is set.
+CREATE TABLE IF NOT EXISTS statement_jobs (
+    id CHAR(32) PRIMARY KEY,
+    user_id INT NOT NULL,
+    status ENUM('pending', 'done', 'failed') NOT NULL DEFAULT 'pending',
+    filename VARCHAR(255) NOT NULL,
+    storage_path VARCHAR(512) NULL,
+    content MEDIUMBLOB NULL,
+    queued_seconds DECIMAL(10, 3) NULL,
+    render_seconds DECIMAL(10, 3) NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at DATETIME NULL,
+    INDEX idx_statement_jobs_created (created_at)
+);
@@ -0,0 +1,76 @@
+import os
+
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-test-secret-key-test')
+os.environ.setdefault('BACKGROUND_WORKERS', 'False')
+
+import pytest
+from app import create_app
+from app.utils import database
+from app.utils.auth import generate_token
+from app.utils.database import InstrumentedCursor
+from app.utils.query_log import query_budget, QueryBudgetExceeded
+
+class FakeCursor(InstrumentedCursor):
+    """InstrumentedCursor that answers every statement with an empty result."""
+
+    def _query(self, query):
+        self._rows = ()
+        self.rowcount = 0
+        self.description = None
+        self.lastrowid = None
+        return 0
+
+class FakeConnection:
+    open = True
+    encoding = 'utf8'
+
+    def cursor(self, cursor=None):
+        return FakeCursor(self)
+
+    def literal(self, value):
+        return repr(value)
+
+    def escape(self, value, mapping=None):
+        return repr(value)
+
+    def thread_id(self):
+        return id(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakePool:
+    def acquire(self):
+        return FakeConnection()
+
+    def release(self, connection, discard=False, reset=True):
+        pass
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(database, '_pool', FakePool())
+    return create_app().test_client()
+
+def test_budget_counts_queries_run_on_the_query_pool(client):
+    # Every dashboard section is loaded by run_concurrently on pool threads
+    headers = {'Authorization': f'Bearer {generate_token(101)}'}
+
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        with query_budget(2):
+            client.get('/api/analytics/dashboard', headers=headers)
+
+    assert 'Expected at most 2 queries' in str(excinfo.value)
+
+def test_budget_passes_within_limit(client):
+    headers = {'Authorization': f'Bearer {generate_token(102)}'}
+
+    with query_budget(20) as query_log:
+        client.get('/api/analytics/dashboard', headers=headers)
+
+    assert query_log.count >= 5
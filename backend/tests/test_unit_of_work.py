@@ -0,0 +1,181 @@
+import os
+
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-test-secret-key-test')
+os.environ.setdefault('BACKGROUND_WORKERS', 'False')
+
+import pymysql
+import pytest
+from app import create_app
+from app.utils import database
+from app.utils.database import (
+    InstrumentedCursor, after_commit, close_db_connection, get_db_connection, get_unit_of_work
+)
+
+class RecordingCursor(InstrumentedCursor):
+    """InstrumentedCursor that hands every statement to its RecordingConnection."""
+
+    def _query(self, query):
+        self.connection.run(query)
+        self._rows = ()
+        self.rowcount = 1
+        self.description = None
+        self.lastrowid = None
+        return 1
+
+class RecordingConnection:
+    """Models a transaction: statements stay pending until commit(), and
+    savepoints and rollbacks discard pending statements the way MySQL would."""
+
+    open = True
+    encoding = 'utf8'
+
+    def __init__(self):
+        self.pending = []
+        self.committed = []
+        self.savepoints = {}
+        self.fail_commit = False
+
+    def run(self, query):
+        words = query.split()
+        if words[0] == 'SAVEPOINT':
+            self.savepoints[words[1]] = len(self.pending)
+        elif words[:3] == ['ROLLBACK', 'TO', 'SAVEPOINT']:
+            del self.pending[self.savepoints[words[3]]:]
+        else:
+            self.pending.append(query)
+
+    def cursor(self, cursor=None):
+        return RecordingCursor(self)
+
+    def thread_id(self):
+        return id(self)
+
+    def commit(self):
+        if self.fail_commit:
+            raise pymysql.err.OperationalError(2013, 'Lost connection to MySQL server during query')
+        self.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+        self.savepoints = {}
+
+    def close(self):
+        pass
+
+class SingleConnectionPool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def acquire(self):
+        return self.connection
+
+    def release(self, connection, discard=False, reset=True):
+        connection.rollback()
+
+@pytest.fixture
+def connection(monkeypatch):
+    connection = RecordingConnection()
+    monkeypatch.setattr(database, '_pool', SingleConnectionPool(connection))
+    return connection
+
+@pytest.fixture
+def app(connection):
+    app = create_app()
+
+    @app.route('/api/_test/write', methods=['POST'])
+    def write():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO things (name) VALUES ('written')")
+            conn.commit()
+        finally:
+            close_db_connection(conn, cursor)
+        return {'message': 'saved'}, 201
+
+    @app.route('/api/_test/write-then-fail', methods=['POST'])
+    def write_then_fail():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO things (name) VALUES ('half done')")
+            conn.commit()
+        finally:
+            close_db_connection(conn, cursor)
+        return {'error': 'Something went wrong'}, 500
+
+    return app
+
+def write(statement):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(statement)
+    return conn, cursor
+
+def test_nested_rollback_keeps_outer_writes(app, connection):
+    with app.test_request_context():
+        outer, outer_cursor = write("INSERT INTO things (name) VALUES ('outer')")
+
+        inner, inner_cursor = write("INSERT INTO things (name) VALUES ('inner')")
+        inner.rollback()
+        close_db_connection(inner, inner_cursor)
+
+        outer.commit()
+        close_db_connection(outer, outer_cursor)
+        assert get_unit_of_work().commit()
+
+    assert connection.committed == ["INSERT INTO things (name) VALUES ('outer')"]
+
+def test_abandoned_scope_is_not_persisted_by_a_later_commit(app, connection):
+    with app.test_request_context():
+        # Returned without commit() or rollback(), e.g. an early return
+        abandoned, abandoned_cursor = write("INSERT INTO things (name) VALUES ('abandoned')")
+        close_db_connection(abandoned, abandoned_cursor)
+
+        kept, kept_cursor = write("INSERT INTO things (name) VALUES ('kept')")
+        kept.commit()
+        close_db_connection(kept, kept_cursor)
+        assert get_unit_of_work().commit()
+
+    assert connection.committed == ["INSERT INTO things (name) VALUES ('kept')"]
+
+def test_scope_rollback_drops_its_callbacks(app, connection):
+    ran = []
+
+    with app.test_request_context():
+        outer, outer_cursor = write("INSERT INTO things (name) VALUES ('outer')")
+        after_commit(lambda: ran.append('outer'))
+
+        inner, inner_cursor = write("INSERT INTO things (name) VALUES ('inner')")
+        after_commit(lambda: ran.append('inner'))
+        inner.rollback()
+        close_db_connection(inner, inner_cursor)
+
+        outer.commit()
+        close_db_connection(outer, outer_cursor)
+        assert ran == []
+        assert get_unit_of_work().commit()
+
+    assert ran == ['outer']
+
+def test_commit_failure_turns_the_response_into_a_500(app, connection):
+    connection.fail_commit = True
+
+    response = app.test_client().post('/api/_test/write')
+
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'Failed to save changes'}
+    assert connection.committed == []
+
+def test_server_error_response_is_not_committed(app, connection):
+    response = app.test_client().post('/api/_test/write-then-fail')
+
+    assert response.status_code == 500
+    assert connection.committed == []
+
+def test_successful_request_commits(app, connection):
+    response = app.test_client().post('/api/_test/write')
+
+    assert response.status_code == 201
+    assert connection.committed == ["INSERT INTO things (name) VALUES ('written')"]
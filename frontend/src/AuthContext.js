@@ -49,9 +49,17 @@ export const AuthProvider = ({ children }) => {
     return response.data;
   };
 
-  const logout = () => {
-    localStorage.removeItem('token');
-    setUser(null);
+  const logout = async () => {
+    // Revoke the token server-side while it is still in storage for the
+    // request interceptor; log out locally whatever the outcome
+    try {
+      await authAPI.logout();
+    } catch (error) {
+      // Already expired or revoked, or the server is unreachable
+    } finally {
+      localStorage.removeItem('token');
+      setUser(null);
+    }
   };
 
   const value = {
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import Navbar from '../components/Navbar';
-import { analyticsAPI, exchangeRateAPI, cardsAPI } from '../services/api';
+import { analyticsAPI, exchangeRateAPI, cardsAPI, subscribeToEvents } from '../services/api';
 import { 
   CreditCardIcon, 
   ChartBarIcon, 
@@ -29,6 +29,12 @@ function Dashboard() {
     fetchExchangeRate();
   }, []);
 
+  useEffect(() => {
+    // Refresh when another tab or device changes balances or transactions
+    const refresh = () => loadDashboardData();
+    return subscribeToEvents({ balance: refresh, transaction: refresh, resync: refresh });
+  }, []);
+
   const loadDashboardData = async () => {
     try {
       const response = await analyticsAPI.getDashboard();
@@ -3,6 +3,9 @@ import Navbar from '../components/Navbar';
 import { cardsAPI } from '../services/api';
 import { DocumentTextIcon, CalendarIcon, CreditCardIcon } from '@heroicons/react/24/outline';
 
+// Give up on a statement job after two minutes of polling
+const MAX_STATUS_POLLS = 120;
+
 function Statements() {
   const [cards, setCards] = useState([]);
   const [selectedCard, setSelectedCard] = useState('');
@@ -35,12 +38,13 @@ function Statements() {
 
     try {
       const monthOnly = parseInt(month.slice(5));
+      const headers = {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${localStorage.getItem('token')}`
+      };
       const response = await fetch(`http://localhost:5000/api/statements/generate`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        },
+        headers,
         body: JSON.stringify({
           card_id: selectedCard,
           month: monthOnly,
@@ -48,8 +52,24 @@ function Statements() {
         })
       });
 
-      if (response.ok) {
-        const blob = await response.blob();
+      if (!response.ok) {
+        setError('Failed to generate statement');
+        return;
+      }
+
+      // Rendering runs as a background job; poll until the PDF is ready
+      const { status_url, download_url } = await response.json();
+      let status = 'pending';
+      for (let attempt = 0; attempt < MAX_STATUS_POLLS && (status === 'pending' || status === 'running'); attempt++) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const statusResponse = await fetch(`http://localhost:5000${status_url}`, { headers });
+        if (!statusResponse.ok) break;
+        status = (await statusResponse.json()).job.status;
+      }
+
+      const download = status === 'done' && await fetch(`http://localhost:5000${download_url}`, { headers });
+      if (download && download.ok) {
+        const blob = await download.blob();
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
@@ -5,6 +5,8 @@ import { BanknotesIcon, PlusIcon, TrashIcon, XMarkIcon, FunnelIcon, MagnifyingGl
 
 function Transactions() {
   const [transactions, setTransactions] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [cards, setCards] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showAddModal, setShowAddModal] = useState(false);
@@ -53,14 +55,20 @@ function Transactions() {
     loadData();
   }, [filters]);
 
+  const listFields = [
+    'transaction_date', 'merchant_name', 'description', 'card_name',
+    'last_four_digits', 'category', 'amount_usd', 'amount_npr'
+  ].join(',');
+
   const loadData = async () => {
     try {
       const [transResponse, cardsResponse] = await Promise.all([
-        transactionsAPI.getAll(filters),
+        transactionsAPI.getAll({ ...filters, fields: listFields }),
         cardsAPI.getAll()
       ]);
       
       setTransactions(transResponse.data.transactions);
+      setNextCursor(transResponse.data.next_cursor);
       setCards(cardsResponse.data.cards);
     } catch (err) {
       console.error('Failed to load data:', err);
@@ -69,6 +77,20 @@ function Transactions() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await transactionsAPI.getAll({ ...filters, fields: listFields, cursor: nextCursor });
+      setTransactions((current) => [...current, ...response.data.transactions]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error('Failed to load more transactions:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleFilterChange = (e) => {
     setFilters({
       ...filters,
@@ -348,6 +370,17 @@ function Transactions() {
                   </tbody>
                 </table>
               </div>
+              {nextCursor && (
+                <div className="p-4 text-center">
+                  <button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="px-6 py-2.5 bg-secondary-100 text-secondary-700 rounded-xl hover:bg-secondary-200 transition-colors font-semibold disabled:opacity-50"
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </button>
+                </div>
+              )}
             </div>
           ) : (
             <div className="card p-16 text-center animate-fade-in">
@@ -21,10 +21,49 @@ api.interceptors.request.use(
   }
 );
 
+// Server-Sent Events: calls handlers[eventName](data) for each event
+// and returns a function that closes the stream. Each connection is
+// opened with a fresh single-use ticket, so reconnects fetch a new one.
+export const subscribeToEvents = (handlers) => {
+  let source = null;
+  let retryTimer = null;
+  let closed = false;
+
+  const connect = async () => {
+    try {
+      const response = await api.post('/events/ticket');
+      if (closed) return;
+      source = new EventSource(`${API_URL}/events?ticket=${encodeURIComponent(response.data.ticket)}`);
+      Object.entries(handlers).forEach(([name, handler]) => {
+        source.addEventListener(name, (event) => handler(JSON.parse(event.data)));
+      });
+      source.onerror = () => {
+        // The ticket is spent, so EventSource's own retry would be rejected
+        source.close();
+        scheduleReconnect();
+      };
+    } catch (error) {
+      scheduleReconnect();
+    }
+  };
+
+  const scheduleReconnect = () => {
+    if (!closed) retryTimer = setTimeout(connect, 5000);
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    if (source) source.close();
+  };
+};
+
 // Auth API calls
 export const authAPI = {
   register: (userData) => api.post('/auth/register', userData),
   login: (credentials) => api.post('/auth/login', credentials),
+  logout: () => api.post('/auth/logout'),
   getCurrentUser: () => api.get('/auth/me'),
   verifyEmail: (token) => api.post('/auth/verify-email', { token })
 };
@@ -62,12 +101,24 @@ export const subscriptionsAPI = {
 // Analytics API calls
 export const analyticsAPI = {
   getDashboard: () => api.get('/analytics/dashboard'),
-  getSpendingTrends: (period) => api.get('/analytics/spending-trends', { params: { period } })
+  getSpendingTrends: (period) => api.get('/analytics/spending-trends', { params: { period } }),
+  getSpendingTimeseries: (params) => api.get('/analytics/spending-timeseries', { params })
+};
+
+// Alerts API calls
+export const alertsAPI = {
+  getAll: (params) => api.get('/alerts', { params }),
+  getUnreadCount: () => api.get('/alerts/unread-count'),
+  markAsRead: (id) => api.post(`/alerts/${id}/read`),
+  markAllAsRead: () => api.post('/alerts/read-all'),
+  delete: (id) => api.delete(`/alerts/${id}`)
 };
 
 // Statements API calls
 export const statementsAPI = {
-  generate: (data) => api.post('/statements/generate', data, { responseType: 'blob' })
+  generate: (data) => api.post('/statements/generate', data),
+  getJob: (jobId) => api.get(`/statements/jobs/${jobId}`),
+  download: (jobId) => api.get(`/statements/jobs/${jobId}/download`, { responseType: 'blob' })
 };
 
 export const exchangeRateAPI = {